@@ -11,7 +11,7 @@ from typing import List
 
 from croniter import croniter
 from models import AgentConfiguration
-from utils import gemini, memory
+from utils import gemini, memory, memory_compaction
 
 logger = logging.getLogger(__name__)
 
@@ -56,10 +56,42 @@ if not os.path.exists(AGENT_DATA_DIR):
     os.makedirs(AGENT_DATA_DIR)
 
 
+# Token budget for past task records in interrupt/call system prompts.
+MEMORY_PROMPT_TOKENS = int(os.getenv("MEMORY_PROMPT_TOKENS", 2000))
+
+# Characters of a task result kept as its memory summary.
+MEMORY_SUMMARY_CHARS = 500
+
+# Result keys that hold the most useful text, in order of preference.
+_SUMMARY_KEYS = ("summary_output", "strategy_report", "generated_email", "error")
+
+
 def _agent_file_path(agent_id: str) -> str:
     return os.path.join(AGENT_DATA_DIR, f"{agent_id}.json")
 
 
+def _summarize_task_result(task_result) -> tuple:
+    """Returns (status, short summary) for a task handler's result."""
+    if task_result is None:
+        return "failed", "Task returned no result."
+
+    status = "success"
+    text = None
+    if isinstance(task_result, dict):
+        status = str(task_result.get("status") or status)
+        text = next(
+            (task_result[k] for k in _SUMMARY_KEYS if isinstance(task_result.get(k), str)),
+            None,
+        )
+    if text is None:
+        text = task_result if isinstance(task_result, str) else json.dumps(task_result, default=str)
+
+    text = " ".join(text.split())
+    if len(text) > MEMORY_SUMMARY_CHARS:
+        text = text[:MEMORY_SUMMARY_CHARS].rstrip() + "..."
+    return status, text
+
+
 async def _execute_task(task, agent_config):
     """Executes a specific task based on its type."""
     logger.info(f"Executing task: {task.type}")
@@ -72,6 +104,13 @@ async def _execute_task(task, agent_config):
     if task_handler:
         task_result = await task_handler(task, agent_config)
 
+        # Persist a structured record: summary for prompts, full result by ref.
+        # This is the run's only memory entry; handlers do not write their own.
+        status, summary = _summarize_task_result(task_result)
+        await memory.aput(
+            agent_config.id, summary, task.type, status=status, result=task_result
+        )
+
         # Check if task_result is None before proceeding
         if task_result:
             # 2. AI Processing: Pass result to LLM/AI agent to process
@@ -316,12 +355,6 @@ async def _run_scheduled_agent(agent_id: str, called_once=False):
             # after execution we update the task on the current agentConfig.
             agent_config.tasks[i].last_run = now
 
-            logger.info(f"Persisting with result: {task_result}")
-            memory_string = (
-                str(task.type) + " : " + str(task_result)
-            )  # or make a better way with json or just a better way, no magic
-            memory.put(agent_config.id, memory_string)
-
             # set this to be something new so next task gets the data if anything
             logger.info(f"Completed: {task.type} now wait for other")
         # except Exception as e:
@@ -379,7 +412,9 @@ async def interrupt_agent(agent_id: str, prompt: str):
     agent: AgentConfiguration = await get_agent(agent_id)
 
     all_tasks = await get_status(agent.id)
-    my_memory = memory.get_all(agent_id=agent.id)
+    my_memory = await memory_compaction.build_context(
+        agent.id, MEMORY_PROMPT_TOKENS, query=prompt
+    )
     upcoming_tasks = all_tasks["upcoming_tasks"]
     tasks_description = "\n".join(
         [
@@ -429,7 +464,7 @@ Instructions:
     *  If there are missing details on important aspects, such as the task list or due dates, acknowledge this to be clear in any gaps in the description.
 """
 
-    return {"message": await gemini.generate_text(prompt, system_prompt)}
+    return {"message": await gemini.generate_text(prompt, system_prompt, task_class="chat")}
 
 
 async def get_status(agent_id: str) -> dict:
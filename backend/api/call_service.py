@@ -1,7 +1,7 @@
 import requests
-from api.agent_service import get_status
+from api.agent_service import MEMORY_PROMPT_TOKENS, get_status
 from models import AgentConfiguration
-from utils import memory
+from utils import memory_compaction
 
 
 def make_phone_call(
@@ -63,7 +63,6 @@ async def call_with_agent(agent: AgentConfiguration, phone_number: str, name: st
     # step and will depend on the specific requirements of your application.
 
     all_tasks = await get_status(agent.id)
-    my_memory = memory.get_all(agent_id=agent.id)
     upcoming_tasks = all_tasks["upcoming_tasks"]
     tasks_description = "\n".join(
         [
@@ -71,6 +70,12 @@ async def call_with_agent(agent: AgentConfiguration, phone_number: str, name: st
             for task in upcoming_tasks
         ]
     )
+    # The call is a status update on upcoming work, so recall memory about it.
+    my_memory = await memory_compaction.build_context(
+        agent.id,
+        MEMORY_PROMPT_TOKENS,
+        query=f"Project status update. Upcoming tasks:\n{tasks_description}",
+    )
     system_prompt = system_prompt = f"""
 You are {agent.persona.name}, an advanced conversational AI designed to provide concise and professional project updates.
 You embody the following qualities: {agent.persona.qualities}. You are {agent.persona.description}.
@@ -1,33 +1,94 @@
 import os
-from typing import List, Dict
+from typing import List, Dict, Optional
 from fastapi import APIRouter, HTTPException
-from api import embedding_service  # Import the service layer functions
+from api import embedings_service as embedding_service  # Import the service layer functions
+from utils import vector_store
 
 router = APIRouter()
 
-@router.post("/embedding/run")
-async def run_embedding(agent_id: str) -> Dict[str, str]:
+@router.post("/embedding/run", status_code=202)
+async def run_embedding(agent_id: str) -> Dict:
     """
-    Endpoint to trigger the RAG pipeline:
+    Endpoint to start the RAG pipeline as a background job:
     - Reads multi-input files from a predefined directory.
-    - Aggregates and summarizes the content.
-    - Splits and creates vector embeddings.
-    - Stores the embeddings in a local Chroma vector store.
+    - Splits the content into chunks, skipping near-duplicates.
+    - Creates vector embeddings.
+    - Stores the embeddings in the agent's vector store.
+    Returns immediately; poll /embedding/jobs/{job_id} for progress.
+    Unchanged sources are skipped. Returns 409 if the agent already has a job running.
     """
-    try:
-        result = await embedding_service.run_embedding_pipeline(agent_id)
-        return {"message": "Embedding pipeline executed successfully", "result": result}
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error running embedding pipeline: {str(e)}")
+    job = await embedding_service.submit_embedding_job(agent_id)
+    return {"message": "Embedding job started", "job": job}
+
+@router.get("/embedding/jobs")
+async def list_embedding_jobs(agent_id: Optional[str] = None) -> Dict[str, List[Dict]]:
+    """
+    Endpoint listing embedding jobs, newest first, optionally for one agent.
+    """
+    return {"jobs": embedding_service.list_embedding_jobs(agent_id)}
+
+@router.get("/embedding/jobs/{job_id}")
+async def get_embedding_job(job_id: str) -> Dict:
+    """
+    Endpoint reporting a job's status, per-stage counts (sources extracted,
+    documents chunked, chunks embedded, bytes processed), throughput and ETA.
+    """
+    return embedding_service.get_embedding_job(job_id)
+
+@router.post("/embedding/jobs/{job_id}/cancel")
+async def cancel_embedding_job(job_id: str) -> Dict:
+    """
+    Endpoint to cancel a running job. Documents already stored stay indexed.
+    """
+    job = await embedding_service.cancel_embedding_job(job_id)
+    return {"message": "Embedding job cancelled", "job": job}
+
+@router.post("/embedding/jobs/{job_id}/resume", status_code=202)
+async def resume_embedding_job(job_id: str) -> Dict:
+    """
+    Endpoint to restart a failed, cancelled or interrupted job. Documents
+    stored by earlier runs are skipped.
+    """
+    job = embedding_service.resume_embedding_job(job_id)
+    return {"message": "Embedding job resumed", "job": job}
 
 @router.get("/embedding/query")
-async def query_embedding(agent_id: str, query: str) -> Dict[str, List[str]]:
+async def query_embedding(
+    agent_id: str, query: str, mode: str = "vector", k: int = 3
+) -> Dict[str, List[str]]:
     """
     Endpoint to query the vector store for documents relevant to a given query.
-    Filters results based on the provided agent_id.
+    Only the collection of the provided agent_id is searched.
+    mode: "vector" (default), "keyword" for exact terms such as clause names or
+    regulation IDs, or "hybrid" to fuse both rankings.
     """
     try:
-        results = await embedding_service.query_embedding(agent_id, query)
+        results = await embedding_service.query_embedding(agent_id, query, mode, k)
         return {"results": results}
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error querying embeddings: {str(e)}")
+
+@router.get("/embedding/status")
+async def embedding_status() -> Dict:
+    """
+    Endpoint reporting whether the embedding model is loaded and warm.
+    """
+    return vector_store.status()
+
+@router.post("/embedding/compact")
+async def compact_embedding(agent_id: str) -> Dict:
+    """
+    Endpoint to compact an agent's vector collection after many updates.
+    """
+    kept = await embedding_service.compact_embeddings(agent_id)
+    return {"message": "Embeddings compacted", "chunks": kept}
+
+@router.delete("/embedding/{agent_id}")
+async def drop_embedding(agent_id: str) -> Dict[str, str]:
+    """
+    Endpoint to delete every embedding stored for an agent.
+    """
+    await embedding_service.drop_embeddings(agent_id)
+    return {"message": "Embeddings deleted"}
@@ -1,53 +1,111 @@
-import os
 import asyncio
+from typing import List, Optional
 from fastapi import HTTPException
-from utils import embeding  # The RAG pipeline function that performs summarization, embedding, and storage
-from langchain.embeddings import HuggingFaceEmbeddings
-from langchain.vectorstores import Chroma
+from utils import embeding  # The RAG pipeline function that performs chunking, embedding, and storage
+from api import agent_service
+from utils import ingest_jobs, rag_context, retrieval
 
-async def run_embedding_pipeline(agent_id: str) -> str:
+async def submit_embedding_job(agent_id: str) -> dict:
     """
-    Triggers the complete RAG pipeline:
-      1. Aggregates multi-input data.
-      2. Summarizes the aggregated content via Gemini.
-      3. Splits text (if needed) and creates embeddings.
-      4. Stores the embeddings in a local Chroma vector store.
+    Starts the incremental RAG pipeline for an agent in the background:
+      1. Aggregates multi-input data and the agent's configured documents,
+         skipping sources unchanged since the last run.
+      2. Splits new or changed content into token-sized chunks, skipping
+         near-duplicates of chunks already indexed.
+      3. Creates embeddings.
+      4. Stores the embeddings in the agent's vector store and drops stale chunks.
     
     Args:
         agent_id: A unique identifier for the agent.
         
     Returns:
-        A success message once embeddings are stored.
+        The job, to be polled with get_embedding_job.
     """
+    paths, urls = [], []
+    agent_config = await agent_service.get_agent(agent_id)
+    if agent_config:
+        # Always included: a run without them would drop their chunks as stale.
+        paths, urls = rag_context.document_sources(agent_config)
     try:
-        # This function (from rag_pipeline.py) is expected to perform all the steps.
-        await embeding.run_rag_pipeline(agent_id)
-        return "Embeddings generated and stored successfully."
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error in pipeline: {str(e)}")
+        return ingest_jobs.report(ingest_jobs.submit(agent_id, urls=urls, paths=paths))
+    except ingest_jobs.JobError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+def get_embedding_job(job_id: str) -> dict:
+    """
+    Returns a job's status, per-stage counters, throughput and ETA.
+    """
+    job = ingest_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Embedding job {job_id} not found")
+    return ingest_jobs.report(job)
+
+def list_embedding_jobs(agent_id: Optional[str] = None) -> List[dict]:
+    """
+    Returns the known jobs, newest first, optionally of one agent only.
+    """
+    return [ingest_jobs.report(job) for job in ingest_jobs.list_jobs(agent_id)]
 
-async def query_embedding(agent_id: str, query: str) -> list:
+async def cancel_embedding_job(job_id: str) -> dict:
     """
-    Queries the Chroma vector store for documents relevant to the provided query.
+    Cancels a running job; what it already stored stays indexed.
+    """
+    get_embedding_job(job_id)
+    try:
+        return ingest_jobs.report(await ingest_jobs.cancel(job_id))
+    except ingest_jobs.JobError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+def resume_embedding_job(job_id: str) -> dict:
+    """
+    Restarts a failed, cancelled or interrupted job where it left off.
+    """
+    get_embedding_job(job_id)
+    try:
+        return ingest_jobs.report(ingest_jobs.resume(job_id))
+    except ingest_jobs.JobError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+async def query_embedding(agent_id: str, query: str, mode: str = "vector", k: int = 3) -> list:
+    """
+    Queries the agent's indexes for documents relevant to the provided query.
     
     Args:
-        agent_id: The agent identifier used to filter the embeddings.
+        agent_id: The agent whose documents are searched.
         query: The user query.
+        mode: "vector", "keyword" (BM25) or "hybrid" (both, rank-fused).
+        k: Number of documents to return.
     
     Returns:
         A list of matching document texts.
     """
+    if mode not in retrieval.MODES:
+        raise HTTPException(status_code=400, detail=f"Unknown retrieval mode: {mode}")
     try:
-        # Define parameters consistent with the pipeline
-        PERSIST_DIR = "backend/_data/chroma_langchain"
-        COLLECTION_NAME = "agent_memory"
-        embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
-        vector_store = Chroma(
-            embedding_function=embeddings,
-            collection_name=COLLECTION_NAME,
-            persist_directory=PERSIST_DIR,
-        )
-        results = vector_store.similarity_search(query, k=3, filter={"agent": agent_id})
-        return [doc.page_content for doc in results]
+        # The model and store are process-wide; only the search runs per query
+        # (off the event loop, in case the model is still loading).
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, retrieval.search, agent_id, query, mode, k)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error during querying: {str(e)}")
+
+async def compact_embeddings(agent_id: str) -> int:
+    """
+    Rebuilds the agent's collection without the space left by deleted chunks.
+
+    Returns:
+        The number of chunks kept.
+    """
+    try:
+        return await embeding.compact_agent(agent_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error compacting embeddings: {str(e)}")
+
+async def drop_embeddings(agent_id: str):
+    """
+    Deletes all of the agent's embeddings and its ingestion manifest.
+    """
+    try:
+        await embeding.drop_agent(agent_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error dropping embeddings: {str(e)}")
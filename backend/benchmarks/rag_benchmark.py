@@ -0,0 +1,408 @@
+# ai_agent_builder/benchmarks/rag_benchmark.py
+"""
+Benchmarks the retrieval path: chunking, embedding, indexing and querying a
+synthetic corpus against each vector backend, reported as JSON.
+
+Run from the backend directory:
+
+    python -m benchmarks.rag_benchmark --docs 500 --queries 200 --out bench.json
+    python -m benchmarks.rag_benchmark --embeddings hash   # no model download
+
+The corpus is chunked, deduplicated and embedded as ingestion does it;
+extraction is not part of the measurement.
+"""
+import argparse
+import gc
+import hashlib
+import json
+import logging
+import os
+import platform
+import random
+import re
+import resource
+import shutil
+import sys
+import tempfile
+import time
+import uuid
+from typing import Dict, List, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from utils import chunker, dedup, flat_index
+
+logger = logging.getLogger(__name__)
+
+BACKENDS = ("chroma", "numpy", "numpy-int8", "numpy-ivf")
+
+# Vectors written per add_texts call; Chroma rejects very large batches.
+ADD_BATCH = 1000
+
+_WORD_RE = re.compile(r"\w+")
+
+
+# ----------------------------------------------------------------------
+# Synthetic corpus
+# ----------------------------------------------------------------------
+
+
+def _vocabulary(rng: random.Random, size: int) -> List[str]:
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    return ["".join(rng.choice(letters) for _ in range(rng.randint(3, 10))) for _ in range(size)]
+
+
+def make_corpus(docs: int, seed: int = 0) -> List[str]:
+    """
+    Generates documents shaped like business uploads: a title, numbered
+    sections of paragraphs drawn from one of several topics (Zipf-distributed
+    words), and a boilerplate footer shared by all documents.
+    """
+    rng = random.Random(seed)
+    vocabulary = _vocabulary(rng, 20000)
+    topics = [rng.sample(vocabulary, 800) for _ in range(max(4, docs // 20))]
+    weights = [1.0 / (rank + 1) for rank in range(800)]
+    footer = "Confidential. " + " ".join(rng.choices(vocabulary, k=60)) + "."
+
+    def sentence(words: List[str]) -> str:
+        return " ".join(rng.choices(words, weights=weights, k=rng.randint(8, 20))).capitalize() + "."
+
+    corpus = []
+    for _ in range(docs):
+        words = rng.choice(topics)
+        parts = [" ".join(rng.choices(words, k=4)).upper()]
+        for number in range(1, rng.randint(3, 7)):
+            parts.append(f"{number}. {' '.join(rng.choices(words, k=3)).title()}")
+            for _ in range(rng.randint(1, 4)):
+                parts.append(" ".join(sentence(words) for _ in range(rng.randint(2, 8))))
+                parts.append("")
+        parts.append(footer)
+        corpus.append("\n".join(parts))
+    return corpus
+
+
+def make_queries(chunks: List[str], count: int, seed: int = 0) -> List[str]:
+    """Queries of a few words sampled from random chunks."""
+    rng = random.Random(seed + 1)
+    queries = []
+    for _ in range(count):
+        words = _WORD_RE.findall(rng.choice(chunks))
+        queries.append(" ".join(rng.sample(words, min(len(words), rng.randint(3, 8)))))
+    return queries
+
+
+# ----------------------------------------------------------------------
+# Embeddings
+# ----------------------------------------------------------------------
+
+
+class HashEmbeddings(Embeddings):
+    """
+    Deterministic feature-hashing embeddings: a bag of words hashed into
+    `dim` signed buckets. Measures index cost without downloading a model;
+    recall against exact search is still meaningful, relevance is not.
+    """
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def _embed(self, text: str) -> List[float]:
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for word in _WORD_RE.findall(text.lower()):
+            h = int.from_bytes(hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest(), "little")
+            vector[h % self.dim] += 1.0 if (h >> 63) else -1.0
+        norm = np.linalg.norm(vector)
+        return (vector / norm if norm else vector).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self._embed(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self._embed(text)
+
+
+class PrecomputedEmbeddings(Embeddings):
+    """Serves vectors computed once up front, so backends are timed on indexing alone."""
+
+    def __init__(self, vectors: Dict[str, np.ndarray]):
+        self.vectors = vectors
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self.vectors[text].tolist() for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.vectors[text].tolist()
+
+
+def _model_embeddings(name: str) -> Embeddings:
+    if name == "hash":
+        return HashEmbeddings()
+    from utils import vector_store
+
+    return vector_store.get_embeddings()
+
+
+# ----------------------------------------------------------------------
+# Backends
+# ----------------------------------------------------------------------
+
+
+def _open_store(backend: str, embeddings: Embeddings, path: str):
+    if backend == "chroma":
+        from langchain.vectorstores import Chroma
+
+        return Chroma(embedding_function=embeddings, collection_name="bench", persist_directory=path)
+    if backend == "numpy-int8":
+        return flat_index.FlatIndex(embeddings, path, dtype="int8")
+    return flat_index.FlatIndex(embeddings, path, dtype="float32")
+
+
+def _hit_id(doc) -> str:
+    return getattr(doc, "id", None) or doc.metadata["chunk_id"]
+
+
+def _rss_mb() -> float:
+    """Current resident set size; peak RSS where /proc is unavailable."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes elsewhere.
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _disk_mb(path: str) -> float:
+    total = 0
+    for root, _, files in os.walk(path):
+        total += sum(os.path.getsize(os.path.join(root, name)) for name in files)
+    return total / (1024 * 1024)
+
+
+def _percentiles(samples: List[float]) -> dict:
+    ms = np.asarray(samples) * 1000
+    return {
+        "p50": round(float(np.percentile(ms, 50)), 3),
+        "p95": round(float(np.percentile(ms, 95)), 3),
+        "p99": round(float(np.percentile(ms, 99)), 3),
+        "mean": round(float(ms.mean()), 3),
+    }
+
+
+def exact_top_k(chunk_matrix: np.ndarray, query_matrix: np.ndarray, k: int) -> np.ndarray:
+    """Ground truth: indexes of the k chunks with the highest cosine similarity, per query."""
+    scores = query_matrix @ chunk_matrix.T
+    top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+    return top
+
+
+def bench_backend(
+    backend: str,
+    chunks: List[str],
+    chunk_ids: List[str],
+    queries: List[str],
+    vectors: Dict[str, np.ndarray],
+    truth: np.ndarray,
+    k: int,
+    workdir: str,
+) -> dict:
+    """Indexes the chunks into one backend and runs the query set against it."""
+    path = os.path.join(workdir, backend)
+    embeddings = PrecomputedEmbeddings(vectors)
+    saved_ivf_min = flat_index.IVF_MIN_VECTORS
+    if backend == "numpy-ivf":
+        # Force the IVF quantizer whatever the corpus size.
+        flat_index.IVF_MIN_VECTORS = 1
+    try:
+        gc.collect()
+        rss_before = _rss_mb()
+        store = _open_store(backend, embeddings, path)
+        start = time.perf_counter()
+        for i in range(0, len(chunks), ADD_BATCH):
+            store.add_texts(
+                chunks[i : i + ADD_BATCH],
+                metadatas=[{"chunk_id": chunk_id} for chunk_id in chunk_ids[i : i + ADD_BATCH]],
+                ids=chunk_ids[i : i + ADD_BATCH],
+            )
+        index_seconds = time.perf_counter() - start
+
+        position = {chunk_id: i for i, chunk_id in enumerate(chunk_ids)}
+        latencies, recalls = [], []
+        store.similarity_search(queries[0], k=k)  # Warm caches before timing.
+        for query, expected in zip(queries, truth):
+            start = time.perf_counter()
+            hits = store.similarity_search(query, k=k)
+            latencies.append(time.perf_counter() - start)
+            found = {position.get(_hit_id(doc)) for doc in hits}
+            recalls.append(len(found & set(expected.tolist())) / k)
+        rss_after = _rss_mb()
+    finally:
+        flat_index.IVF_MIN_VECTORS = saved_ivf_min
+
+    return {
+        "index_seconds": round(index_seconds, 3),
+        "index_chunks_per_second": round(len(chunks) / index_seconds, 1) if index_seconds else None,
+        "query_latency_ms": _percentiles(latencies),
+        f"recall_at_{k}": round(float(np.mean(recalls)), 4),
+        "memory_rss_mb": round(rss_after - rss_before, 1),
+        "disk_mb": round(_disk_mb(path), 2),
+    }
+
+
+# ----------------------------------------------------------------------
+# Driver
+# ----------------------------------------------------------------------
+
+
+def run(
+    docs: int = 200,
+    queries: int = 100,
+    k: int = 5,
+    backends: Tuple[str, ...] = BACKENDS,
+    embeddings: str = "model",
+    chunk_tokens: int = chunker.CHUNK_TOKENS,
+    deduplicate: bool = True,
+    seed: int = 0,
+) -> dict:
+    """
+    Runs the benchmark.
+
+    Args:
+        docs: Documents in the synthetic corpus.
+        queries: Queries in the query set.
+        k: Results per query; recall is measured at k.
+        backends: Vector backends to measure (see BACKENDS).
+        embeddings: "model" for the configured embedding model, "hash" for
+            offline feature-hashing vectors.
+        chunk_tokens: Chunk size passed to the chunker.
+        deduplicate: Drop near-duplicate chunks before embedding, as ingestion does.
+        seed: Seed of the corpus and query generators.
+
+    Returns:
+        The results, ready for json.dump.
+    """
+    corpus = make_corpus(docs, seed)
+    corpus_bytes = sum(len(doc.encode("utf-8")) for doc in corpus)
+
+    # Deduplication runs against a throwaway agent's index, the way
+    # ingestion checks each document against the agent's growing index.
+    bench_agent = f"bench-{uuid.uuid4().hex}"
+    start = time.perf_counter()
+    chunks, chunk_ids = [], []
+    skipped = 0
+    try:
+        for d, doc in enumerate(corpus):
+            doc_chunks = chunker.chunk_text(doc, chunk_tokens)
+            doc_ids = [f"doc-{d}-{i}" for i in range(len(doc_chunks))]
+            if deduplicate:
+                source = f"doc-{d}"
+                found = dedup.find_duplicates(bench_agent, source, doc_chunks)
+                skipped += sum(match is not None for match in found)
+                doc_chunks = [text for text, match in zip(doc_chunks, found) if match is None]
+                doc_ids = [chunk_id for chunk_id, match in zip(doc_ids, found) if match is None]
+                dedup.add(bench_agent, source, doc_ids, doc_chunks)
+            chunks += doc_chunks
+            chunk_ids += doc_ids
+    finally:
+        if deduplicate:
+            dedup.drop(bench_agent)
+    chunk_seconds = time.perf_counter() - start
+
+    query_set = make_queries(chunks, queries, seed)
+    model = _model_embeddings(embeddings)
+    start = time.perf_counter()
+    chunk_vectors = np.asarray(model.embed_documents(chunks), dtype=np.float32)
+    embed_seconds = time.perf_counter() - start
+    query_vectors = np.asarray([model.embed_query(q) for q in query_set], dtype=np.float32)
+    chunk_vectors /= np.linalg.norm(chunk_vectors, axis=1, keepdims=True) + 1e-12
+    query_vectors /= np.linalg.norm(query_vectors, axis=1, keepdims=True) + 1e-12
+    vectors = dict(zip(chunks, chunk_vectors))
+    vectors.update(zip(query_set, query_vectors))
+    truth = exact_top_k(chunk_vectors, query_vectors, min(k, len(chunks)))
+
+    results = {
+        "config": {
+            "docs": docs,
+            "queries": queries,
+            "k": k,
+            "embeddings": embeddings,
+            "chunk_tokens": chunk_tokens,
+            "deduplicate": deduplicate,
+            "seed": seed,
+            "python": platform.python_version(),
+            "cpus": os.cpu_count(),
+        },
+        "corpus": {
+            "bytes": corpus_bytes,
+            "chunks": len(chunks),
+            "duplicates_skipped": skipped,
+            "chunk_seconds": round(chunk_seconds, 3),
+        },
+        "embedding": {
+            "seconds": round(embed_seconds, 3),
+            "chunks_per_second": round(len(chunks) / embed_seconds, 1) if embed_seconds else None,
+            "dimensions": int(chunk_vectors.shape[1]),
+        },
+        "backends": {},
+    }
+
+    workdir = tempfile.mkdtemp(prefix="rag-bench-")
+    try:
+        for backend in backends:
+            logger.info(f"Benchmarking {backend}")
+            try:
+                result = bench_backend(
+                    backend, chunks, chunk_ids, query_set, vectors, truth, k, workdir
+                )
+            except Exception as e:
+                logger.error(f"Backend {backend} failed: {e}")
+                results["backends"][backend] = {"error": str(e)}
+                continue
+            # End to end, as ingestion runs after extraction.
+            total = chunk_seconds + embed_seconds + result["index_seconds"]
+            result["ingest_docs_per_second"] = round(docs / total, 2) if total else None
+            result["ingest_chunks_per_second"] = round(len(chunks) / total, 1) if total else None
+            results["backends"][backend] = result
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--docs", type=int, default=200)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--backends", nargs="+", choices=BACKENDS, default=list(BACKENDS))
+    parser.add_argument("--embeddings", choices=("model", "hash"), default="model")
+    parser.add_argument("--chunk-tokens", type=int, default=chunker.CHUNK_TOKENS)
+    parser.add_argument("--no-dedup", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--out", help="Write the JSON results to this file instead of stdout")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s %(message)s")
+    results = run(
+        docs=args.docs,
+        queries=args.queries,
+        k=args.k,
+        backends=tuple(args.backends),
+        embeddings=args.embeddings,
+        chunk_tokens=args.chunk_tokens,
+        deduplicate=not args.no_dedup,
+        seed=args.seed,
+    )
+    output = json.dumps(results, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
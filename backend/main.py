@@ -8,9 +8,12 @@ from api import (
     agent_service,
     generate_controller,
     call_controller,
+    embedings_controller,
     file_controller,  # Import file controller
 )
 from api.agent_service import _agent_scheduler
+from utils import embedder, extraction, vector_store
+from utils.memory_compaction import run_compactor
 from colorlog import ColoredFormatter
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
@@ -57,6 +60,7 @@ app.include_router(call_controller.call_router, prefix="/call", tags=["call"])
 app.include_router(
     generate_controller.router, prefix="/generate", tags=["generate"]
 )
+app.include_router(embedings_controller.router, tags=["embedding"])
 
 DATA_DIR = "_data"
 UPLOAD_DIR = "_data/uploaded"
@@ -85,4 +89,15 @@ app.mount("/public", StaticFiles(directory=UPLOAD_DIR), name="static")
 async def startup_event():
     # Start the agent scheduler as a background task
     asyncio.create_task(_agent_scheduler())
+    # Fold old agent memory into per-agent digests to bound prompt size
+    asyncio.create_task(run_compactor())
+    # Load the embedding model off the event loop; /embedding/status reports it
+    asyncio.get_running_loop().run_in_executor(None, vector_store.warm_up)
     logger.info("AI Agent Builder API started")
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Stop embedding and extraction worker processes, if any were started
+    embedder.shutdown()
+    extraction.shutdown()
@@ -1,4 +1,4 @@
-from typing import List, Literal, Union, Optional
+from typing import Dict, List, Literal, Union, Optional
 from pydantic import BaseModel, Field
 from datetime import datetime
 
@@ -146,3 +146,36 @@ class AgentConfiguration(BaseModel):
         ]
     ] = Field(..., description="List of tasks")
     updates: List[UpdateType] = Field(..., description="List of updates")
+    temperature: Optional[float] = Field(None, description="Sampling temperature override for task LLM calls")
+    max_tokens: Optional[int] = Field(None, description="Max output tokens override for task LLM calls")
+
+
+# Define the MemoryRecord Model (structured agent memory, see utils/memory.py)
+class MemoryRecord(BaseModel):
+    id: int = Field(..., description="Record ID")
+    agent_id: str = Field(..., description="Owning agent ID")
+    seq: int = Field(..., description="Per-agent monotonic sequence number")
+    task_type: Optional[str] = Field(None, description="Task type that produced the record")
+    status: Optional[str] = Field(None, description="Task outcome, e.g. success or error")
+    ts: datetime = Field(..., description="When the record was written")
+    summary: str = Field(..., description="Short summary used in prompts")
+    tokens: int = Field(..., description="Estimated prompt tokens of the summary")
+    result_ref: Optional[int] = Field(None, description="Key of the full result, for memory.get_result()")
+
+
+# Define the EmbeddingJob Model (background RAG ingestion, see utils/ingest_jobs.py)
+class EmbeddingJob(BaseModel):
+    id: str = Field(..., description="Job ID")
+    agent_id: str = Field(..., description="Agent whose documents are ingested")
+    status: Literal["queued", "running", "completed", "failed", "cancelled", "interrupted"] = Field(
+        "queued", description="Job state; interrupted jobs were running when the server stopped"
+    )
+    paths: List[str] = Field(default_factory=list, description="Files to ingest besides the upload directories")
+    urls: List[str] = Field(default_factory=list, description="Web pages to ingest")
+    texts: List[str] = Field(default_factory=list, description="Raw text inputs to ingest")
+    runs: int = Field(0, description="Times the job was started, including resumes")
+    created_at: datetime = Field(..., description="When the job was submitted")
+    started_at: Optional[datetime] = Field(None, description="When the current run started")
+    finished_at: Optional[datetime] = Field(None, description="When the current run ended")
+    progress: Dict[str, int] = Field(default_factory=dict, description="Per-stage counters of the current run")
+    error: Optional[str] = Field(None, description="Why the job failed")
@@ -1,7 +1,7 @@
 from typing import List, Optional, Literal
 from datetime import datetime
 from pydantic import BaseModel, Field
-from utils import memory, gemini
+from utils import gemini, prompts
 from models import AgentConfiguration,CompetitorWatchdog
 
 
@@ -44,11 +44,11 @@ STRATEGIC_REPORT_PROMPT = """
     You are a world-class Market Strategist, responsible for analyzing competitor intelligence and deriving actionable insights to guide business decisions. Your objective is to identify key strategies, recommend action points, extract trending keywords, and highlight market gaps/opportunities based on the information provided.
 
     Task Overview:
-    Analyze the following competitor intelligence data to generate a comprehensive strategic report:
-    {intel_data}
+    Analyze the competitor intelligence data below to generate a comprehensive strategic report.
 
     Competitor Intelligence Data:
-    {intel_data} (This is a structured report containing the latest updates from competitor websites. The report is organized by website and includes key information such as new features, products, pricing changes, and marketing initiatives.)
+    (This is a structured report containing the latest updates from competitor websites. The report is organized by website and includes key information such as new features, products, pricing changes, and marketing initiatives.)
+    {intel_data}
 
     Output Requirements:
     Your output MUST adhere to the following format:
@@ -85,27 +85,34 @@ STRATEGIC_REPORT_PROMPT = """
     - Actionable Insights: The ultimate goal is to provide actionable insights that can be used to improve the business. Focus on providing concrete suggestions and recommendations.
 """
 
+prompts.register("competitor_watchdog.intelligence", COMPETITOR_INTELLIGENCE_PROMPT)
+prompts.register("competitor_watchdog.strategy", STRATEGIC_REPORT_PROMPT)
+
 
 # ========================= HANDLER FUNCTION ==========================
 async def handle_competitor_watchdog(task: CompetitorWatchdog, agent_config: AgentConfiguration):
     
     try:
         # --------- Agent 1: Competitor Intelligence Gathering ---------
-        intel_prompt = COMPETITOR_INTELLIGENCE_PROMPT.format(
+        intel_prompt = prompts.render(
+            "competitor_watchdog.intelligence",
             websites="\n".join(task.websites)
         )
         competitor_intel = await gemini.generate_text(
             intel_prompt,
+            task_class="extraction",
             temperature=agent_config.temperature,
             max_output_tokens=agent_config.max_tokens
         )
 
         # --------- Agent 2: Strategic Report Generation ---------
-        strategy_prompt = STRATEGIC_REPORT_PROMPT.format(
+        strategy_prompt = prompts.render(
+            "competitor_watchdog.strategy",
             intel_data=competitor_intel
         )
         strategy_report = await gemini.generate_text(
             strategy_prompt,
+            task_class="synthesis",
             temperature=agent_config.temperature,
             max_output_tokens=agent_config.max_tokens
         )
@@ -120,7 +127,6 @@ async def handle_competitor_watchdog(task: CompetitorWatchdog, agent_config: Age
 
     except Exception as e:
         error_message = f"[Competitor Watchdog ERROR] {str(e)}"
-        memory.put(task.type, error_message)
         return {
             "task": task.type,
             "status": "error",
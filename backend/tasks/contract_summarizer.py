@@ -1,17 +1,18 @@
 
 from models import ContractSummarizer, AgentConfiguration
-from utils import gemini, memory
+from utils import gemini, prompts, rag_context
 
 # ================== CONTRACT SUMMARIZATION PROMPT ==================
 CONTRACT_SUMMARIZER_PROMPT = """
     You are a highly specialized contract summarization assistant, possessing expertise in legal and business document analysis. Your objective is to extract the most critical information from a contract and present it in a clear, concise, and actionable format for business executives and legal advisors. You must focus on providing insights that directly impact business decisions and legal strategy.
 
     Task Overview:
-    Analyze the contract provided at the following source URL: {source_url} and generate a comprehensive summary that highlights key clauses, terms, conditions, obligations, and responsibilities. The contract pertains to the following domain: {domain_type}
+    Analyze the contract excerpts provided below and generate a comprehensive summary that highlights key clauses, terms, conditions, obligations, and responsibilities.
 
     Contract Details:
-    - Source URL: {source_url} (This is the URL or accessible file path to the contract document. If the URL leads to a website, you are to extract the contract text from it. Assume there is a contract available at this location. If unable to access, respond "Could not access the contract at the given URL.").
-    - Domain Type: {domain_type} (This indicates the area of law or business the contract covers. Examples: "Software License Agreement", "Real Estate Purchase Agreement", "Employment Agreement", "Merger and Acquisition Agreement". Tailor your summarization to focus on aspects relevant to this domain.)
+    - Source URL: {source_url} (The URL or file path the contract was retrieved from.)
+    - Contract Excerpts: The passages of the contract most relevant to this summary, numbered [1], [2], ... (If no excerpts are given, respond "Could not access the contract at the given URL.").
+    - Domain Type: Infer the area of law or business the contract covers from its content. Examples: "Software License Agreement", "Real Estate Purchase Agreement", "Employment Agreement", "Merger and Acquisition Agreement". Tailor your summarization to focus on aspects relevant to this domain.
 
     Output Requirements:
 
@@ -50,22 +51,39 @@ CONTRACT_SUMMARIZER_PROMPT = """
     Example:
 
     (If the contract is a Software License Agreement, focus on licensing terms, usage restrictions, liability limitations, and intellectual property ownership).
+
+    Contract Excerpts:
+    {contract_text}
 """
 
+prompts.register("contract_summarizer.summary", CONTRACT_SUMMARIZER_PROMPT)
+
+# Retrieval query for the passages the summary needs.
+CONTRACT_QUERY = (
+    "parties obligations responsibilities payment terms fees liability indemnification "
+    "termination intellectual property confidentiality dispute resolution governing law"
+)
+
 # ================== CONTRACT SUMMARIZER HANDLER ====================
 async def handle_contract_summarizer(task: ContractSummarizer, agent_config: AgentConfiguration):
-    await memory.save_task(task.type, task.model_dump())
     output_result = ""
     status = "failed"
 
     try:
-        summarizer_prompt = CONTRACT_SUMMARIZER_PROMPT.format(
+        # Only the contract's relevant passages reach the prompt. If it cannot
+        # be read, the prompt reports that rather than summarizing other
+        # documents of the agent as if they were the contract.
+        contract_text = await rag_context.source_passages(task.source_url, CONTRACT_QUERY)
+
+        summarizer_prompt = prompts.render(
+            "contract_summarizer.summary",
             source_url=task.source_url,
-            domain_type=task.domain_type
+            contract_text=contract_text,
         )
 
         output_result = await gemini.generate_text(
             summarizer_prompt,
+            task_class="synthesis",
             temperature=agent_config.temperature,
             max_output_tokens=agent_config.max_tokens
         )
@@ -5,7 +5,7 @@ from typing import Optional
 
 
 from models import AgentConfiguration
-from utils import gemini, memory
+from utils import gemini, memory, prompts
 
 # ========== PROMPT TEMPLATE ==========
 
@@ -13,7 +13,7 @@ CUSTOMER_FEEDBACK_ANALYSIS_PROMPT = """
     You are a world-class Customer Feedback Analysis Agent, renowned for your ability to extract actionable insights from product reviews. Your mission is to analyze customer feedback from various sources and provide a comprehensive report that identifies key sentiments, trends, and areas for improvement. Your insights will directly impact product development, marketing strategies, and customer satisfaction initiatives.
 
     Task Overview:
-    Analyze customer feedback for the product: {product_name}, collected from the following source: {feedback_source}. Classify the reviews into three categories: Top 10 Positive Reviews, Top 10 Negative Reviews, and 10 Mediocre/Neutral Reviews. For each review, provide a concise explanation of why it was classified into that category. Conclude with a summary of key findings and actionable recommendations.
+    Analyze customer feedback for the product and feedback source given below. Classify the reviews into three categories: Top 10 Positive Reviews, Top 10 Negative Reviews, and 10 Mediocre/Neutral Reviews. For each review, provide a concise explanation of why it was classified into that category. Conclude with a summary of key findings and actionable recommendations.
 
     Feedback Details:
     - Product Name: {product_name} (The name of the product being reviewed.)
@@ -29,6 +29,9 @@ CUSTOMER_FEEDBACK_ANALYSIS_PROMPT = """
         *   If Text Input: Access the 'feedback_text' directly. Assume each review is separated by a newline character ("\n").
     - Number of reviews to parse: 30
 
+    Feedback Data:
+    {reviews}
+
     Output Requirements:
     Your output MUST adhere to the following format:
 
@@ -67,6 +70,8 @@ CUSTOMER_FEEDBACK_ANALYSIS_PROMPT = """
         - *Your report should be less than 500 words.*
 """
 
+prompts.register("customer_feedback_analyzer.analysis", CUSTOMER_FEEDBACK_ANALYSIS_PROMPT)
+
 # ========== SCRAPER HELPERS ==========
 
 def scrape_reviews_from_google(product_name: str, max_reviews=20) -> str:
@@ -97,9 +102,14 @@ async def handle_customer_feedback_analyzer(product_name: str, agent_config: Age
    
 
     # Build prompt
-    prompt = CUSTOMER_FEEDBACK_ANALYSIS_PROMPT.format(product_name=product_name, reviews=all_reviews)
+    prompt = prompts.render(
+        "customer_feedback_analyzer.analysis",
+        product_name=product_name,
+        feedback_source="Text Input (Google and Amazon reviews)",
+        reviews=all_reviews,
+    )
 
     # Generate analysis report
-    analysis_report = await gemini.generate_text(prompt)
+    analysis_report = await gemini.generate_text(prompt, task_class="extraction")
 
     return analysis_report
@@ -1,5 +1,5 @@
 from models import MeetingSummarizer, AgentConfiguration
-from utils import gemini
+from utils import gemini, prompts
 
 
 # ================== MEETING SUMMARIZER PROMPT TEMPLATE ==================
@@ -7,7 +7,7 @@ MEETING_SUMMARIZER_PROMPT = """
     You are a state-of-the-art AI Meeting Analyst, possessing advanced skills in audio and video analysis, natural language processing, and discourse understanding. Your mission is to transform a meeting recording into a comprehensive, structured, and actionable summary, capturing key decisions, action items, discussion points, and potential issues – even when faced with imperfect recording quality.
 
     Task Overview:
-    Analyze the meeting recording located at the following source URL: {source_url}. Your goal is to extract and synthesize the most important information from the meeting and present it in a clear, concise, and highly structured format suitable for executive reporting. Prioritize clarity, accuracy, and actionability.
+    Analyze the meeting recording located at the source URL given below. Your goal is to extract and synthesize the most important information from the meeting and present it in a clear, concise, and highly structured format suitable for executive reporting. Prioritize clarity, accuracy, and actionability.
 
     Meeting Details:
     - Recording Source: Please note that the recording comes from the given source URL : {source_url} .
@@ -64,14 +64,18 @@ MEETING_SUMMARIZER_PROMPT = """
         *   Unclear Segment: Discussion about the competitive landscape was difficult to understand due to background noise.
         *   Unclear Segment: A point made by Jane at the start of the meeting concerning an updated marketing plan, Sentiment: Unclear.
 """
+
+prompts.register("meeting_summarizer.summary", MEETING_SUMMARIZER_PROMPT)
+
 # ================== MEETING SUMMARIZER HANDLER ====================
 async def handle_meeting_summarizer(task: MeetingSummarizer, agent_config: AgentConfiguration):
 
-    prompt = MEETING_SUMMARIZER_PROMPT.format(
+    prompt = prompts.render(
+        "meeting_summarizer.summary",
         source_url=task.source_url
     )
 
-    summary_output = await gemini.generate_text(prompt)
+    summary_output = await gemini.generate_text(prompt, task_class="synthesis")
 
     return {
         "task": task.type,
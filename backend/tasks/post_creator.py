@@ -9,23 +9,19 @@ from models import (
     PostCreator,
     AgentConfiguration,
 )  # Assumed to be defined with required fields
-from utils import (
-    gemini,
-    memory,
-)  # gemini.generate_text, gemini.generate_json, memory.put, memory.get_latest
+from utils import gemini  # gemini.generate_text, gemini.generate_json
 
 
 # ==== POST CREATION FUNCTION ====
-async def create_post(post_input: PostCreator) -> dict:
+async def create_post(post_input: PostCreator, agent_id: str) -> dict:
     """
     Creates a post by generating an image, a caption, and hashtags
     based solely on the PostCreator model. Uses Gemini functions to
-    generate text and JSON outputs. Also stores the generated result
-    in memory.
+    generate text and JSON outputs. The result is recorded in memory by
+    the task runner.
 
     Returns:
-        dict: Contains the image path, caption, hashtags, and the
-              memory entry.
+        dict: Contains the image path, caption and hashtags.
     """
 
     prompt = f"""
@@ -93,7 +89,7 @@ async def create_post(post_input: PostCreator) -> dict:
     ```
     """
     try:
-        output = await gemini.generate_json(prompt.strip())
+        output = await gemini.generate_json(prompt.strip(), task_class="drafting")
         # output = json.loads(raw_json)
         image_prompt = output.get("image_prompt", "")
         caption = output.get("caption", "")
@@ -108,11 +104,6 @@ async def create_post(post_input: PostCreator) -> dict:
     encoded_prompt = urllib.parse.quote(image_prompt.strip())
     url = f"https://image.pollinations.ai/prompt/{encoded_prompt}"
 
-
-    # Save the generated content to memory
-    memory_entry = f"Caption: {caption} | Hashtags: {hashtags}"
-    memory.put("post_creator", memory_entry)
-
     return {
         "image": url,
         "caption": caption,
@@ -133,7 +124,7 @@ async def handle_post_creator(task: PostCreator, ai_config: AgentConfiguration):
         dict: A JSON object containing the image path, caption, and
               hashtags.
     """
-    result = await create_post(task)
+    result = await create_post(task, ai_config.id)
     output = {
         "system_prompt": {
             "image": result["image"],
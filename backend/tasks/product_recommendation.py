@@ -1,12 +1,10 @@
-import csv
 import os
 from datetime import datetime
 from typing import Optional
-import fitz  # PyMuPDF
 import requests
 from bs4 import BeautifulSoup
 from models import AgentConfiguration, ProductRecommendation
-from utils import gemini, memory
+from utils import extraction, gemini, memory, prompts, rag_context
 
 # ========== PROMPT TEMPLATES ==========
 
@@ -52,6 +50,9 @@ RECOMMENDATION_AGENT_PROMPT = """
     Product Data Summary:
     {product_data} (This is a summary of key product insights gathered from various sources, including website reviews, CSV datasets, company PDF reports, and user data types.)
 
+    Relevant Company Documents:
+    {document_context} (Numbered passages retrieved from the agent's documents that relate to these products. May be empty.)
+
     Expected Output:
     Generate a recommendation report including the following sections:
 
@@ -73,22 +74,16 @@ RECOMMENDATION_AGENT_PROMPT = """
 
 """
 
+prompts.register("product_recommendation.data", DATA_AGENT_PROMPT)
+prompts.register("product_recommendation.recommendation", RECOMMENDATION_AGENT_PROMPT)
+
 
 # ========== CSV HANDLER ==========
 
 
-def extract_text_from_csv(csv_path, max_rows=20):
+async def extract_text_from_csv(csv_path, max_rows=20):
     try:
-        lines = []
-        with open(csv_path, newline="", encoding="utf-8") as csvfile:
-            reader = csv.reader(csvfile)
-            headers = next(reader)
-            lines.append(f"CSV Headers: {headers}")
-            for i, row in enumerate(reader):
-                lines.append(f"Row {i + 1}: {row}")
-                if i >= max_rows:
-                    break
-        return "\n".join(lines)
+        return await extraction.aextract(csv_path, fmt="csv", max_rows=max_rows)
     except Exception as e:
         return f"Error reading CSV: {e}"
 
@@ -96,13 +91,10 @@ def extract_text_from_csv(csv_path, max_rows=20):
 # ========== PDF HANDLER ==========
 
 
-def extract_text_from_pdf(pdf_path):
+async def extract_text_from_pdf(pdf_path):
+    # Cached by content hash, so scheduled runs over the same report skip parsing.
     try:
-        doc = fitz.open(pdf_path)
-        text = ""
-        for page in doc:
-            text += page.get_text()
-        return text
+        return await extraction.aextract(pdf_path, fmt="pdf")
     except Exception as e:
         return f"Error extracting PDF content: {e}"
 
@@ -125,17 +117,25 @@ def scrape_reviews_from_website(source_url, max_reviews=10):
 # ========== AGENT 1: DATA COLLECTION ==========
 
 
+def _products_query(task: ProductRecommendation) -> str:
+    return (
+        f"{', '.join(task.products)} customer reviews sentiment preferences "
+        "sales usage trends market competition"
+    )
+
+
 async def product_data_agent(task: ProductRecommendation):
     reviews_text = scrape_reviews_from_website(task.source_url)
 
     csv_text = (
-        extract_text_from_csv(task.uploaded_csv_path) if task.uploaded_csv_path else ""
+        await extract_text_from_csv(task.uploaded_csv_path) if task.uploaded_csv_path else ""
     )
     pdf_text = (
-        extract_text_from_pdf(task.company_pdf_path) if task.company_pdf_path else ""
+        await extract_text_from_pdf(task.company_pdf_path) if task.company_pdf_path else ""
     )
 
-    prompt = DATA_AGENT_PROMPT.format(
+    prompt = prompts.render(
+        "product_recommendation.data",
         products=", ".join(task.products),
         source_url=task.source_url if task.source_url else "Not provided",
         user_data_source=task.user_data_source,
@@ -153,18 +153,23 @@ async def product_data_agent(task: ProductRecommendation):
 {pdf_text}
 """
 
-    data_summary = await gemini.generate_text(combined_input)
+    data_summary = await gemini.generate_text(combined_input, task_class="extraction")
     return data_summary
 
 
 # ========== AGENT 2: STRATEGIC RECOMMENDATION ==========
 
 
-async def product_recommendation_agent(id, task: ProductRecommendation):
-    product_data = memory.get_all("product_data_summary")
+async def product_recommendation_agent(agent_config: AgentConfiguration, task: ProductRecommendation):
+    product_data = await memory.aget_all(agent_config.id, task_type="product_data_summary")
+    document_context = await rag_context.build_context(agent_config, _products_query(task))
 
-    prompt = RECOMMENDATION_AGENT_PROMPT + f"\n\n[Product Data Summary]\n{product_data}"
-    recommendation = await gemini.generate_text(prompt)
+    prompt = prompts.render(
+        "product_recommendation.recommendation",
+        product_data=product_data,
+        document_context=document_context,
+    )
+    recommendation = await gemini.generate_text(prompt, task_class="synthesis")
     return recommendation
 
 
@@ -177,7 +182,6 @@ async def handle_product_recommendation(
     """
     Runs product recommendation flow using Gemini-based agents.
     """
-    agent_id = agent_config.id
     # data_summary = await product_data_agent(task)
-    final_recommendation = await product_recommendation_agent(agent_id, task)
+    final_recommendation = await product_recommendation_agent(agent_config, task)
     return final_recommendation
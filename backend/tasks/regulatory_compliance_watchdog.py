@@ -2,7 +2,7 @@
 from typing import List, Optional, Literal
 from datetime import datetime
 from pydantic import BaseModel, Field
-from utils import memory, gemini
+from utils import gemini, prompts
 from models import AgentConfiguration,RegulatoryComplianceWatchdog
 
 
@@ -47,11 +47,11 @@ COMPLIANCE_STRATEGY_PROMPT = """
     You are a world-class Compliance Strategist, responsible for reviewing regulatory updates and developing actionable strategies to ensure business compliance. Your objective is to analyze the impact of regulatory changes and provide concrete recommendations for how businesses can adapt to meet the new requirements.
 
     Task Overview:
-    Analyze the following regulatory updates to generate a comprehensive compliance strategy report:
-    {compliance_data}
+    Analyze the regulatory updates below to generate a comprehensive compliance strategy report.
 
     Regulatory Update Data:
-    {compliance_data} (This is a structured report containing the latest updates from regulatory bodies. The report includes information on new rules, enforcement actions, and policy modifications.)
+    (This is a structured report containing the latest updates from regulatory bodies. The report includes information on new rules, enforcement actions, and policy modifications.)
+    {compliance_data}
 
     Output Requirements:
     Your output MUST adhere to the following format:
@@ -87,30 +87,35 @@ COMPLIANCE_STRATEGY_PROMPT = """
     - Actionable Insights: Focus on providing concrete suggestions and recommendations for improving the business.
 """
 
+prompts.register("regulatory_compliance_watchdog.monitor", COMPLIANCE_MONITOR_PROMPT)
+prompts.register("regulatory_compliance_watchdog.strategy", COMPLIANCE_STRATEGY_PROMPT)
+
 
 async def handle_regulatory_compliance_watchdog(task: RegulatoryComplianceWatchdog, agent_config: AgentConfiguration):
     
 
     try:
         # -------- Agent 1: Monitor Updates --------
-        monitor_prompt = COMPLIANCE_MONITOR_PROMPT.format(
+        monitor_prompt = prompts.render(
+            "regulatory_compliance_watchdog.monitor",
             bodies="\n".join(task.regulatory_bodies),
             keywords=", ".join(task.keywords)
         )
         compliance_updates = await gemini.generate_text(
             monitor_prompt,
+            task_class="extraction",
             temperature=agent_config.temperature,
             max_output_tokens=agent_config.max_tokens
         )
 
-        memory.put(task.type, "Compliance Updates:\n" + compliance_updates)
-
         # -------- Agent 2: Strategic Compliance Report --------
-        strategy_prompt = COMPLIANCE_STRATEGY_PROMPT.format(
+        strategy_prompt = prompts.render(
+            "regulatory_compliance_watchdog.strategy",
             compliance_data=compliance_updates
         )
         strategy_report = await gemini.generate_text(
             strategy_prompt,
+            task_class="synthesis",
             temperature=agent_config.temperature,
             max_output_tokens=agent_config.max_tokens
         )
@@ -127,7 +132,6 @@ async def handle_regulatory_compliance_watchdog(task: RegulatoryComplianceWatchd
 
     except Exception as e:
         error_msg = f"[Regulatory Compliance Watchdog ERROR] {str(e)}"
-        memory.put(task.type, error_msg)
         return {
             "task": task.type,
             "status": "error",
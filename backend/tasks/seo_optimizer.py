@@ -13,7 +13,7 @@ async def handle_seo_optimizer(task: SEOOptimizer, agent_config):
     agent_id = agent_config.id
 
     # Retrieve previous optimization context if available
-    previous_optimization = memory.get_latest(agent_id) or ""
+    previous_optimization = await memory.aget_latest(agent_id, task.type) or ""
 
     # Optimize the blog content
     optimized_content = await optimize_blog_content(
@@ -75,7 +75,7 @@ async def optimize_blog_content(content, keywords, previous_optimization=""):
 
     # Generate optimized blog content
     optimized_content = await gemini.generate_text(
-        prompt=prompt, system_prompt=system_prompt
+        prompt=prompt, system_prompt=system_prompt, task_class="drafting"
     )
 
     return optimized_content
@@ -116,6 +116,7 @@ async def analyze_keyword_density(content, keywords):
     analysis_result = await gemini.generate_text(
         prompt=prompt,
         system_prompt="You are an SEO keyword analyst. Provide accurate, detailed keyword analysis in the requested format.",
+        task_class="extraction",
     )
 
     return analysis_result
@@ -155,6 +156,7 @@ async def generate_seo_recommendations(content, keywords):
     recommendations = await gemini.generate_text(
         prompt=prompt,
         system_prompt="You are an SEO consultant providing practical, specific recommendations to improve content performance.",
+        task_class="drafting",
     )
 
     return recommendations
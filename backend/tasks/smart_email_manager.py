@@ -1,6 +1,6 @@
 import os
 from models import SmartEmailManager, AgentConfiguration
-from utils import gemini, memory, email_utils
+from utils import gemini, memory, email_utils, prompts
 
 
 # ======================== PROMPT TEMPLATE ===========================
@@ -10,7 +10,14 @@ EMAIL_CREATION_PROMPT = """
     Task Overview:
     Create an email to be sent by a poject leader with the following characteristics:
 
-    
+    - Company Name: {company_name}
+    - Action: {action}
+    - Tone: {tone}
+    - Sender Role: {role}
+    - Subject: {subject}
+    - Word Limit: {word_limit}
+    - Custom Inclusions: {custom_inclusions}
+    - Context: {context}
 
     Email Requirements:
 
@@ -39,6 +46,9 @@ EMAIL_CREATION_PROMPT = """
     (If role is HR, subject = 'Important HR Policy Update', Email begins 'Dear Employees,').
     (If role is Sales Lead, subject = 'Exclusive Opportunity for [Recipient Name]', Email begins with a personalized greeting).
 """
+
+prompts.register("smart_email_manager.create", EMAIL_CREATION_PROMPT)
+
 # ========================= AGENT HANDLER ============================
 async def handle_smart_email_manager(task: SmartEmailManager, agent_config: AgentConfiguration):
     output_result = ""
@@ -46,7 +56,8 @@ async def handle_smart_email_manager(task: SmartEmailManager, agent_config: Agen
 
     if task.action == "Send":
         try:
-            email_prompt = EMAIL_CREATION_PROMPT.format(
+            email_prompt = prompts.render(
+                "smart_email_manager.create",
                 company_name=task.company_name or "your organization",
                 action=task.action,
                 tone=task.tone or "professional",
@@ -57,7 +68,7 @@ async def handle_smart_email_manager(task: SmartEmailManager, agent_config: Agen
                 context=task.body or "No context provided"
             )
 
-            output_result = await gemini.generate_text(email_prompt, temperature=agent_config.temperature, max_output_tokens=agent_config.max_tokens)
+            output_result = await gemini.generate_text(email_prompt, task_class="drafting", temperature=agent_config.temperature, max_output_tokens=agent_config.max_tokens)
 
             # ✅ Send email after generation
             email_utils.send_email(
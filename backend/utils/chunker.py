@@ -0,0 +1,180 @@
+# ai_agent_builder/utils/chunker.py
+import logging
+import os
+import re
+import threading
+from collections import Counter
+from typing import List, Optional, Set, Tuple
+
+from utils.prompts import CHARS_PER_TOKEN, estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Chunk size in embedding-model tokens. all-MiniLM-L6-v2 truncates its input
+# at 256 tokens, so longer chunks would be embedded only partially; the margin
+# leaves room for the special tokens and the heading prepended to each chunk.
+CHUNK_TOKENS = int(os.getenv("CHUNK_TOKENS", 240))
+
+# Tokenizer of the embedding model; "name" alone means a sentence-transformers model.
+TOKENIZER_MODEL = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+
+# Headings: markdown, bold-only lines, numbered ("4.2 Termination") and
+# all-caps ("TERMINATION OF AGREEMENT") lines.
+_HEADING_RE = re.compile(
+    r"^(?:#{1,6}\s+\S.*"
+    r"|\*\*[^*\n]{2,80}\*\*:?"
+    r"|\d+(?:\.\d+)*\.?\s+[A-Z][^\n.]{1,80}"
+    r"|[A-Z][A-Z0-9 ,&/()\-]{3,80})$"
+)
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s+")
+_DIGITS_RE = re.compile(r"\d+")
+
+# Marks a page break in extracted text (see utils/extraction.py).
+PAGE_BREAK = "\f"
+
+_tokenizer_lock = threading.Lock()
+_tokenizer = None
+_tokenizer_failed = False
+
+
+def _get_tokenizer():
+    global _tokenizer, _tokenizer_failed
+    with _tokenizer_lock:
+        if _tokenizer is None and not _tokenizer_failed:
+            try:
+                from transformers import AutoTokenizer
+
+                name = TOKENIZER_MODEL if "/" in TOKENIZER_MODEL else f"sentence-transformers/{TOKENIZER_MODEL}"
+                _tokenizer = AutoTokenizer.from_pretrained(name)
+            except Exception as e:
+                # Chunks are then sized with the character estimate instead.
+                _tokenizer_failed = True
+                logger.warning(f"Could not load tokenizer for {TOKENIZER_MODEL}, estimating tokens: {e}")
+    return _tokenizer
+
+
+def count_tokens(texts: List[str]) -> List[int]:
+    """Counts the embedding-model tokens of each text, without special tokens."""
+    tokenizer = _get_tokenizer()
+    if tokenizer is None:
+        return [estimate_tokens(text) for text in texts]
+    if not texts:
+        return []
+    return [len(ids) for ids in tokenizer(texts, add_special_tokens=False)["input_ids"]]
+
+
+def _cut(text: str, max_tokens: int) -> List[str]:
+    """Cuts text without usable sentence breaks into pieces of max_tokens."""
+    tokenizer = _get_tokenizer()
+    if tokenizer is None:
+        step = max_tokens * CHARS_PER_TOKEN
+        return [text[i : i + step] for i in range(0, len(text), step)]
+    offsets = tokenizer(text, add_special_tokens=False, return_offsets_mapping=True)["offset_mapping"]
+    pieces = []
+    for start in range(0, len(offsets), max_tokens):
+        window = offsets[start : start + max_tokens]
+        end = offsets[start + max_tokens][0] if start + max_tokens < len(offsets) else len(text)
+        pieces.append(text[window[0][0] : end])
+    return pieces
+
+
+def _line_key(line: str) -> str:
+    # "Page 3 of 10" and "Page 4 of 10" are the same running footer.
+    return _DIGITS_RE.sub("#", line.lower())
+
+
+def _running_lines(pages: List[str]) -> Set[str]:
+    """
+    Keys of the short lines found on at least half of the pages (and at
+    least 3): running headers, footers and page numbers.
+    """
+    if len(pages) < 3:
+        return set()
+    counts = Counter()
+    for page in pages:
+        counts.update(
+            {_line_key(line.strip()) for line in page.splitlines() if 0 < len(line.strip()) <= 100}
+        )
+    minimum = max(3, len(pages) // 2)
+    return {key for key, count in counts.items() if count >= minimum}
+
+
+def _blocks(text: str) -> List[Tuple[Optional[str], List[str]]]:
+    """
+    Parses text into sections: (heading, paragraphs). Paragraphs end at
+    blank lines and page breaks; headings start a new section. Running
+    headers and footers of paged text are left out.
+    """
+    sections: List[Tuple[Optional[str], List[str]]] = [(None, [])]
+    lines: List[str] = []
+
+    def end_paragraph():
+        if lines:
+            sections[-1][1].append(" ".join(lines))
+            lines.clear()
+
+    pages = text.split(PAGE_BREAK)
+    running = _running_lines(pages)
+    for page in pages:
+        for raw in page.splitlines():
+            line = raw.strip()
+            if line and _line_key(line) in running:
+                continue
+            if not line:
+                end_paragraph()
+            elif len(line) <= 100 and _HEADING_RE.match(line):
+                end_paragraph()
+                sections.append((line.strip("#* :"), []))
+            else:
+                lines.append(line)
+        end_paragraph()
+    return [(heading, paragraphs) for heading, paragraphs in sections if paragraphs]
+
+
+def _units(paragraphs: List[str], max_tokens: int) -> List[Tuple[str, int]]:
+    """Paragraphs with their token counts; oversized ones split into sentences, then cut."""
+    units = []
+    for paragraph, tokens in zip(paragraphs, count_tokens(paragraphs)):
+        if tokens <= max_tokens:
+            units.append((paragraph, tokens))
+            continue
+        sentences = _SENTENCE_END_RE.split(paragraph)
+        for sentence, sentence_tokens in zip(sentences, count_tokens(sentences)):
+            if sentence_tokens <= max_tokens:
+                units.append((sentence, sentence_tokens))
+            else:
+                pieces = _cut(sentence, max_tokens)
+                units.extend(zip(pieces, count_tokens(pieces)))
+    return units
+
+
+def chunk_text(text: str, max_tokens: int = CHUNK_TOKENS) -> List[str]:
+    """
+    Splits text into chunks of at most max_tokens embedding-model tokens,
+    along its structure: a chunk never spans two sections, holds whole
+    paragraphs where they fit, and otherwise whole sentences. Each chunk
+    starts with its section heading, so it is retrievable on its own.
+
+    Args:
+        text: The text; page breaks are "\\f".
+        max_tokens: Chunk size, including the heading.
+
+    Returns:
+        The chunks, in document order.
+    """
+    chunks = []
+    for heading, paragraphs in _blocks(text):
+        prefix = f"{heading}\n" if heading else ""
+        budget = max(1, max_tokens - (count_tokens([prefix])[0] if prefix else 0))
+        current: List[str] = []
+        used = 0
+        for unit, tokens in _units(paragraphs, budget):
+            # +1 for the separator between units.
+            if current and used + tokens + 1 > budget:
+                chunks.append(prefix + "\n".join(current))
+                current, used = [], 0
+            current.append(unit)
+            used += tokens + 1
+        if current:
+            chunks.append(prefix + "\n".join(current))
+    return chunks
@@ -0,0 +1,292 @@
+# ai_agent_builder/utils/dedup.py
+import hashlib
+import logging
+import os
+import re
+import sqlite3
+import threading
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+INDEX_DIR = os.path.join("_data", "rag")
+INDEX_DB_PATH = os.path.join(INDEX_DIR, "signatures.db")
+
+if not os.path.exists(INDEX_DIR):
+    os.makedirs(INDEX_DIR)
+
+# Chunks whose estimated Jaccard similarity (over word shingles) with an
+# already indexed chunk reaches this are not embedded again.
+THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", 0.8))
+
+# Words per shingle.
+SHINGLE_SIZE = 5
+
+# MinHash signature of NUM_PERM hashes, banded for LSH into BANDS bands of
+# NUM_PERM / BANDS rows. Two chunks become candidates when any band matches;
+# with 16 x 8 that is likely above ~0.7 similarity and rare below ~0.5.
+NUM_PERM = 128
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+
+# Fixed seed: signatures are persisted and must be comparable across runs.
+_rng = np.random.RandomState(1)
+_A = _rng.randint(1, (1 << 61) - 1, size=NUM_PERM, dtype=np.uint64)
+_B = _rng.randint(0, (1 << 61) - 1, size=NUM_PERM, dtype=np.uint64)
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def _shingle_hashes(text: str) -> np.ndarray:
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < SHINGLE_SIZE:
+        shingles = {" ".join(words)}
+    else:
+        shingles = {" ".join(words[i : i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+    # Stable across processes, unlike hash().
+    return np.fromiter(
+        (
+            int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little")
+            for s in shingles
+        ),
+        dtype=np.uint64,
+        count=len(shingles),
+    )
+
+
+def signature(text: str) -> np.ndarray:
+    """MinHash signature (NUM_PERM uint32 values) of a text's word shingles."""
+    hashes = _shingle_hashes(text)
+    # (a * h + b) mod p, truncated to 32 bits, for every permutation at once.
+    permuted = (np.outer(hashes, _A) + _B) % _MERSENNE_PRIME & _MAX_HASH
+    return permuted.min(axis=0).astype(np.uint32)
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of the texts two signatures came from."""
+    return float(np.count_nonzero(a == b)) / NUM_PERM
+
+
+def _band_keys(sig: np.ndarray) -> List[Tuple[int, bytes]]:
+    return [(band, sig[band * ROWS : (band + 1) * ROWS].tobytes()) for band in range(BANDS)]
+
+
+class _AgentIndex:
+    """In-memory LSH index over one agent's chunk signatures."""
+
+    def __init__(self):
+        self.buckets: Dict[Tuple[int, bytes], Set[str]] = defaultdict(set)
+        self.signatures: Dict[str, np.ndarray] = {}
+        self.sources: Dict[str, str] = {}
+
+    def add(self, chunk_id: str, source: str, sig: np.ndarray):
+        if chunk_id in self.signatures:
+            self.remove(chunk_id)
+        for key in _band_keys(sig):
+            self.buckets[key].add(chunk_id)
+        self.signatures[chunk_id] = sig
+        self.sources[chunk_id] = source
+
+    def remove(self, chunk_id: str):
+        sig = self.signatures.pop(chunk_id, None)
+        if sig is None:
+            return
+        self.sources.pop(chunk_id, None)
+        for key in _band_keys(sig):
+            bucket = self.buckets.get(key)
+            if bucket is not None:
+                bucket.discard(chunk_id)
+                if not bucket:
+                    del self.buckets[key]
+
+    def match(self, sig: np.ndarray, exclude_source: Optional[str] = None) -> Optional[str]:
+        """Returns an indexed chunk similar to sig, ignoring chunks of exclude_source."""
+        candidates = set()
+        for key in _band_keys(sig):
+            candidates |= self.buckets.get(key, set())
+        for chunk_id in candidates:
+            if self.sources[chunk_id] == exclude_source:
+                continue
+            if similarity(sig, self.signatures[chunk_id]) >= THRESHOLD:
+                return chunk_id
+        return None
+
+
+# Signatures are persisted; the LSH buckets are rebuilt in memory the first
+# time an agent's index is used in this process.
+_lock = threading.Lock()
+_conn: Optional[sqlite3.Connection] = None
+_indexes: Dict[str, _AgentIndex] = {}
+
+
+def _connect() -> sqlite3.Connection:
+    global _conn
+    if _conn is None:
+        _conn = sqlite3.connect(INDEX_DB_PATH, check_same_thread=False)
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS chunk_signatures (
+                agent_id TEXT NOT NULL,
+                chunk_id TEXT NOT NULL,
+                source TEXT NOT NULL,
+                signature BLOB NOT NULL,
+                PRIMARY KEY (agent_id, chunk_id)
+            ) WITHOUT ROWID
+        """
+        )
+        # A source's chunks skipped as duplicates of another source's chunk:
+        # when that chunk is deleted the source must be indexed again.
+        _conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS chunk_references (
+                agent_id TEXT NOT NULL,
+                chunk_id TEXT NOT NULL,
+                source TEXT NOT NULL,
+                PRIMARY KEY (agent_id, chunk_id, source)
+            ) WITHOUT ROWID
+        """
+        )
+    return _conn
+
+
+def _index(agent_id: str) -> _AgentIndex:
+    # Callers hold _lock.
+    index = _indexes.get(agent_id)
+    if index is None:
+        index = _AgentIndex()
+        for chunk_id, source, blob in _connect().execute(
+            "SELECT chunk_id, source, signature FROM chunk_signatures WHERE agent_id = ?", (agent_id,)
+        ):
+            index.add(chunk_id, source, np.frombuffer(blob, dtype=np.uint32))
+        _indexes[agent_id] = index
+    return index
+
+
+def find_duplicates(agent_id: str, source: str, texts: List[str]) -> List[Optional[str]]:
+    """
+    Checks a document's chunks against the agent's indexed chunks (other than
+    the document's own previous chunks, which it replaces) and against each
+    other.
+
+    Args:
+        agent_id: The agent whose index is checked.
+        source: The document the chunks come from.
+        texts: The chunks, in document order.
+
+    Returns:
+        Per chunk, None if it is new, else a description of what it
+        duplicates: an indexed chunk ID or "#<i>" for an earlier chunk of texts.
+    """
+    sigs = [signature(text) for text in texts]
+    with _lock:
+        index = _index(agent_id)
+        found = [index.match(sig, exclude_source=source) for sig in sigs]
+    local = _AgentIndex()
+    for i, sig in enumerate(sigs):
+        if found[i] is None:
+            found[i] = local.match(sig)
+            if found[i] is None:
+                local.add(f"#{i}", source, sig)
+    return found
+
+
+def add(
+    agent_id: str,
+    source: str,
+    chunk_ids: List[str],
+    texts: List[str],
+    references: Iterable[str] = (),
+):
+    """
+    Indexes (or re-indexes) the signatures of a document's stored chunks.
+
+    Args:
+        agent_id: The agent whose index is updated.
+        source: The document.
+        chunk_ids: IDs of its stored chunks.
+        texts: Their texts.
+        references: IDs of other documents' chunks that some of its chunks
+            were skipped as duplicates of (see find_duplicates). They replace
+            the document's previous references.
+    """
+    sigs = [signature(text) for text in texts]
+    with _lock:
+        index = _index(agent_id)
+        conn = _connect()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO chunk_signatures VALUES (?, ?, ?, ?)",
+                [(agent_id, chunk_id, source, sig.tobytes()) for chunk_id, sig in zip(chunk_ids, sigs)],
+            )
+            conn.execute(
+                "DELETE FROM chunk_references WHERE agent_id = ? AND source = ?", (agent_id, source)
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO chunk_references VALUES (?, ?, ?)",
+                [(agent_id, chunk_id, source) for chunk_id in set(references)],
+            )
+        for chunk_id, sig in zip(chunk_ids, sigs):
+            index.add(chunk_id, source, sig)
+
+
+def remove(agent_id: str, chunk_ids: List[str], source: Optional[str] = None) -> List[str]:
+    """
+    Removes chunks of an agent from the index.
+
+    Args:
+        agent_id: The agent whose index is updated.
+        chunk_ids: The removed chunks.
+        source: Set when the whole document is removed, to drop its references.
+
+    Returns:
+        The documents that skipped chunks as duplicates of the removed ones;
+        their content is no longer indexed and they must be ingested again.
+    """
+    with _lock:
+        index = _index(agent_id)
+        conn = _connect()
+        dependents: Set[str] = set()
+        with conn:
+            conn.executemany(
+                "DELETE FROM chunk_signatures WHERE agent_id = ? AND chunk_id = ?",
+                [(agent_id, chunk_id) for chunk_id in chunk_ids],
+            )
+            for start in range(0, len(chunk_ids), 500):
+                part = chunk_ids[start : start + 500]
+                marks = ", ".join("?" * len(part))
+                dependents.update(
+                    row[0]
+                    for row in conn.execute(
+                        f"SELECT source FROM chunk_references WHERE agent_id = ? AND chunk_id IN ({marks})",
+                        (agent_id, *part),
+                    )
+                )
+                conn.execute(
+                    f"DELETE FROM chunk_references WHERE agent_id = ? AND chunk_id IN ({marks})",
+                    (agent_id, *part),
+                )
+            if source is not None:
+                conn.execute(
+                    "DELETE FROM chunk_references WHERE agent_id = ? AND source = ?", (agent_id, source)
+                )
+        for chunk_id in chunk_ids:
+            index.remove(chunk_id)
+    dependents.discard(source)
+    return sorted(dependents)
+
+
+def drop(agent_id: str):
+    """Removes every chunk signature and reference of an agent."""
+    with _lock:
+        conn = _connect()
+        with conn:
+            conn.execute("DELETE FROM chunk_signatures WHERE agent_id = ?", (agent_id,))
+            conn.execute("DELETE FROM chunk_references WHERE agent_id = ?", (agent_id,))
+        _indexes.pop(agent_id, None)
@@ -0,0 +1,198 @@
+# ai_agent_builder/utils/embedder.py
+import hashlib
+import logging
+import multiprocessing
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from typing import List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = os.path.join("_data", "embeddings")
+CACHE_DB_PATH = os.path.join(CACHE_DIR, "cache.db")
+
+if not os.path.exists(CACHE_DIR):
+    os.makedirs(CACHE_DIR)
+
+# Texts per encode() call.
+BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", 64))
+
+# Worker processes for large encodes; 0 keeps all encoding in-process.
+# Inputs of at most one batch are always encoded in-process, since shipping
+# them to a worker costs more than it saves.
+WORKERS = int(os.getenv("EMBEDDING_WORKERS") or max(1, (os.cpu_count() or 2) // 2))
+
+# Query embeddings kept in memory; repeated queries skip the model entirely.
+QUERY_CACHE_SIZE = int(os.getenv("EMBEDDING_QUERY_CACHE_SIZE", 1024))
+
+_cache_lock = threading.Lock()
+_cache_conn: Optional[sqlite3.Connection] = None
+_pool_lock = threading.Lock()
+_pool: Optional[ProcessPoolExecutor] = None
+
+# Set in each worker process by _init_worker.
+_worker_model = None
+
+
+def text_hash(text: str) -> str:
+    """Cache key of a chunk's text."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def _cache() -> sqlite3.Connection:
+    global _cache_conn
+    if _cache_conn is None:
+        _cache_conn = sqlite3.connect(CACHE_DB_PATH, check_same_thread=False)
+        _cache_conn.execute("PRAGMA journal_mode=WAL")
+        _cache_conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embedding_cache (
+                model TEXT NOT NULL,
+                hash TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                PRIMARY KEY (model, hash)
+            ) WITHOUT ROWID
+        """
+        )
+    return _cache_conn
+
+
+def cache_get(model: str, hashes: List[str]) -> dict:
+    """Returns {hash: float32 vector} for the hashes found in the cache."""
+    found = {}
+    with _cache_lock:
+        conn = _cache()
+        # Stay well below SQLite's bound-parameter limit.
+        for start in range(0, len(hashes), 500):
+            part = hashes[start : start + 500]
+            marks = ", ".join("?" * len(part))
+            for key, blob in conn.execute(
+                f"SELECT hash, vector FROM embedding_cache WHERE model = ? AND hash IN ({marks})",
+                (model, *part),
+            ):
+                found[key] = np.frombuffer(blob, dtype=np.float32)
+    return found
+
+
+def cache_put(model: str, hashes: List[str], vectors: np.ndarray):
+    """Stores vectors (one row per hash) in the cache."""
+    rows = [
+        (model, key, np.asarray(vector, dtype=np.float32).tobytes())
+        for key, vector in zip(hashes, vectors)
+    ]
+    with _cache_lock:
+        conn = _cache()
+        with conn:
+            conn.executemany("INSERT OR REPLACE INTO embedding_cache VALUES (?, ?, ?)", rows)
+
+
+def _init_worker(model_name: str, threads: int):
+    global _worker_model
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    # Workers split the cores between them instead of each using all of them.
+    torch.set_num_threads(threads)
+    _worker_model = SentenceTransformer(model_name, device="cpu")
+
+
+def _encode_in_worker(texts: List[str]) -> np.ndarray:
+    # Same preprocessing as HuggingFaceEmbeddings, so vectors are identical
+    # whichever path computed them.
+    texts = [t.replace("\n", " ") for t in texts]
+    return _worker_model.encode(texts, batch_size=BATCH_SIZE, convert_to_numpy=True)
+
+
+def _get_pool(model_name: str) -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            threads = max(1, (os.cpu_count() or 1) // WORKERS)
+            # spawn: forking a process that has torch loaded can deadlock.
+            _pool = ProcessPoolExecutor(
+                max_workers=WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(model_name, threads),
+            )
+            logger.info(f"Started {WORKERS} embedding worker processes")
+    return _pool
+
+
+def shutdown():
+    """Stops the worker processes, if they were started."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wraps an embedding model with batching, a worker pool and a disk cache.
+
+    Documents are looked up by text hash first, so a chunk shared by several
+    agents (or re-ingested unchanged) is only ever encoded once. Query
+    embeddings are kept in an in-memory LRU.
+    """
+
+    def __init__(self, base: Embeddings, model_name: str):
+        self.base = base
+        self.model_name = model_name
+        self._queries: "OrderedDict[str, List[float]]" = OrderedDict()
+        self._queries_lock = threading.Lock()
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        batches = [texts[i : i + BATCH_SIZE] for i in range(0, len(texts), BATCH_SIZE)]
+        if WORKERS <= 0 or len(batches) <= 1:
+            return np.asarray(self.base.embed_documents(texts), dtype=np.float32)
+        pool = _get_pool(self.model_name)
+        return np.vstack(list(pool.map(_encode_in_worker, batches))).astype(np.float32)
+
+    def embed_array(self, texts: List[str]) -> np.ndarray:
+        """
+        Embeds documents, using cached vectors where possible.
+
+        Returns:
+            A float32 array with one row per text, in input order.
+        """
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        hashes = [text_hash(t) for t in texts]
+        vectors = cache_get(self.model_name, list(set(hashes)))
+
+        missing = {}
+        for key, text in zip(hashes, texts):
+            if key not in vectors:
+                missing.setdefault(key, text)
+        if missing:
+            encoded = self._encode(list(missing.values()))
+            cache_put(self.model_name, list(missing), encoded)
+            vectors.update(zip(missing, encoded))
+            logger.debug(
+                f"Embedded {len(missing)} texts, {len(set(hashes)) - len(missing)} from cache"
+            )
+        return np.vstack([vectors[key] for key in hashes])
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self.embed_array(texts).tolist()
+
+    def embed_query(self, text: str) -> List[float]:
+        with self._queries_lock:
+            vector = self._queries.get(text)
+            if vector is not None:
+                self._queries.move_to_end(text)
+                return list(vector)
+        vector = self.base.embed_query(text)
+        with self._queries_lock:
+            self._queries[text] = vector
+            while len(self._queries) > QUERY_CACHE_SIZE:
+                self._queries.popitem(last=False)
+        return list(vector)
@@ -1,16 +1,27 @@
 import os
 import asyncio
-import requests
-from bs4 import BeautifulSoup
-from PyPDF2 import PdfReader
-from PIL import Image
-import pytesseract
-from utils import gemini,memory,sumarizer
-
-from langchain.docstore.document import Document
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain.embeddings import HuggingFaceEmbeddings
-from langchain.vectorstores import Chroma
+import hashlib
+import logging
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from utils import chunker, dedup, extraction, keyword_index, pipeline, rag_manifest, retrieval, vector_store
+
+logger = logging.getLogger(__name__)
+
+PDF_DIR = os.path.join("_data", "upload", "pdf")
+IMAGE_DIR = os.path.join("_data", "upload", "images")
+TEXT_DIR = os.path.join("_data", "upload", "text")
+
+# Ingestion stage concurrency and the capacity of the queues between stages.
+EXTRACT_WORKERS = int(os.getenv("INGEST_EXTRACT_WORKERS", 4))
+CHUNK_WORKERS = int(os.getenv("INGEST_CHUNK_WORKERS", 4))
+QUEUE_SIZE = int(os.getenv("INGEST_QUEUE_SIZE", 8))
+
+# Per agent: held while its collection is written, deleted from, compacted or
+# dropped, so a compaction never races an ingestion job's upserts and deletes.
+_agent_locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+
 
 def gather_files(directory: str, extensions: list) -> list:
     """Collects file paths in a directory with given file extensions."""
@@ -22,56 +33,296 @@ def gather_files(directory: str, extensions: list) -> list:
             files.append(os.path.join(directory, filename))
     return files
 
-async def run_rag_pipeline(agent_id: str):
+async def _chunk_document(text: str) -> List[str]:
     """
-    Executes the RAG pipeline:
-      1. Gathers multi-input data from files/URLs.
-      2. Summarizes the aggregated content via Gemini.
-      3. Splits the summary (if needed) into document chunks.
-      4. Creates embeddings and stores them in a local Chroma vector store.
-      5. Demonstrates a retrieval query.
+    Splits one document's extracted text into chunks, sized in embedding-model
+    tokens along its headings, pages and paragraphs. The chunks are embedded
+    as they are, so retrieval returns the document's own passages and
+    re-ingesting unchanged text yields the same chunks.
     """
-   
-    PDF_DIR = "backend/_data/upload/pdf"
-    IMAGE_DIR = "backend/_data/upload/images"
-    TEXT_DIR = "backend/_data/upload/text"
-    URLS = ["https://example.com"]  # List any URLs here
-    RAW_TEXTS = ["Additional raw text input if needed."]
-
-    
-    pdf_files = gather_files(PDF_DIR, [".pdf"])
-    image_files = gather_files(IMAGE_DIR, [".png", ".jpg", ".jpeg"])
-    text_files = gather_files(TEXT_DIR, [".txt", ".md"])
-
-    
-    summary = await summarize_multi_input_data(
-        pdf_files=pdf_files,
-        image_files=image_files,
-        file_paths=text_files,
-        urls=URLS,
-        texts=RAW_TEXTS
-    )
-    
-
-    
-    splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
-    documents = splitter.create_documents([summary])
-
-    
-    PERSIST_DIR = "backend/_data/chroma_langchain"
-    COLLECTION_NAME = "agent_memory"
-    os.makedirs(PERSIST_DIR, exist_ok=True)
-
-    embeddings = HuggingFaceEmbeddings(model_name="all-MiniLM-L6-v2")
-    vector_store = Chroma(
-        embedding_function=embeddings,
-        collection_name=COLLECTION_NAME,
-        persist_directory=PERSIST_DIR,
+    return await asyncio.to_thread(chunker.chunk_text, text)
+
+async def _store_chunks(agent_id: str, source: str, sha256: str, chunks: List[str]) -> List[str]:
+    """
+    Embeds and upserts one document's chunks, except near-duplicates of
+    chunks already indexed for the agent (boilerplate such as repeated legal
+    text, or copies and revisions of a document) or of earlier chunks of the
+    document. The
+    document is recorded as depending on the other documents' chunks it
+    skipped, so it is ingested again if they are deleted (see _delete_chunks).
+    Returns the ids of the stored chunks.
+    """
+
+    # Ids are derived from the source and its content, so re-adding a document
+    # overwrites its chunks instead of duplicating them, while identical copies
+    # under other names keep chunks of their own.
+    source_key = hashlib.sha1(source.encode("utf-8")).hexdigest()[:12]
+    chunk_ids = [f"{agent_id}-{source_key}-{sha256[:16]}-{i}" for i in range(len(chunks))]
+    duplicates = await asyncio.to_thread(dedup.find_duplicates, agent_id, source, chunks)
+    keep = [i for i, duplicate in enumerate(duplicates) if duplicate is None]
+    # Other documents' chunks standing in for skipped ones ("#i" are this document's).
+    references = [d for d in duplicates if d is not None and not d.startswith("#")]
+    if len(keep) < len(chunks):
+        logger.info(f"Skipping {len(chunks) - len(keep)} near-duplicate chunks of {source}")
+        chunk_ids = [chunk_ids[i] for i in keep]
+        chunks = [chunks[i] for i in keep]
+    if not chunks:
+        await asyncio.to_thread(dedup.add, agent_id, source, [], [], references)
+        return []
+
+    metadatas = [
+        {"agent": agent_id, "source": source, "sha256": sha256, "chunk_id": chunk_id}
+        for chunk_id in chunk_ids
+    ]
+    loop = asyncio.get_running_loop()
+    async with _agent_locks[agent_id]:
+        await loop.run_in_executor(
+            None,
+            lambda: vector_store.get_agent_store(agent_id).add_texts(
+                chunks, metadatas=metadatas, ids=chunk_ids
+            ),
+        )
+        # BM25 index next to the vectors, for keyword and hybrid retrieval.
+        await asyncio.to_thread(keyword_index.add, agent_id, chunk_ids, chunks)
+        await asyncio.to_thread(dedup.add, agent_id, source, chunk_ids, chunks, references)
+        retrieval.invalidate(agent_id)
+    return chunk_ids
+
+async def _delete_chunks(agent_id: str, chunk_ids: List[str], source: Optional[str] = None) -> List[str]:
+    """
+    Deletes chunks of an agent; source is set when a whole document is removed.
+
+    Returns:
+        The documents that skipped chunks as duplicates of the deleted ones,
+        which must be ingested again.
+    """
+    loop = asyncio.get_running_loop()
+    async with _agent_locks[agent_id]:
+        if chunk_ids:
+            await loop.run_in_executor(
+                None, lambda: vector_store.get_agent_store(agent_id).delete(ids=chunk_ids)
+            )
+            await asyncio.to_thread(keyword_index.remove, agent_id, chunk_ids)
+            retrieval.invalidate(agent_id)
+        return await asyncio.to_thread(dedup.remove, agent_id, chunk_ids, source)
+
+async def _delete_unmanaged_chunks(agent_id: str):
+    """Drops an agent's chunks written before ingestion kept a manifest."""
+    def _delete():
+        store = vector_store.get_agent_store(agent_id)
+        ids = store.get(include=[])["ids"]
+        if ids:
+            store.delete(ids=ids)
+        keyword_index.drop(agent_id)
+        dedup.drop(agent_id)
+        retrieval.invalidate(agent_id)
+        return len(ids)
+
+    loop = asyncio.get_running_loop()
+    async with _agent_locks[agent_id]:
+        removed = await loop.run_in_executor(None, _delete)
+    if removed:
+        logger.info(f"Removed {removed} untracked chunks for agent {agent_id}")
+
+async def run_rag_pipeline(
+    agent_id: str,
+    urls: Optional[list] = None,
+    texts: Optional[list] = None,
+    progress: Optional[dict] = None,
+    paths: Optional[list] = None,
+) -> dict:
+    """
+    Executes the RAG pipeline incrementally, as streaming stages joined by
+    bounded queues (see utils/pipeline.py):
+      1. check:   skips sources whose size/mtime or content hash match the manifest.
+      2. extract: reads the text of new or changed sources.
+      3. chunk:   splits each document's text into chunks.
+      4. store:   embeds and upserts its chunks, replacing previous ones.
+    Each document is searchable as soon as it leaves the last stage, and at
+    most a few queue slots of documents are in memory at any time. Finally the
+    chunks of sources that no longer exist are deleted, and sources that
+    skipped chunks as duplicates of any deleted chunk are ingested again.
+
+    Args:
+        agent_id: The agent whose documents are ingested.
+        urls: Web pages to ingest.
+        texts: Raw text inputs to ingest.
+        paths: Files to ingest besides the upload directories, e.g. the
+            agent's configured documents.
+        progress: Dict updated in place with the counters below while the
+            pipeline runs, for callers reporting progress (see utils/ingest_jobs.py).
+
+    Returns:
+        Counts of added, updated, unchanged, removed, reingested and failed
+        sources, and per-stage counters: sources, extracted, chunked,
+        chunks_embedded, duplicates_skipped and bytes_processed.
+    """
+    if not rag_manifest.exists(agent_id):
+        await _delete_unmanaged_chunks(agent_id)
+    manifest = rag_manifest.load(agent_id)
+    stats = progress if progress is not None else {}
+    stats.update(added=0, updated=0, unchanged=0, removed=0, failed=0)
+    stats.update(sources=0, extracted=0, chunked=0, chunks_embedded=0, bytes_processed=0)
+    stats.update(duplicates_skipped=0, reingested=0)
+    loop = asyncio.get_running_loop()
+
+    files = (
+        gather_files(PDF_DIR, [".pdf"])
+        + gather_files(IMAGE_DIR, [".png", ".jpg", ".jpeg"])
+        + gather_files(TEXT_DIR, [".txt", ".md"])
+        + [os.path.normpath(path) for path in paths or []]
     )
+    files = list(dict.fromkeys(files))
+    docs = [{"source": path, "path": path} for path in files]
+    docs += [{"source": url, "url": url} for url in urls or []]
+    for raw in texts or []:
+        sha256 = rag_manifest.sha256_text(raw)
+        docs.append({"source": f"text:{sha256}", "text": raw, "sha256": sha256})
+    seen = {doc["source"] for doc in docs}
+    stats["sources"] = len(docs)
+    # The stages fill in and pop fields; re-ingestion starts from these copies.
+    specs = [dict(doc) for doc in docs]
+    # Sources whose skipped duplicates pointed at deleted chunks.
+    invalidated = set()
+
+    def _failed(doc: dict, step: str, error: Exception):
+        logger.error(f"RAG ingestion failed to {step} {doc['source']}: {error}")
+        stats["failed"] += 1
+
+    def _invalidate(sources: List[str]):
+        for source in sources:
+            entry = manifest.get(source)
+            if entry:
+                # Never matches a file or text again, so the next run (or the
+                # re-ingestion below) indexes the source anew.
+                manifest[source] = rag_manifest.make_entry("", entry["chunk_ids"], None)
+                invalidated.add(source)
+
+    async def check(doc: dict) -> Optional[dict]:
+        entry = manifest.get(doc["source"])
+        try:
+            if "path" in doc:
+                doc["stat"] = os.stat(doc["path"])
+                if rag_manifest.stat_unchanged(entry, doc["stat"]):
+                    stats["unchanged"] += 1
+                    return None
+                doc["sha256"] = await loop.run_in_executor(
+                    None, rag_manifest.sha256_file, doc["path"]
+                )
+                if entry and entry["sha256"] == doc["sha256"]:
+                    # Touched but not modified: record the new mtime, keep the chunks.
+                    manifest[doc["source"]] = rag_manifest.make_entry(
+                        doc["sha256"], entry["chunk_ids"], doc["stat"]
+                    )
+                    stats["unchanged"] += 1
+                    return None
+            elif "url" in doc:
+                # A page's content is only known after fetching it.
+                doc["text"] = await extraction.fetch_url(doc["url"])
+                doc["sha256"] = rag_manifest.sha256_text(doc["text"])
+            if "path" not in doc and entry and entry["sha256"] == doc["sha256"]:
+                stats["unchanged"] += 1
+                return None
+        except Exception as e:
+            _failed(doc, "check", e)
+            return None
+        return doc
+
+    async def extract(doc: dict) -> Optional[dict]:
+        if "text" not in doc:
+            try:
+                # Cached by content hash: re-ingesting an unchanged upload is free.
+                doc["text"] = await extraction.aextract(doc["path"], sha256=doc["sha256"])
+            except Exception as e:
+                _failed(doc, "extract", e)
+                return None
+        stats["extracted"] += 1
+        stats["bytes_processed"] += doc["stat"].st_size if "stat" in doc else len(doc["text"].encode("utf-8"))
+        return doc
+
+    async def chunk(doc: dict) -> Optional[dict]:
+        try:
+            doc["chunks"] = await _chunk_document(doc.pop("text"))
+        except Exception as e:
+            _failed(doc, "chunk", e)
+            return None
+        stats["chunked"] += 1
+        return doc
+
+    async def store(doc: dict) -> Optional[dict]:
+        source = doc["source"]
+        previous = manifest.get(source)
+        chunks = doc.pop("chunks")
+        try:
+            chunk_ids = await _store_chunks(agent_id, source, doc["sha256"], chunks)
+            # Checked against the current chunks just now.
+            invalidated.discard(source)
+            if previous:
+                _invalidate(
+                    await _delete_chunks(agent_id, [i for i in previous["chunk_ids"] if i not in chunk_ids])
+                )
+        except Exception as e:
+            _failed(doc, "store", e)
+            return None
+        manifest[source] = rag_manifest.make_entry(doc["sha256"], chunk_ids, doc.get("stat"))
+        stats["updated" if previous else "added"] += 1
+        stats["chunks_embedded"] += len(chunk_ids)
+        stats["duplicates_skipped"] += len(chunks) - len(chunk_ids)
+        # Saved per source so an interrupted run does not redo finished work.
+        rag_manifest.save(agent_id, manifest)
+        return doc
+
+    async def ingest(batch: List[dict]):
+        stages = pipeline.iterate(batch)
+        stages = pipeline.stage(stages, check, EXTRACT_WORKERS, QUEUE_SIZE)
+        stages = pipeline.stage(stages, extract, EXTRACT_WORKERS, QUEUE_SIZE)
+        stages = pipeline.stage(stages, chunk, CHUNK_WORKERS, QUEUE_SIZE)
+        # One writer: the embedder parallelizes internally and the manifest has one owner.
+        stages = pipeline.stage(stages, store, 1, QUEUE_SIZE)
+        await pipeline.drain(stages)
+
+    await ingest(docs)
+
+    for source in [s for s in manifest if s not in seen]:
+        _invalidate(await _delete_chunks(agent_id, manifest.pop(source)["chunk_ids"], source))
+        stats["removed"] += 1
+
+    # Each source at most once per run: re-ingesting one can delete chunks
+    # others depend on in turn; any left invalidated are picked up next run.
+    reingested = set()
+    while invalidated - reingested:
+        retry = [dict(spec) for spec in specs if spec["source"] in invalidated - reingested]
+        reingested |= invalidated
+        invalidated.clear()
+        if not retry:
+            break
+        logger.info(f"Re-ingesting {len(retry)} sources whose duplicate chunks were deleted")
+        stats["reingested"] += len(retry)
+        await ingest(retry)
+
+    rag_manifest.save(agent_id, manifest)
+    logger.info(f"RAG ingestion for agent {agent_id}: {stats}")
+    return stats
+
+async def compact_agent(agent_id: str) -> int:
+    """
+    Compacts an agent's document collection. Returns the chunks kept.
+    Waits for any chunk write of a running ingestion job, which in turn
+    waits for the compaction to finish.
+    """
+    loop = asyncio.get_running_loop()
+    async with _agent_locks[agent_id]:
+        kept = await loop.run_in_executor(None, vector_store.compact_agent_store, agent_id)
+        retrieval.invalidate(agent_id)
+    return kept
 
-    # Prepare documents for storage with metadata
-    texts = [doc.page_content for doc in documents]
-    metadatas = [{"agent": agent_id} for _ in texts]
-    vector_store.add_texts(texts, metadatas=metadatas)
-    vector_store.persist()
-    
+async def drop_agent(agent_id: str):
+    """Deletes an agent's document collection and ingestion manifest."""
+    loop = asyncio.get_running_loop()
+    async with _agent_locks[agent_id]:
+        await loop.run_in_executor(None, vector_store.drop_agent_store, agent_id)
+        await asyncio.to_thread(keyword_index.drop, agent_id)
+        await asyncio.to_thread(dedup.drop, agent_id)
+        retrieval.invalidate(agent_id)
+        rag_manifest.delete(agent_id)
+    logger.info(f"Dropped RAG data for agent {agent_id}")
@@ -0,0 +1,393 @@
+# ai_agent_builder/utils/extraction.py
+import asyncio
+import csv
+import logging
+import multiprocessing
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+
+import fitz  # PyMuPDF
+import httpx
+import pytesseract
+from bs4 import BeautifulSoup
+from PIL import Image
+
+from utils.rag_manifest import sha256_file
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = os.path.join("_data", "extraction")
+CACHE_DB_PATH = os.path.join(CACHE_DIR, "cache.db")
+
+if not os.path.exists(CACHE_DIR):
+    os.makedirs(CACHE_DIR)
+
+# Worker processes for PDF parsing and OCR, which hold the GIL for seconds.
+PROCESSES = int(os.getenv("EXTRACT_PROCESSES") or max(1, (os.cpu_count() or 2) // 2))
+
+# Seconds allowed to fetch one URL (connect, read and write each).
+URL_TIMEOUT_SECONDS = float(os.getenv("URL_TIMEOUT_SECONDS", 15))
+
+# Pages of a PDF extracted per worker task; larger PDFs are split into page
+# ranges extracted in parallel.
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", 16))
+
+# Resolution images are OCR'd at. Scans are usually 300-600 DPI; tesseract is
+# as accurate at 300 and much faster on the smaller image.
+OCR_DPI = int(os.getenv("OCR_DPI", 300))
+
+# Images without DPI information are downscaled to at most this many pixels.
+OCR_MAX_PIXELS = int(os.getenv("OCR_MAX_PIXELS", 12_000_000))
+
+# PDF pages with fewer characters in their text layer are OCR'd instead, if
+# they contain images (scanned pages).
+OCR_MIN_PAGE_CHARS = 16
+
+OCR_LANG = os.getenv("OCR_LANG", "eng")
+
+# Rows of a CSV file included in its text by default.
+CSV_MAX_ROWS = 20
+
+# Format of each file extension.
+FORMATS = {
+    ".pdf": "pdf",
+    ".png": "image",
+    ".jpg": "image",
+    ".jpeg": "image",
+    ".csv": "csv",
+    ".txt": "text",
+    ".md": "text",
+    ".html": "html",
+    ".htm": "html",
+}
+
+# Bump a format's version whenever its extractor's output changes, so cached
+# results from the old extractor are not reused.
+VERSIONS = {"pdf": 3, "image": 2, "csv": 1, "text": 1, "html": 1}
+
+# Formats extracted on the process pool; the rest are cheap enough for a thread.
+CPU_BOUND = {"pdf", "image"}
+
+_cache_lock = threading.Lock()
+_cache_conn: Optional[sqlite3.Connection] = None
+_pool_lock = threading.Lock()
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+class UnsupportedFormat(ValueError):
+    """Raised for files whose extension has no extractor."""
+
+
+def _otsu_threshold(histogram: List[int]) -> int:
+    """Grey level that best separates ink from background (Otsu's method)."""
+    total = sum(histogram)
+    weighted_total = sum(level * count for level, count in enumerate(histogram))
+    background = weighted_background = 0
+    best_level, best_variance = 127, 0.0
+    for level, count in enumerate(histogram):
+        background += count
+        if background == 0:
+            continue
+        foreground = total - background
+        if foreground == 0:
+            break
+        weighted_background += level * count
+        mean_background = weighted_background / background
+        mean_foreground = (weighted_total - weighted_background) / foreground
+        variance = background * foreground * (mean_background - mean_foreground) ** 2
+        if variance > best_variance:
+            best_level, best_variance = level, variance
+    return best_level
+
+
+def preprocess_for_ocr(image: Image.Image, dpi: Optional[float] = None) -> Image.Image:
+    """
+    Prepares an image for tesseract: grayscale, downscaled to OCR_DPI (or to
+    OCR_MAX_PIXELS when the resolution is unknown), then binarized.
+
+    Args:
+        image: The image to prepare.
+        dpi: The image's resolution; read from the image when omitted.
+
+    Returns:
+        A black and white ("L" mode) image.
+    """
+    image = image.convert("L")
+    dpi = dpi or (image.info.get("dpi") or (None,))[0]
+    scale = OCR_DPI / dpi if dpi else (OCR_MAX_PIXELS / (image.width * image.height)) ** 0.5
+    if scale < 1:
+        size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+        image = image.resize(size, Image.LANCZOS)
+    threshold = _otsu_threshold(image.histogram())
+    return image.point(lambda level: 255 if level > threshold else 0)
+
+
+def _ocr(image: Image.Image, dpi: Optional[float] = None) -> str:
+    return pytesseract.image_to_string(preprocess_for_ocr(image, dpi), lang=OCR_LANG)
+
+
+def _pdf_pages(path: str, start: int, stop: int) -> str:
+    """
+    Text of pages [start, stop) of a PDF, OCR'ing pages without a text layer.
+    Every page ends with a form feed, which utils/chunker.py treats as a break.
+    """
+    parts = []
+    with fitz.open(path) as doc:
+        for number in range(start, min(stop, doc.page_count)):
+            page = doc[number]
+            text = page.get_text()
+            if len(text.strip()) < OCR_MIN_PAGE_CHARS and page.get_images():
+                pixmap = page.get_pixmap(dpi=OCR_DPI, colorspace=fitz.csGRAY)
+                image = Image.frombytes("L", (pixmap.width, pixmap.height), pixmap.samples)
+                text = _ocr(image, dpi=OCR_DPI)
+            parts.append(text.rstrip("\f") + "\f")
+    return "".join(parts)
+
+
+def _pdf_ranges(path: str) -> List[Tuple[int, int]]:
+    with fitz.open(path) as doc:
+        count = doc.page_count
+    return [(start, start + PDF_PAGES_PER_TASK) for start in range(0, count, PDF_PAGES_PER_TASK)]
+
+
+def extract_pdf(path: str) -> str:
+    """
+    Extracts the text of a PDF with PyMuPDF, OCR'ing scanned pages that have
+    no text layer.
+    """
+    return "".join(_pdf_pages(path, start, stop) for start, stop in _pdf_ranges(path))
+
+
+def extract_image(path: str) -> str:
+    """Extracts text from an image with tesseract OCR, after preprocessing."""
+    with Image.open(path) as image:
+        return _ocr(image)
+
+
+def extract_csv(path: str, max_rows: int = CSV_MAX_ROWS) -> str:
+    """Renders a CSV file's headers and first rows as text."""
+    lines = []
+    with open(path, newline="", encoding="utf-8") as f:
+        reader = csv.reader(f)
+        headers = next(reader, [])
+        lines.append(f"CSV Headers: {headers}")
+        for i, row in enumerate(reader):
+            lines.append(f"Row {i + 1}: {row}")
+            if i >= max_rows:
+                break
+    return "\n".join(lines)
+
+
+def extract_text(path: str) -> str:
+    """Reads a plain text or markdown file."""
+    with open(path, "r", encoding="utf-8") as f:
+        return f.read()
+
+
+def html_to_text(html: str) -> str:
+    """Returns the paragraph text of an HTML page."""
+    soup = BeautifulSoup(html, "html.parser")
+    return "\n".join(p.get_text() for p in soup.find_all("p"))
+
+
+def extract_html(path: str) -> str:
+    """Extracts the paragraph text of an HTML file."""
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        return html_to_text(f.read())
+
+
+EXTRACTORS: Dict[str, Callable[..., str]] = {
+    "pdf": extract_pdf,
+    "image": extract_image,
+    "csv": extract_csv,
+    "text": extract_text,
+    "html": extract_html,
+}
+
+
+def file_format(path: str) -> str:
+    """
+    Returns the format of a file from its extension.
+
+    Raises:
+        UnsupportedFormat: No extractor handles the extension.
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in FORMATS:
+        raise UnsupportedFormat(f"No extractor for '{ext}' files: {path}")
+    return FORMATS[ext]
+
+
+def _cache() -> sqlite3.Connection:
+    global _cache_conn
+    if _cache_conn is None:
+        _cache_conn = sqlite3.connect(CACHE_DB_PATH, check_same_thread=False)
+        _cache_conn.execute("PRAGMA journal_mode=WAL")
+        _cache_conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS extraction_cache (
+                sha256 TEXT NOT NULL,
+                extractor TEXT NOT NULL,
+                text TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                PRIMARY KEY (sha256, extractor)
+            ) WITHOUT ROWID
+        """
+        )
+    return _cache_conn
+
+
+def _extractor_key(fmt: str, options: dict) -> str:
+    # e.g. "csv/v1/max_rows=20": the format, its version and any options.
+    key = f"{fmt}/v{VERSIONS[fmt]}"
+    for name in sorted(options):
+        key += f"/{name}={options[name]}"
+    return key
+
+
+def cache_get(sha256: str, extractor: str) -> Optional[str]:
+    """Returns the cached text of a file's content, if any."""
+    with _cache_lock:
+        row = _cache().execute(
+            "SELECT text FROM extraction_cache WHERE sha256 = ? AND extractor = ?",
+            (sha256, extractor),
+        ).fetchone()
+    return row[0] if row else None
+
+
+def cache_put(sha256: str, extractor: str, text: str):
+    """Stores the text extracted from a file's content."""
+    with _cache_lock:
+        conn = _cache()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO extraction_cache VALUES (?, ?, ?, ?)",
+                (sha256, extractor, text, time.time()),
+            )
+
+
+def extract(path: str, sha256: Optional[str] = None, fmt: Optional[str] = None, **options) -> str:
+    """
+    Extracts the text of a file, reusing the cached result when a file with
+    the same content was extracted before by the same extractor version.
+
+    Args:
+        path: The file to extract.
+        sha256: The file's content hash, if the caller already computed it.
+        fmt: One of EXTRACTORS, for files without a telling extension.
+        **options: Extractor options, e.g. max_rows for CSV files.
+
+    Returns:
+        The extracted text.
+
+    Raises:
+        UnsupportedFormat: No extractor handles the file's extension.
+        Exception: Whatever the extractor raised; failures are not cached.
+    """
+    fmt = fmt or file_format(path)
+    key = _extractor_key(fmt, options)
+    sha256 = sha256 or sha256_file(path)
+    text = cache_get(sha256, key)
+    if text is None:
+        text = EXTRACTORS[fmt](path, **options)
+        cache_put(sha256, key, text)
+    return text
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: the server process may have torch loaded, which does not survive fork.
+            _pool = ProcessPoolExecutor(
+                max_workers=PROCESSES,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+            )
+            logger.info(f"Started {PROCESSES} extraction worker processes")
+    return _pool
+
+
+def _init_worker():
+    # The pool already runs one OCR per core; tesseract's own OpenMP threads
+    # would only oversubscribe the CPU.
+    os.environ["OMP_THREAD_LIMIT"] = "1"
+
+
+def shutdown():
+    """Stops the extraction worker processes, if they were started."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
+
+
+async def aextract(
+    path: str, sha256: Optional[str] = None, fmt: Optional[str] = None, **options
+) -> str:
+    """
+    Async extract(): hashing and cache lookups run on a thread, PDF and OCR
+    extraction on the worker processes, other formats on a thread. A large
+    PDF is split into page ranges extracted in parallel.
+    """
+    fmt = fmt or file_format(path)
+    key = _extractor_key(fmt, options)
+    sha256 = sha256 or await asyncio.to_thread(sha256_file, path)
+    text = await asyncio.to_thread(cache_get, sha256, key)
+    if text is not None:
+        return text
+
+    loop = asyncio.get_running_loop()
+    if fmt == "pdf":
+        ranges = await asyncio.to_thread(_pdf_ranges, path)
+        parts = await asyncio.gather(
+            *(loop.run_in_executor(_get_pool(), _pdf_pages, path, start, stop) for start, stop in ranges)
+        )
+        text = "".join(parts)
+    elif fmt in CPU_BOUND:
+        text = await loop.run_in_executor(
+            _get_pool(), _run_extractor, fmt, path, options
+        )
+    else:
+        text = await asyncio.to_thread(EXTRACTORS[fmt], path, **options)
+    await asyncio.to_thread(cache_put, sha256, key, text)
+    return text
+
+
+def _run_extractor(fmt: str, path: str, options: dict) -> str:
+    # Entry point in the worker processes.
+    return EXTRACTORS[fmt](path, **options)
+
+
+def new_client() -> httpx.AsyncClient:
+    """An HTTP client configured for fetch_url, to share across fetches."""
+    return httpx.AsyncClient(timeout=URL_TIMEOUT_SECONDS, follow_redirects=True)
+
+
+async def fetch_url(url: str, client: Optional[httpx.AsyncClient] = None) -> str:
+    """
+    Fetches a web page without blocking the event loop and returns its
+    paragraph text. Pages are not cached; their content changes.
+
+    Args:
+        url: The web URL.
+        client: Shared client for several fetches; a short-lived one is
+            created when omitted.
+
+    Raises:
+        httpx.HTTPError: The fetch failed, timed out or got an error status.
+    """
+    if client is None:
+        async with new_client() as client:
+            response = await client.get(url)
+            response.raise_for_status()
+    else:
+        response = await client.get(url)
+        response.raise_for_status()
+    return await asyncio.to_thread(html_to_text, response.text)
+
@@ -0,0 +1,509 @@
+# ai_agent_builder/utils/flat_index.py
+import json
+import logging
+import os
+import sqlite3
+import threading
+import uuid
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+logger = logging.getLogger(__name__)
+
+# "float32" keeps exact vectors; "int8" stores each row scaled to [-127, 127]
+# with one float32 scale per row, a 4x smaller file for ~1% recall loss.
+DEFAULT_DTYPE = os.getenv("VECTOR_INDEX_DTYPE", "float32")
+
+# Indexes with at least this many vectors get an IVF coarse quantizer:
+# vectors are clustered into ~sqrt(n) lists and a query only scans the
+# IVF_NPROBE lists closest to it.
+IVF_MIN_VECTORS = int(os.getenv("VECTOR_IVF_MIN_VECTORS", 20000))
+IVF_NPROBE = int(os.getenv("VECTOR_IVF_NPROBE", 8))
+IVF_TRAIN_ITERATIONS = 10
+IVF_TRAIN_SAMPLE = 50000
+
+# Rows scored per step, bounding the temporary float32 copy of int8 rows.
+SEARCH_BLOCK_ROWS = 16384
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(np.float32)
+
+
+def _quantize(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    quantized = np.round(vectors / scales[:, None]).astype(np.int8)
+    return quantized, scales.astype(np.float32)
+
+
+def _train_ivf(vectors: np.ndarray, nlist: int, seed: int = 0) -> np.ndarray:
+    """Spherical k-means on (a sample of) normalized vectors. Returns centroids."""
+    rng = np.random.default_rng(seed)
+    if len(vectors) > IVF_TRAIN_SAMPLE:
+        vectors = vectors[rng.choice(len(vectors), IVF_TRAIN_SAMPLE, replace=False)]
+    vectors = np.asarray(vectors, dtype=np.float32)
+    centroids = vectors[rng.choice(len(vectors), nlist, replace=False)].copy()
+    for _ in range(IVF_TRAIN_ITERATIONS):
+        assign = _assign(vectors, centroids)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assign, vectors)
+        empty = np.bincount(assign, minlength=nlist) == 0
+        sums[empty] = vectors[rng.choice(len(vectors), int(empty.sum()))]
+        centroids = _normalize(sums)
+    return centroids
+
+
+def _assign(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    assign = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), SEARCH_BLOCK_ROWS):
+        block = np.asarray(vectors[start : start + SEARCH_BLOCK_ROWS], dtype=np.float32)
+        assign[start : start + len(block)] = np.argmax(block @ centroids.T, axis=1)
+    return assign
+
+
+def _write_npy(path: str, array: np.ndarray):
+    """Writes an array atomically, so readers never map a partial file."""
+    tmp_path = path + ".tmp.npy"
+    np.save(tmp_path, array)
+    os.replace(tmp_path, path)
+
+
+def _append_npy(path: str, rows: np.ndarray, count: int):
+    """
+    Writes rows at [count, count + len(rows)) of the array in a .npy file.
+    Files have spare capacity past the rows in use: rows are written in
+    place while it lasts, otherwise the used rows are copied into a new file
+    of twice the capacity and swapped in. Appending is amortized O(len(rows)).
+    """
+    needed = count + len(rows)
+    array = np.load(path, mmap_mode="r+") if os.path.exists(path) else None
+    if array is not None and len(array) >= needed:
+        # Rows past count are invisible to readers until the new count is published.
+        array[count:needed] = rows
+        array.flush()
+        return
+    capacity = max(needed, 2 * len(array)) if array is not None else needed
+    tmp_path = path + ".tmp.npy"
+    grown = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=rows.dtype, shape=(capacity,) + rows.shape[1:])
+    if array is not None:
+        grown[:count] = array[:count]
+    grown[count:needed] = rows
+    grown.flush()
+    del grown, array
+    os.replace(tmp_path, path)
+
+
+class FlatIndex(VectorStore):
+    """
+    A vector index stored as memory-mapped .npy files, one directory per
+    collection, searched with vectorized dot products (cosine similarity).
+
+    Files in the directory:
+        vectors.npy   (capacity, dim) float32 or int8, normalized rows
+        scales.npy    (capacity,) float32 row scales, int8 indexes only
+        centroids.npy / assign.npy   IVF lists, large indexes only
+        index.json    {"count", "ivf_trained_for"}: rows in use (the rest is
+                      spare capacity) and the row count the IVF lists were trained on
+        rows.db       SQLite: row -> id, document, metadata, deleted flag
+
+    Vectors are mapped read-only, so worker processes opening the same index
+    share its pages through the OS cache and opening it costs next to
+    nothing. Writes append into the arrays' spare capacity (see _append_npy)
+    and then publish the new row count; readers in other processes notice
+    the new version on their next search.
+    """
+
+    def __init__(
+        self,
+        embedding_function: Embeddings,
+        path: str,
+        dtype: str = DEFAULT_DTYPE,
+    ):
+        if dtype not in ("float32", "int8"):
+            raise ValueError(f"Unsupported vector index dtype: {dtype}")
+        self._embedding = embedding_function
+        self.path = path
+        self.dtype = dtype
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        os.makedirs(path, exist_ok=True)
+        with self._db() as conn:
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS rows (
+                    row INTEGER PRIMARY KEY,
+                    id TEXT NOT NULL,
+                    document TEXT,
+                    metadata TEXT,
+                    deleted INTEGER NOT NULL DEFAULT 0
+                )
+            """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_rows_id ON rows (id) WHERE deleted = 0")
+        self._load()
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding
+
+    def _file(self, name: str) -> str:
+        return os.path.join(self.path, name)
+
+    def _db(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self._file("rows.db"))
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _current_version(self):
+        # index.json is rewritten by every write; indexes written before it
+        # existed are versioned by vectors.npy.
+        for name in ("index.json", "vectors.npy"):
+            try:
+                stat = os.stat(self._file(name))
+                return (name, stat.st_ino, stat.st_mtime_ns)
+            except FileNotFoundError:
+                continue
+        return None
+
+    def _publish(self, count: int, ivf_trained_for: Optional[int] = None):
+        """Writes index.json atomically, making appended rows visible."""
+        if ivf_trained_for is None:
+            ivf_trained_for = self._state.get("ivf_trained_for", 0)
+        tmp_path = self._file("index.json.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump({"count": count, "ivf_trained_for": ivf_trained_for}, f)
+        os.replace(tmp_path, self._file("index.json"))
+
+    def _load(self):
+        """(Re)maps the arrays and reloads the deleted-row mask."""
+        version = self._current_version()
+        state = {"version": version, "vectors": None, "scales": None, "centroids": None, "assign": None}
+        # The count is read before the arrays: rows appended meanwhile stay hidden.
+        meta = {}
+        if os.path.exists(self._file("index.json")):
+            with open(self._file("index.json")) as f:
+                meta = json.load(f)
+        if os.path.exists(self._file("vectors.npy")):
+            vectors = np.load(self._file("vectors.npy"), mmap_mode="r")
+            count = min(meta.get("count", len(vectors)), len(vectors))
+            if vectors.dtype == np.int8:
+                scales = np.load(self._file("scales.npy"), mmap_mode="r")
+                count = min(count, len(scales))
+                state["scales"] = scales[:count]
+            state["vectors"] = vectors[:count]
+            if os.path.exists(self._file("centroids.npy")):
+                state["centroids"] = np.load(self._file("centroids.npy"))
+                state["assign"] = np.load(self._file("assign.npy"), mmap_mode="r")[:count]
+        # Indexes written before index.json existed were trained on all rows.
+        state["ivf_trained_for"] = meta.get(
+            "ivf_trained_for", 0 if state["assign"] is None else len(state["assign"])
+        )
+
+        count = 0 if state["vectors"] is None else len(state["vectors"])
+        alive = np.ones(count, dtype=bool)
+        dead = [row for (row,) in self._db().execute("SELECT row FROM rows WHERE deleted = 1")]
+        if dead:
+            alive[[r for r in dead if r < count]] = False
+        state["alive"] = alive
+        # Searches read one snapshot, so a concurrent reload never mixes files.
+        self._state = state
+
+    def _snapshot(self) -> dict:
+        if self._current_version() != self._state["version"]:
+            with self._lock:
+                if self._current_version() != self._state["version"]:
+                    self._load()
+        return self._state
+
+    def __len__(self) -> int:
+        return int(self._snapshot()["alive"].sum())
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+
+    def add_texts(
+        self,
+        texts: Iterable[str],
+        metadatas: Optional[List[dict]] = None,
+        ids: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> List[str]:
+        """Embeds and appends texts; an existing id is replaced (upsert)."""
+        texts = list(texts)
+        if not texts:
+            return []
+        if ids is None:
+            ids = [str(uuid.uuid4()) for _ in texts]
+        metadatas = metadatas or [{} for _ in texts]
+
+        if hasattr(self._embedding, "embed_array"):
+            vectors = self._embedding.embed_array(texts)
+        else:
+            vectors = np.asarray(self._embedding.embed_documents(texts), dtype=np.float32)
+        vectors = _normalize(np.asarray(vectors, dtype=np.float32))
+
+        with self._lock:
+            self._load()
+            state = self._state
+            start = 0 if state["vectors"] is None else len(state["vectors"])
+            conn = self._db()
+            with conn:
+                self._mark_deleted(conn, ids)
+                conn.executemany(
+                    "INSERT INTO rows (row, id, document, metadata) VALUES (?, ?, ?, ?)",
+                    [
+                        (start + i, id_, text, json.dumps(meta))
+                        for i, (id_, text, meta) in enumerate(zip(ids, texts, metadatas))
+                    ],
+                )
+                self._append(state, vectors)
+            self._load()
+        return list(ids)
+
+    def _append(self, state: dict, vectors: np.ndarray):
+        old_rows = state["vectors"]
+        count = 0 if old_rows is None else len(old_rows)
+        # An existing index keeps the dtype it was created with.
+        dtype = self.dtype if old_rows is None else old_rows.dtype.name
+        if dtype == "int8":
+            new_rows, new_scales = _quantize(vectors)
+        else:
+            new_rows, new_scales = vectors, None
+
+        if old_rows is not None and old_rows.shape[1] != vectors.shape[1]:
+            raise ValueError(
+                f"Vector dimension {vectors.shape[1]} does not match index "
+                f"dimension {old_rows.shape[1]}"
+            )
+        _append_npy(self._file("vectors.npy"), new_rows, count)
+        if new_scales is not None:
+            _append_npy(self._file("scales.npy"), new_scales, count)
+        total = count + len(new_rows)
+
+        # IVF lists: train once the index is large enough and retrain when it
+        # has doubled since; in between new rows join their nearest list.
+        centroids = state["centroids"]
+        trained_for = state["ivf_trained_for"]
+        if total >= IVF_MIN_VECTORS:
+            if centroids is None or total >= 2 * trained_for:
+                rows = np.load(self._file("vectors.npy"), mmap_mode="r")[:total]
+                scales = None
+                if new_scales is not None:
+                    scales = np.load(self._file("scales.npy"), mmap_mode="r")[:total]
+                full = self._dequantize(rows, scales)
+                centroids = _train_ivf(full, int(np.sqrt(total)))
+                _write_npy(self._file("centroids.npy"), centroids)
+                _write_npy(self._file("assign.npy"), _assign(full, centroids))
+                trained_for = total
+                logger.info(f"Trained {len(centroids)} IVF lists for {self.path}")
+            else:
+                _append_npy(self._file("assign.npy"), _assign(vectors, centroids), count)
+
+        # Last: readers only see the new rows once the count is published.
+        self._publish(total, trained_for)
+
+    @staticmethod
+    def _dequantize(rows: np.ndarray, scales: Optional[np.ndarray]) -> np.ndarray:
+        if scales is None:
+            return np.asarray(rows, dtype=np.float32)
+        return rows.astype(np.float32) * scales[:, None]
+
+    @staticmethod
+    def _mark_deleted(conn: sqlite3.Connection, ids: List[str]):
+        for start in range(0, len(ids), 500):
+            part = ids[start : start + 500]
+            conn.execute(
+                f"UPDATE rows SET deleted = 1 WHERE deleted = 0 AND id IN ({', '.join('?' * len(part))})",
+                part,
+            )
+
+    def delete(self, ids: Optional[List[str]] = None, **kwargs: Any) -> Optional[bool]:
+        """Marks rows deleted; their space is reclaimed by compaction."""
+        if not ids:
+            return False
+        with self._lock:
+            with self._db() as conn:
+                self._mark_deleted(conn, list(ids))
+            # Bump the version so other processes reload the deleted mask.
+            vectors = self._state["vectors"]
+            if vectors is not None:
+                self._publish(len(vectors))
+            self._load()
+        return True
+
+    def delete_collection(self):
+        """Removes the index directory."""
+        with self._lock:
+            conn = getattr(self._local, "conn", None)
+            if conn is not None:
+                conn.close()
+                self._local.conn = None
+            for name in os.listdir(self.path):
+                os.remove(self._file(name))
+            os.rmdir(self.path)
+            self._state = {
+                "version": None, "vectors": None, "scales": None, "centroids": None,
+                "assign": None, "ivf_trained_for": 0, "alive": np.ones(0, dtype=bool),
+            }
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+
+    def get(
+        self,
+        ids: Optional[List[str]] = None,
+        where: Optional[Dict[str, Any]] = None,
+        limit: Optional[int] = None,
+        include: Optional[List[str]] = None,
+        **kwargs: Any,
+    ) -> dict:
+        """Chroma-style get: {"ids", "documents", "metadatas"} of live rows."""
+        sql = "SELECT id, document, metadata FROM rows WHERE deleted = 0"
+        params: tuple = ()
+        if ids is not None:
+            sql += f" AND id IN ({', '.join('?' * len(ids))})"
+            params = tuple(ids)
+        sql += " ORDER BY row"
+
+        result = {"ids": [], "documents": [], "metadatas": []}
+        for id_, document, metadata in self._db().execute(sql, params):
+            metadata = json.loads(metadata) if metadata else {}
+            if where and any(metadata.get(k) != v for k, v in where.items()):
+                continue
+            result["ids"].append(id_)
+            result["documents"].append(document)
+            result["metadatas"].append(metadata)
+            if limit is not None and len(result["ids"]) >= limit:
+                break
+        return result
+
+    @staticmethod
+    def _candidate_rows(state: dict, query: np.ndarray) -> Optional[np.ndarray]:
+        centroids = state["centroids"]
+        if centroids is None:
+            return None
+        nprobe = min(IVF_NPROBE, len(centroids))
+        lists = np.argpartition(-(centroids @ query), nprobe - 1)[:nprobe]
+        return np.nonzero(np.isin(state["assign"], lists))[0]
+
+    def _filter_mask(self, filter: Dict[str, Any], count: int) -> np.ndarray:
+        """Rows whose metadata has every key of filter with an equal value."""
+        clauses, params = [], []
+        for key, value in filter.items():
+            if key.startswith("$") or isinstance(value, (dict, list)):
+                raise ValueError(
+                    f"FlatIndex filters only support equality on metadata keys, got {key}: {value!r}"
+                )
+            clauses.append("json_extract(metadata, ?) = ?")
+            # SQLite's JSON functions return booleans as 0/1.
+            params += [f'$."{key}"', int(value) if isinstance(value, bool) else value]
+        mask = np.zeros(count, dtype=bool)
+        rows = [
+            row
+            for (row,) in self._db().execute(
+                f"SELECT row FROM rows WHERE deleted = 0 AND {' AND '.join(clauses)}", params
+            )
+            if row < count
+        ]
+        mask[rows] = True
+        return mask
+
+    def search_vector(
+        self, query: np.ndarray, k: int = 4, filter: Optional[Dict[str, Any]] = None
+    ) -> List[Tuple[int, float]]:
+        """
+        Finds the k live rows most similar to a query vector.
+
+        Args:
+            query: The query vector.
+            k: Number of rows.
+            filter: Only rows whose metadata equals these key/value pairs.
+
+        Returns:
+            (row, cosine similarity) pairs, best first.
+        """
+        state = self._snapshot()
+        vectors, scales = state["vectors"], state["scales"]
+        if vectors is None or k <= 0:
+            return []
+        query = _normalize(np.asarray(query, dtype=np.float32)[None, :])[0]
+        rows = self._candidate_rows(state, query)
+        total = len(vectors) if rows is None else len(rows)
+
+        scores = np.empty(total, dtype=np.float32)
+        for start in range(0, total, SEARCH_BLOCK_ROWS):
+            stop = min(start + SEARCH_BLOCK_ROWS, total)
+            index = slice(start, stop) if rows is None else rows[start:stop]
+            block = vectors[index]
+            if scales is None:
+                scores[start:stop] = block @ query
+            else:
+                scores[start:stop] = (block.astype(np.float32) @ query) * scales[index]
+
+        alive = state["alive"]
+        if filter:
+            alive = alive & self._filter_mask(filter, len(alive))
+        if rows is not None:
+            alive = alive[rows]
+        scores[~alive] = -np.inf
+        k = min(k, int(alive.sum()))
+        if k == 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        positions = top if rows is None else rows[top]
+        return [(int(p), float(scores[t])) for p, t in zip(positions, top)]
+
+    def similarity_search_with_score(
+        self, query: str, k: int = 4, filter: Optional[dict] = None, **kwargs: Any
+    ) -> List[Tuple[Document, float]]:
+        hits = self.search_vector(np.asarray(self._embedding.embed_query(query)), k, filter)
+        if not hits:
+            return []
+        marks = ", ".join("?" * len(hits))
+        rows = {
+            row: (id_, document, metadata)
+            for row, id_, document, metadata in self._db().execute(
+                f"SELECT row, id, document, metadata FROM rows WHERE row IN ({marks})",
+                tuple(row for row, _ in hits),
+            )
+        }
+        results = []
+        for row, score in hits:
+            if row not in rows:
+                continue
+            id_, document, metadata = rows[row]
+            doc = Document(page_content=document or "", metadata=json.loads(metadata or "{}"))
+            doc.id = id_
+            results.append((doc, score))
+        return results
+
+    def similarity_search(
+        self, query: str, k: int = 4, filter: Optional[dict] = None, **kwargs: Any
+    ) -> List[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score(query, k, filter)]
+
+    @classmethod
+    def from_texts(
+        cls,
+        texts: List[str],
+        embedding: Embeddings,
+        metadatas: Optional[List[dict]] = None,
+        path: str = os.path.join("_data", "vector_index", "default"),
+        **kwargs: Any,
+    ) -> "FlatIndex":
+        index = cls(embedding, path, **kwargs)
+        index.add_texts(texts, metadatas=metadatas)
+        return index
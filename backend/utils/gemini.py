@@ -8,6 +8,8 @@ from dotenv import load_dotenv
 from google import genai as streaming_genai
 from google.genai import types as streaming_types
 
+from utils import model_router
+
 # Load API KEY from .env
 load_dotenv()
 
@@ -20,19 +22,36 @@ if not GOOGLE_API_KEY:
 genai.configure(api_key=GOOGLE_API_KEY)
 
 
-async def generate_text(prompt: str, system_prompt: str = "") -> str:
+async def generate_text(
+    prompt: str,
+    system_prompt: str = "",
+    task_class: str = "default",
+    **generation_config,
+) -> str:
     """
-    Generates text using the Gemini 2.0 Flash model API.
+    Generates text using the Gemini model picked by the model router.
 
     Args:
         prompt: The user prompt.
         system_prompt: Optional system prompt to guide the model.
+        task_class: Routing class (see model_router.TASK_ROUTES), e.g.
+            "classification" for cheap steps or "synthesis" for long reports.
+        **generation_config: Optional temperature, top_p, top_k and
+            max_output_tokens overriding the route defaults.
 
     Returns:
         The generated text result.
+
+    Raises:
+        ValueError: If task_class is unknown.
+        TypeError: If a generation parameter is invalid.
     """
+    # Outside the try: a bad route or parameter is a caller bug, not model output.
+    model_name, config = model_router.route(
+        system_prompt + prompt, task_class, **generation_config
+    )
     try:
-        model = genai.GenerativeModel("gemini-2.0-flash-lite")
+        model = genai.GenerativeModel(model_name, generation_config=config)
         # Prepare the messages payload
         messages = []
         if system_prompt:
@@ -40,7 +59,9 @@ async def generate_text(prompt: str, system_prompt: str = "") -> str:
         messages.append({"role": "user", "parts": [prompt]})
 
         # Generate the response
-        response = model.generate_content(messages)  # type: ignore
+        # Async call, so concurrent callers (e.g. map-reduce summaries)
+        # overlap their requests instead of blocking the event loop.
+        response = await model.generate_content_async(messages)  # type: ignore
 
         # Check for safety rating or inappropriate content.
         if response.prompt_feedback:
@@ -57,13 +78,18 @@ async def generate_text(prompt: str, system_prompt: str = "") -> str:
 
 
 async def generate_json(
-    prompt, system_prompt="Give JSON OUTPUT, follow the schema if given."
+    prompt,
+    system_prompt="Give JSON OUTPUT, follow the schema if given.",
+    task_class="default",
+    **generation_config,
 ):
     client = streaming_genai.Client(
         api_key=os.environ.get("GEMINI_API_KEY"),
     )
 
-    model = "gemini-2.0-flash-lite"
+    model, config = model_router.route(
+        system_prompt + prompt, task_class, **generation_config
+    )
     contents = [
         streaming_types.Content(
             role="user",
@@ -79,10 +105,10 @@ async def generate_json(
         ),
     ]
     generate_content_config = streaming_types.GenerateContentConfig(
-        temperature=1,
-        top_p=0.95,
-        top_k=40,
-        max_output_tokens=8192,
+        temperature=config["temperature"],
+        top_p=config.get("top_p", 0.95),
+        top_k=config.get("top_k", 40),
+        max_output_tokens=config["max_output_tokens"],
         response_mime_type="application/json",
     )
 
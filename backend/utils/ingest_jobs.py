@@ -0,0 +1,232 @@
+# ai_agent_builder/utils/ingest_jobs.py
+import asyncio
+import logging
+import os
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from models import EmbeddingJob
+from utils import embeding
+
+logger = logging.getLogger(__name__)
+
+JOBS_DIR = os.path.join("_data", "rag", "jobs")
+
+if not os.path.exists(JOBS_DIR):
+    os.makedirs(JOBS_DIR)
+
+# Finished jobs kept (in memory and on disk) for status queries.
+JOB_HISTORY = int(os.getenv("INGEST_JOB_HISTORY", 200))
+
+ACTIVE = ("queued", "running")
+RESUMABLE = ("failed", "cancelled", "interrupted")
+
+_jobs: Dict[str, EmbeddingJob] = {}
+_tasks: Dict[str, asyncio.Task] = {}
+
+
+class JobError(ValueError):
+    """Raised when a job cannot be started, cancelled or resumed."""
+
+
+def _job_path(job_id: str) -> str:
+    return os.path.join(JOBS_DIR, f"{job_id}.json")
+
+
+def _save(job: EmbeddingJob):
+    # Written atomically, like the ingestion manifests.
+    path = _job_path(job.id)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        f.write(job.model_dump_json(indent=2))
+    os.replace(tmp_path, path)
+
+
+def _load():
+    """Loads persisted jobs. Jobs that were running when the server stopped become interrupted."""
+    for filename in os.listdir(JOBS_DIR):
+        if not filename.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(JOBS_DIR, filename), "r") as f:
+                job = EmbeddingJob.model_validate_json(f.read())
+        except Exception as e:
+            logger.warning(f"Skipping unreadable ingestion job {filename}: {e}")
+            continue
+        if job.status in ACTIVE:
+            job.status = "interrupted"
+            _save(job)
+        _jobs[job.id] = job
+
+
+def _prune():
+    finished = sorted(
+        (job for job in _jobs.values() if job.status not in ACTIVE),
+        key=lambda job: job.created_at,
+    )
+    for job in finished[: max(0, len(finished) - JOB_HISTORY)]:
+        del _jobs[job.id]
+        if os.path.exists(_job_path(job.id)):
+            os.remove(_job_path(job.id))
+
+
+def report(job: EmbeddingJob) -> dict:
+    """
+    Returns a job with its throughput and estimated time to completion.
+
+    Throughput is measured over the current run; the ETA assumes the remaining
+    sources take as long as the finished ones, which overestimates it when many
+    sources are unchanged.
+    """
+    data = job.model_dump()
+    progress = job.progress
+    done = sum(progress.get(key, 0) for key in ("added", "updated", "unchanged", "failed"))
+    elapsed = 0.0
+    if job.started_at:
+        elapsed = ((job.finished_at or datetime.now()) - job.started_at).total_seconds()
+    data["elapsed_seconds"] = round(elapsed, 1)
+    data["throughput"] = {
+        "sources_per_second": round(done / elapsed, 3) if elapsed else 0.0,
+        "chunks_per_second": round(progress.get("chunks_embedded", 0) / elapsed, 3) if elapsed else 0.0,
+        "bytes_per_second": round(progress.get("bytes_processed", 0) / elapsed) if elapsed else 0,
+    }
+    data["eta_seconds"] = None
+    if job.status == "running" and done:
+        remaining = max(0, progress.get("sources", 0) - done)
+        data["eta_seconds"] = round(remaining * elapsed / done, 1)
+    return data
+
+
+async def _run(job: EmbeddingJob):
+    job.status = "running"
+    job.runs += 1
+    job.started_at = datetime.now()
+    job.finished_at = None
+    job.error = None
+    job.progress = {}
+    _save(job)
+    try:
+        # The pipeline updates job.progress in place as documents move through it.
+        await embeding.run_rag_pipeline(
+            job.agent_id, urls=job.urls, texts=job.texts, progress=job.progress, paths=job.paths
+        )
+        job.status = "completed"
+    except asyncio.CancelledError:
+        job.status = "cancelled"
+        raise
+    except Exception as e:
+        logger.error(f"Ingestion job {job.id} for agent {job.agent_id} failed: {e}")
+        job.status = "failed"
+        job.error = str(e)
+    finally:
+        job.finished_at = datetime.now()
+        _tasks.pop(job.id, None)
+        _save(job)
+        _prune()
+        logger.info(f"Ingestion job {job.id} {job.status}: {job.progress}")
+
+
+def _start(job: EmbeddingJob):
+    job.status = "queued"
+    _save(job)
+    _tasks[job.id] = asyncio.create_task(_run(job))
+
+
+def active_job(agent_id: str) -> Optional[EmbeddingJob]:
+    """Returns the agent's queued or running job, if any."""
+    for job in _jobs.values():
+        if job.agent_id == agent_id and job.status in ACTIVE:
+            return job
+    return None
+
+
+def submit(
+    agent_id: str,
+    urls: Optional[list] = None,
+    texts: Optional[list] = None,
+    paths: Optional[list] = None,
+) -> EmbeddingJob:
+    """
+    Starts ingesting an agent's documents in the background: the upload
+    directories plus the given files, web pages and texts.
+
+    Returns:
+        The new job; poll get() for its progress.
+
+    Raises:
+        JobError: The agent already has an ingestion running. Two runs would
+            race on its manifest.
+    """
+    running = active_job(agent_id)
+    if running:
+        raise JobError(f"Agent {agent_id} already has ingestion job {running.id} {running.status}")
+    job = EmbeddingJob(
+        id=uuid.uuid4().hex,
+        agent_id=agent_id,
+        paths=list(paths or []),
+        urls=list(urls or []),
+        texts=list(texts or []),
+        created_at=datetime.now(),
+    )
+    _jobs[job.id] = job
+    _start(job)
+    return job
+
+
+def get(job_id: str) -> Optional[EmbeddingJob]:
+    """Returns a job by ID."""
+    return _jobs.get(job_id)
+
+
+def list_jobs(agent_id: Optional[str] = None) -> List[EmbeddingJob]:
+    """Returns jobs, newest first, optionally only those of one agent."""
+    jobs = [job for job in _jobs.values() if agent_id is None or job.agent_id == agent_id]
+    return sorted(jobs, key=lambda job: job.created_at, reverse=True)
+
+
+async def cancel(job_id: str) -> EmbeddingJob:
+    """
+    Cancels a queued or running job. Sources stored before the cancellation
+    stay indexed, and resume() continues from there.
+
+    Raises:
+        JobError: The job is unknown or not active.
+    """
+    job = _jobs.get(job_id)
+    if job is None or job.status not in ACTIVE:
+        raise JobError(f"No active ingestion job {job_id}")
+    task = _tasks.get(job_id)
+    if task is not None:
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+    if job.status in ACTIVE:
+        # Cancelled before _run started, so it never recorded the outcome.
+        job.status = "cancelled"
+        job.finished_at = datetime.now()
+        _tasks.pop(job_id, None)
+        _save(job)
+    return job
+
+
+def resume(job_id: str) -> EmbeddingJob:
+    """
+    Restarts a failed, cancelled or interrupted job. The ingestion manifest
+    was saved after every stored source, so finished sources are skipped as
+    unchanged and only the rest is processed.
+
+    Raises:
+        JobError: The job is unknown, not resumable, or its agent has another
+            job running.
+    """
+    job = _jobs.get(job_id)
+    if job is None or job.status not in RESUMABLE:
+        raise JobError(f"No resumable ingestion job {job_id}")
+    running = active_job(job.agent_id)
+    if running:
+        raise JobError(f"Agent {job.agent_id} already has ingestion job {running.id} {running.status}")
+    _start(job)
+    return job
+
+
+_load()
@@ -0,0 +1,201 @@
+# ai_agent_builder/utils/keyword_index.py
+import logging
+import math
+import os
+import re
+import sqlite3
+import threading
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+INDEX_DIR = os.path.join("_data", "rag")
+INDEX_DB_PATH = os.path.join(INDEX_DIR, "keyword_index.db")
+
+if not os.path.exists(INDEX_DIR):
+    os.makedirs(INDEX_DIR)
+
+# Okapi BM25 parameters.
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Words, keeping identifiers such as "GDPR-17", "ISO/IEC" or "12.3.4" whole.
+_TOKEN_RE = re.compile(r"\w+(?:[.\-/:]\w+)*")
+_SEPARATOR_RE = re.compile(r"[.\-/:]")
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the "
+    "this to was were will with".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercases and splits text into terms. A compound identifier yields the
+    whole identifier and its parts, so "art-17" matches "art-17" and "17".
+    """
+    terms = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        if token not in STOPWORDS:
+            terms.append(token)
+        parts = _SEPARATOR_RE.split(token)
+        if len(parts) > 1:
+            terms.extend(p for p in parts if p and p not in STOPWORDS)
+    return terms
+
+
+class _AgentIndex:
+    """In-memory inverted index of one agent's chunks."""
+
+    def __init__(self):
+        self.postings: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self.lengths: Dict[str, int] = {}
+        self.texts: Dict[str, str] = {}
+        self.total_length = 0
+
+    def add(self, chunk_id: str, text: str):
+        if chunk_id in self.texts:
+            self.remove(chunk_id)
+        terms = Counter(tokenize(text))
+        for term, tf in terms.items():
+            self.postings[term][chunk_id] = tf
+        length = sum(terms.values())
+        self.lengths[chunk_id] = length
+        self.texts[chunk_id] = text
+        self.total_length += length
+
+    def remove(self, chunk_id: str):
+        text = self.texts.pop(chunk_id, None)
+        if text is None:
+            return
+        for term in set(tokenize(text)):
+            postings = self.postings.get(term)
+            if postings is not None:
+                postings.pop(chunk_id, None)
+                if not postings:
+                    del self.postings[term]
+        self.total_length -= self.lengths.pop(chunk_id)
+
+    def search(self, query: str, k: int) -> List[Tuple[str, float]]:
+        count = len(self.texts)
+        if not count:
+            return []
+        avg_length = self.total_length / count
+        scores: Dict[str, float] = defaultdict(float)
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            df = len(postings)
+            idf = math.log(1 + (count - df + 0.5) / (df + 0.5))
+            for chunk_id, tf in postings.items():
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * self.lengths[chunk_id] / avg_length)
+                scores[chunk_id] += idf * tf * (BM25_K1 + 1) / (tf + norm)
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)[:k]
+
+
+# Chunk texts are persisted; the postings are rebuilt in memory the first
+# time an agent's index is used in this process.
+_lock = threading.Lock()
+_conn: Optional[sqlite3.Connection] = None
+_indexes: Dict[str, _AgentIndex] = {}
+
+
+def _connect() -> sqlite3.Connection:
+    global _conn
+    if _conn is None:
+        _conn = sqlite3.connect(INDEX_DB_PATH, check_same_thread=False)
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS keyword_chunks (
+                agent_id TEXT NOT NULL,
+                chunk_id TEXT NOT NULL,
+                text TEXT NOT NULL,
+                PRIMARY KEY (agent_id, chunk_id)
+            ) WITHOUT ROWID
+        """
+        )
+    return _conn
+
+
+def _index(agent_id: str) -> _AgentIndex:
+    # Callers hold _lock.
+    index = _indexes.get(agent_id)
+    if index is None:
+        index = _AgentIndex()
+        for chunk_id, text in _connect().execute(
+            "SELECT chunk_id, text FROM keyword_chunks WHERE agent_id = ?", (agent_id,)
+        ):
+            index.add(chunk_id, text)
+        _indexes[agent_id] = index
+    return index
+
+
+def add(agent_id: str, chunk_ids: List[str], texts: List[str]):
+    """Indexes (or re-indexes) chunks of an agent."""
+    with _lock:
+        index = _index(agent_id)
+        conn = _connect()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO keyword_chunks VALUES (?, ?, ?)",
+                [(agent_id, chunk_id, text) for chunk_id, text in zip(chunk_ids, texts)],
+            )
+        for chunk_id, text in zip(chunk_ids, texts):
+            index.add(chunk_id, text)
+
+
+def remove(agent_id: str, chunk_ids: List[str]):
+    """Removes chunks of an agent from the index."""
+    with _lock:
+        index = _index(agent_id)
+        conn = _connect()
+        with conn:
+            conn.executemany(
+                "DELETE FROM keyword_chunks WHERE agent_id = ? AND chunk_id = ?",
+                [(agent_id, chunk_id) for chunk_id in chunk_ids],
+            )
+        for chunk_id in chunk_ids:
+            index.remove(chunk_id)
+
+
+def drop(agent_id: str):
+    """Removes every chunk of an agent."""
+    with _lock:
+        conn = _connect()
+        with conn:
+            conn.execute("DELETE FROM keyword_chunks WHERE agent_id = ?", (agent_id,))
+        _indexes.pop(agent_id, None)
+
+
+def count(agent_id: str) -> int:
+    """Returns the number of indexed chunks of an agent."""
+    with _lock:
+        return len(_index(agent_id).texts)
+
+
+def search(agent_id: str, query: str, k: int = 3) -> List[Tuple[str, str, float]]:
+    """
+    Ranks an agent's chunks against a query with BM25.
+
+    Returns:
+        Up to k (chunk_id, text, score) tuples, best first.
+    """
+    with _lock:
+        index = _index(agent_id)
+        return [(chunk_id, index.texts[chunk_id], score) for chunk_id, score in index.search(query, k)]
+
+
+def rank_texts(query: str, texts: List[str]) -> List[int]:
+    """
+    Ranks ad-hoc texts against a query with BM25, without persisting them.
+
+    Returns:
+        Indexes of the texts matching at least one query term, best first.
+    """
+    index = _AgentIndex()
+    for i, text in enumerate(texts):
+        index.add(str(i), text)
+    return [int(chunk_id) for chunk_id, _ in index.search(query, len(texts))]
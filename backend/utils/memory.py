@@ -1,6 +1,20 @@
+import asyncio
+import glob
+import json
+import logging
 import sqlite3
 import os
-from typing import List, Optional
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+from models import MemoryRecord
+from utils.prompts import estimate_tokens
+
+logger = logging.getLogger(__name__)
 
 DATA_DIR = "_data"
 MEMORY_DIR = os.path.join(DATA_DIR, "memory")
@@ -8,80 +22,673 @@ MEMORY_DIR = os.path.join(DATA_DIR, "memory")
 if not os.path.exists(MEMORY_DIR):
     os.makedirs(MEMORY_DIR)
 
+# One database holds the memory of every agent.
+MEMORY_DB_PATH = os.path.join(MEMORY_DIR, "memory.db")
+
+# Milliseconds a writer waits on a locked database before raising.
+BUSY_TIMEOUT_MS = 5000
+
+# Default retention, overridable per agent with set_retention(). Entries
+# beyond the cap, or older than the max age (if set), are dropped on write.
+MAX_ENTRIES_PER_AGENT = int(os.getenv("MEMORY_MAX_ENTRIES", 20))
+MAX_AGE_SECONDS = (
+    float(os.getenv("MEMORY_MAX_AGE_SECONDS"))
+    if os.getenv("MEMORY_MAX_AGE_SECONDS")
+    else None
+)
+
+# Row used in agent_memory_policy for the process-wide defaults.
+DEFAULT_POLICY = "*"
+
+# seq is a per-agent monotonic counter: MAX(seq) is an index lookup on
+# (agent_id, seq), and ordering by it is exact even within one timestamp.
+_INSERT_SQL = """
+    INSERT INTO agent_memory
+        (agent_id, seq, task_type, status, ts, memory, tokens, has_result)
+    VALUES (
+        ?1,
+        (SELECT COALESCE(MAX(seq), 0) + 1 FROM agent_memory WHERE agent_id = ?1),
+        ?2, ?3, ?4, ?5, ?6, ?7
+    )
+"""
+
+_RECORD_COLUMNS = "id, agent_id, seq, task_type, status, ts, memory, tokens, has_result"
+
+# Columns added after the first release of the consolidated store.
+_ADDED_COLUMNS = {
+    "seq": "INTEGER",
+    "status": "TEXT",
+    "tokens": "INTEGER",
+    "has_result": "INTEGER NOT NULL DEFAULT 0",
+}
 
-def _get_memory_file_path(agent_id: str) -> str:
-    return os.path.join(MEMORY_DIR, f"{agent_id}_memory.db")
+_local = threading.local()
+_schema_lock = threading.Lock()
+_schema_ready = set()
 
+# All async memory I/O runs on this single thread. Being single-threaded it
+# also orders reads after any writes queued before them.
+_io_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="memory-io")
+_pending_lock = threading.Lock()
+_pending_writes = []  # (entry, future, loop), entry as taken by _put_many
 
-def _create_table(db_path: str):
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute(
+# Callables notified with the new MemoryRecords after each committed write.
+_write_listeners = []
+
+# Callables notified with {agent_id: [record ids]} removed by retention.
+_delete_listeners = []
+
+
+def _create_table(conn: sqlite3.Connection):
+    conn.executescript(
         """
         CREATE TABLE IF NOT EXISTS agent_memory (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
-            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-            memory TEXT
+            agent_id TEXT NOT NULL,
+            seq INTEGER,
+            task_type TEXT,
+            status TEXT,
+            ts REAL NOT NULL,
+            memory TEXT,
+            tokens INTEGER,
+            has_result INTEGER NOT NULL DEFAULT 0
+        );
+        CREATE TABLE IF NOT EXISTS agent_memory_result (
+            memory_id INTEGER PRIMARY KEY,
+            body TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS agent_memory_digest (
+            agent_id TEXT PRIMARY KEY,
+            digest TEXT NOT NULL,
+            through_seq INTEGER NOT NULL,
+            tokens INTEGER NOT NULL,
+            updated_at REAL NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS agent_memory_policy (
+            agent_id TEXT PRIMARY KEY,
+            max_entries INTEGER,
+            max_age_seconds REAL
+        );
+        CREATE TABLE IF NOT EXISTS agent_memory_deleted (
+            memory_id INTEGER PRIMARY KEY,
+            agent_id TEXT NOT NULL
+        );
+    """
+    )
+
+    # Databases created by older versions: add missing columns, backfill seq.
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(agent_memory)")]
+    for column, column_type in _ADDED_COLUMNS.items():
+        if column not in columns:
+            conn.execute(f"ALTER TABLE agent_memory ADD COLUMN {column} {column_type}")
+    if "seq" not in columns:
+        conn.execute(
+            """
+            UPDATE agent_memory SET seq = (
+                SELECT COUNT(*) FROM agent_memory AS m
+                WHERE m.agent_id = agent_memory.agent_id AND m.id <= agent_memory.id
+            )
+        """
         )
+
+    # Retention runs in a trigger, so each insert deletes at most the rows
+    # that fell out of the window via index range scans: constant cost no
+    # matter how much history exists. A NULL max age never matches.
+    conn.executescript(
+        """
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_agent_memory_agent_seq
+            ON agent_memory (agent_id, seq);
+        CREATE INDEX IF NOT EXISTS idx_agent_memory_agent_ts
+            ON agent_memory (agent_id, ts);
+        CREATE INDEX IF NOT EXISTS idx_agent_memory_agent_task_seq
+            ON agent_memory (agent_id, task_type, seq);
+        DROP INDEX IF EXISTS idx_agent_memory_agent_task_ts;
+
+        CREATE TRIGGER IF NOT EXISTS trg_agent_memory_retention
+        AFTER INSERT ON agent_memory
+        BEGIN
+            DELETE FROM agent_memory
+            WHERE agent_id = NEW.agent_id
+              AND seq <= NEW.seq - COALESCE(
+                  (SELECT max_entries FROM agent_memory_policy WHERE agent_id = NEW.agent_id),
+                  (SELECT max_entries FROM agent_memory_policy WHERE agent_id = '*')
+              );
+            DELETE FROM agent_memory
+            WHERE agent_id = NEW.agent_id
+              AND ts < NEW.ts - COALESCE(
+                  (SELECT max_age_seconds FROM agent_memory_policy WHERE agent_id = NEW.agent_id),
+                  (SELECT max_age_seconds FROM agent_memory_policy WHERE agent_id = '*')
+              );
+        END;
+
+        CREATE TRIGGER IF NOT EXISTS trg_agent_memory_result_cleanup
+        AFTER DELETE ON agent_memory
+        WHEN OLD.has_result
+        BEGIN
+            DELETE FROM agent_memory_result WHERE memory_id = OLD.id;
+        END;
+
+        -- Deleted ids are handed to delete listeners after the write commits.
+        CREATE TRIGGER IF NOT EXISTS trg_agent_memory_deleted
+        AFTER DELETE ON agent_memory
+        BEGIN
+            INSERT OR IGNORE INTO agent_memory_deleted VALUES (OLD.id, OLD.agent_id);
+        END;
     """
     )
+    conn.execute(
+        "INSERT OR REPLACE INTO agent_memory_policy VALUES (?, ?, ?)",
+        (DEFAULT_POLICY, MAX_ENTRIES_PER_AGENT, MAX_AGE_SECONDS),
+    )
     conn.commit()
-    conn.close()
 
 
-def get_all(agent_id: str) -> List[str]:
-    """Gets all memory entries for an agent."""
-    db_path = _get_memory_file_path(agent_id)
-    _create_table(db_path)  # Ensure table exists
+def _legacy_ts(value) -> float:
+    try:
+        # CURRENT_TIMESTAMP is UTC; a naive datetime would be read as local time.
+        return datetime.strptime(value, "%Y-%m-%d %H:%M:%S").replace(tzinfo=timezone.utc).timestamp()
+    except (TypeError, ValueError):
+        return time.time()
+
+
+def _migrate_legacy_files(conn: sqlite3.Connection):
+    """
+    Imports the old one-file-per-key databases (<agent_id>_memory.db) into the
+    consolidated store, then renames them so they are imported only once.
+    """
+    for legacy_path in glob.glob(os.path.join(MEMORY_DIR, "*_memory.db")):
+        agent_id = os.path.basename(legacy_path)[: -len("_memory.db")]
+        try:
+            legacy = sqlite3.connect(legacy_path)
+            rows = legacy.execute(
+                "SELECT timestamp, memory FROM agent_memory ORDER BY id"
+            ).fetchall()
+            legacy.close()
+        except sqlite3.Error as e:
+            logger.warning(f"Skipping legacy memory file {legacy_path}: {e}")
+            continue
+
+        with conn:
+            conn.executemany(
+                _INSERT_SQL,
+                [
+                    (agent_id, None, None, _legacy_ts(ts), memory, estimate_tokens(memory or ""), 0)
+                    for ts, memory in rows
+                ],
+            )
+        os.replace(legacy_path, legacy_path + ".migrated")
+        logger.info(f"Migrated {len(rows)} memory entries for {agent_id}")
+
+
+def _connect(db_path: str = MEMORY_DB_PATH) -> sqlite3.Connection:
+    """
+    Returns this thread's persistent connection to db_path.
+
+    Connections are opened once per (thread, database) and kept for the life
+    of the process. WAL lets readers proceed while a writer commits, and
+    synchronous=NORMAL only fsyncs at checkpoints, which is safe under WAL.
+    The schema is created the first time any thread opens the database.
+    """
+    connections: Dict[str, sqlite3.Connection] = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+
+    conn = connections.get(db_path)
+    if conn is not None:
+        return conn
+
+    conn = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT_MS / 1000)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS}")
+    conn.execute("PRAGMA temp_store=MEMORY")
+
+    with _schema_lock:
+        if db_path not in _schema_ready:
+            _create_table(conn)
+            _migrate_legacy_files(conn)
+            _schema_ready.add(db_path)
+
+    connections[db_path] = conn
+    return conn
+
+
+def close_all():
+    """Closes this thread's cached connections (e.g. on shutdown or in tests)."""
+    connections = getattr(_local, "connections", None) or {}
+    for conn in connections.values():
+        conn.close()
+    connections.clear()
 
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute("SELECT memory FROM agent_memory ORDER BY timestamp DESC")
-    rows = cursor.fetchall()
-    conn.close()
 
+def _task_filter(task_type: Optional[str]):
+    if task_type is None:
+        return "", ()
+    return " AND task_type = ?", (task_type,)
+
+
+def get_all(agent_id: str, task_type: Optional[str] = None) -> List[str]:
+    """Gets all memory entries for an agent, newest first."""
+    clause, params = _task_filter(task_type)
+    rows = _connect().execute(
+        "SELECT memory FROM agent_memory WHERE agent_id = ?"
+        + clause
+        + " ORDER BY seq DESC",
+        (agent_id, *params),
+    ).fetchall()
     return [row[0] for row in rows]
 
 
-def put(agent_id: str, memory: str):
-    """Puts a new memory entry for an agent, capping to 20 entries."""
-    db_path = _get_memory_file_path(agent_id)
-    _create_table(db_path)  # Ensure table exists
+def _to_record(row) -> MemoryRecord:
+    id_, agent_id, seq, task_type, status, ts, summary, tokens, has_result = row
+    return MemoryRecord(
+        id=id_,
+        agent_id=agent_id,
+        seq=seq,
+        task_type=task_type,
+        status=status,
+        ts=datetime.fromtimestamp(ts),
+        summary=summary or "",
+        tokens=tokens if tokens is not None else estimate_tokens(summary or ""),
+        result_ref=id_ if has_result else None,
+    )
 
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute("INSERT INTO agent_memory (memory) VALUES (?)", (memory,))
-    conn.commit()
 
-    # Enforce capping to 20 entries
-    cursor.execute(
-        """
-        DELETE FROM agent_memory
-        WHERE id NOT IN (
-            SELECT id FROM agent_memory
-            ORDER BY timestamp DESC
-            LIMIT 20
+def query(
+    agent_id: str,
+    task_type: Optional[str] = None,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    limit: Optional[int] = None,
+    max_tokens: Optional[int] = None,
+) -> List[MemoryRecord]:
+    """
+    Gets an agent's memory records, newest first.
+
+    Args:
+        agent_id: The agent whose memory is read.
+        task_type: Only return records written by this task type.
+        since: Inclusive lower bound, as a UNIX timestamp.
+        until: Exclusive upper bound, as a UNIX timestamp.
+        limit: Maximum number of records.
+        max_tokens: Stop before the summaries returned would exceed this many
+            tokens, so the result can be pasted into a prompt as is.
+
+    Returns:
+        A list of MemoryRecord. Full results are fetched with get_result().
+    """
+    clause, params = _task_filter(task_type)
+    sql = f"SELECT {_RECORD_COLUMNS} FROM agent_memory WHERE agent_id = ?" + clause
+    params = (agent_id, *params)
+    if since is not None:
+        sql += " AND ts >= ?"
+        params += (since,)
+    if until is not None:
+        sql += " AND ts < ?"
+        params += (until,)
+    sql += " ORDER BY seq DESC"
+    if limit is not None:
+        sql += " LIMIT ?"
+        params += (limit,)
+
+    records = []
+    used_tokens = 0
+    for row in _connect().execute(sql, params):
+        record = _to_record(row)
+        if max_tokens is not None and used_tokens + record.tokens > max_tokens:
+            break
+        used_tokens += record.tokens
+        records.append(record)
+    return records
+
+
+def get_records(record_ids: List[int]) -> List[MemoryRecord]:
+    """
+    Gets records by id, in the order given. Ids of records that were
+    dropped by retention are skipped.
+    """
+    if not record_ids:
+        return []
+    marks = ", ".join("?" * len(record_ids))
+    rows = _connect().execute(
+        f"SELECT {_RECORD_COLUMNS} FROM agent_memory WHERE id IN ({marks})",
+        tuple(record_ids),
+    ).fetchall()
+    by_id = {row[0]: _to_record(row) for row in rows}
+    return [by_id[i] for i in record_ids if i in by_id]
+
+
+def get_digest(agent_id: str) -> Optional[dict]:
+    """
+    Returns an agent's compacted digest of older records, if any.
+
+    Returns:
+        {"digest", "through_seq", "tokens", "updated_at"} or None. The digest
+        covers every record with seq <= through_seq.
+    """
+    row = _connect().execute(
+        "SELECT digest, through_seq, tokens, updated_at FROM agent_memory_digest "
+        "WHERE agent_id = ?",
+        (agent_id,),
+    ).fetchone()
+    if not row:
+        return None
+    return {"digest": row[0], "through_seq": row[1], "tokens": row[2], "updated_at": row[3]}
+
+
+def set_digest(agent_id: str, digest: str, through_seq: int):
+    """Stores an agent's digest, covering records up to through_seq."""
+    with _connect() as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO agent_memory_digest VALUES (?, ?, ?, ?, ?)",
+            (agent_id, digest, through_seq, estimate_tokens(digest), time.time()),
         )
+
+
+def pending_compaction(agent_id: str, keep_raw: int) -> List[MemoryRecord]:
     """
+    Returns records not yet folded into the digest, oldest first, excluding
+    the newest keep_raw records (those stay raw in prompts).
+    """
+    rows = _connect().execute(
+        f"""
+        SELECT {_RECORD_COLUMNS} FROM agent_memory
+        WHERE agent_id = ?1
+          AND seq > COALESCE(
+              (SELECT through_seq FROM agent_memory_digest WHERE agent_id = ?1), 0)
+          AND seq <= (SELECT MAX(seq) FROM agent_memory WHERE agent_id = ?1) - ?2
+        ORDER BY seq
+    """,
+        (agent_id, keep_raw),
+    ).fetchall()
+    return [_to_record(row) for row in rows]
+
+
+def agents_pending_compaction(keep_raw: int, min_records: int) -> List[str]:
+    """Returns agents with at least min_records records awaiting compaction."""
+    rows = _connect().execute(
+        """
+        SELECT m.agent_id FROM agent_memory AS m
+        LEFT JOIN agent_memory_digest AS d ON d.agent_id = m.agent_id
+        WHERE m.seq > COALESCE(d.through_seq, 0)
+        GROUP BY m.agent_id
+        HAVING COUNT(*) >= ?
+    """,
+        (keep_raw + min_records,),
+    ).fetchall()
+    return [row[0] for row in rows]
+
+
+def get_result(record_id: int) -> Any:
+    """Loads the full result stored with a record (see MemoryRecord.result_ref)."""
+    row = _connect().execute(
+        "SELECT body FROM agent_memory_result WHERE memory_id = ?", (record_id,)
+    ).fetchone()
+    return json.loads(row[0]) if row else None
+
+
+def format_records(records: List[MemoryRecord]) -> str:
+    """Renders records as prompt lines, oldest first."""
+    return "\n".join(
+        f"- [{r.ts:%Y-%m-%d %H:%M}] {r.task_type or 'note'}"
+        f"{f' ({r.status})' if r.status else ''}: {r.summary}"
+        for r in reversed(records)
     )
-    conn.commit()
-    conn.close()
 
 
-def get_latest(agent_id: str) -> Optional[str]:
-    """Gets the latest memory entry for an agent."""
-    db_path = _get_memory_file_path(agent_id)
-    _create_table(db_path)  # Ensure table exists
+def _put_many(entries: List[tuple]):
+    """Inserts (agent_id, memory, task_type, status, result) entries in one transaction."""
+    conn = _connect()
+    now = time.time()
+    ids = []
+    with conn:
+        for agent_id, memory, task_type, status, result in entries:
+            has_result = result is not None
+            cursor = conn.execute(
+                _INSERT_SQL,
+                (agent_id, task_type, status, now, memory, estimate_tokens(memory), int(has_result)),
+            )
+            ids.append(cursor.lastrowid)
+            if has_result:
+                conn.execute(
+                    "INSERT INTO agent_memory_result (memory_id, body) VALUES (?, ?)",
+                    (cursor.lastrowid, json.dumps(result, default=str)),
+                )
+        deleted_rows = conn.execute("SELECT memory_id, agent_id FROM agent_memory_deleted").fetchall()
+        if deleted_rows:
+            conn.execute("DELETE FROM agent_memory_deleted")
+
+    if _write_listeners:
+        records = get_records(ids)
+        for listener in _write_listeners:
+            try:
+                listener(records)
+            except Exception as e:
+                logger.error(f"Memory write listener failed: {e}")
+
+    if deleted_rows and _delete_listeners:
+        deleted = defaultdict(list)
+        for memory_id, agent_id in deleted_rows:
+            deleted[agent_id].append(memory_id)
+        for listener in _delete_listeners:
+            try:
+                listener(dict(deleted))
+            except Exception as e:
+                logger.error(f"Memory delete listener failed: {e}")
 
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    cursor.execute(
-        "SELECT memory FROM agent_memory ORDER BY timestamp DESC LIMIT 1"
+
+def add_write_listener(listener):
+    """
+    Registers a callable notified with the new MemoryRecords after each write.
+
+    Listeners run on the writing thread (the memory I/O thread for aput), so
+    they must hand any slow work off rather than doing it inline.
+    """
+    if listener not in _write_listeners:
+        _write_listeners.append(listener)
+
+
+def add_delete_listener(listener):
+    """
+    Registers a callable notified with {agent_id: [record ids]} after a write
+    whose retention policy deleted records. Runs on the writing thread, like
+    write listeners.
+    """
+    if listener not in _delete_listeners:
+        _delete_listeners.append(listener)
+
+
+def put(
+    agent_id: str,
+    memory: str,
+    task_type: Optional[str] = None,
+    status: Optional[str] = None,
+    result: Any = None,
+):
+    """
+    Puts a new memory entry for an agent, applying its retention policy.
+
+    Args:
+        agent_id: The agent the entry belongs to.
+        memory: Short summary of the entry; this is what prompts include.
+        task_type: The task type that produced the entry.
+        status: Outcome of the task, e.g. "success" or "error".
+        result: Optional full (JSON serializable) result, stored separately
+            and loaded on demand with get_result().
+    """
+    _put_many([(agent_id, memory, task_type, status, result)])
+
+
+def set_retention(
+    agent_id: str,
+    max_entries: Optional[int] = None,
+    max_age_seconds: Optional[float] = None,
+):
+    """
+    Sets an agent's retention policy, applied from its next write on.
+
+    Args:
+        agent_id: The agent to configure.
+        max_entries: Entries to keep; None falls back to MAX_ENTRIES_PER_AGENT.
+        max_age_seconds: Drop entries older than this; None falls back to
+            MAX_AGE_SECONDS.
+    """
+    with _connect() as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO agent_memory_policy VALUES (?, ?, ?)",
+            (agent_id, max_entries, max_age_seconds),
+        )
+
+
+def get_retention(agent_id: str) -> dict:
+    """Returns the effective {"max_entries", "max_age_seconds"} for an agent."""
+    rows = dict(
+        (row[0], row[1:])
+        for row in _connect().execute(
+            "SELECT agent_id, max_entries, max_age_seconds FROM agent_memory_policy "
+            "WHERE agent_id IN (?, ?)",
+            (agent_id, DEFAULT_POLICY),
+        )
     )
-    row = cursor.fetchone()
-    conn.close()
+    own = rows.get(agent_id, (None, None))
+    default = rows.get(DEFAULT_POLICY, (MAX_ENTRIES_PER_AGENT, MAX_AGE_SECONDS))
+    return {
+        "max_entries": own[0] if own[0] is not None else default[0],
+        "max_age_seconds": own[1] if own[1] is not None else default[1],
+    }
+
+
+def get_latest(agent_id: str, task_type: Optional[str] = None) -> Optional[str]:
+    """Gets the latest memory entry for an agent."""
+    clause, params = _task_filter(task_type)
+    row = _connect().execute(
+        "SELECT memory FROM agent_memory WHERE agent_id = ?"
+        + clause
+        + " ORDER BY seq DESC LIMIT 1",
+        (agent_id, *params),
+    ).fetchone()
 
     if row:
         return row[0]
     else:
         return None
+
+
+# ------------------------------------------------------------------
+# Async API: same semantics as the functions above, but never blocks the
+# event loop. Writes issued while a flush is queued are coalesced into one
+# transaction.
+# ------------------------------------------------------------------
+
+
+def _resolve(future: asyncio.Future, loop, error: Optional[BaseException]):
+    def _set():
+        if future.done():
+            return
+        if error is None:
+            future.set_result(None)
+        else:
+            future.set_exception(error)
+
+    loop.call_soon_threadsafe(_set)
+
+
+def _flush_writes():
+    with _pending_lock:
+        batch = list(_pending_writes)
+        _pending_writes.clear()
+    if not batch:
+        return
+
+    error = None
+    try:
+        _put_many([entry for entry, _, _ in batch])
+    except Exception as e:
+        error = e
+    for _, future, loop in batch:
+        _resolve(future, loop, error)
+
+
+async def _run_io(func, *args):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_io_executor, func, *args)
+
+
+async def aput(
+    agent_id: str,
+    memory: str,
+    task_type: Optional[str] = None,
+    status: Optional[str] = None,
+    result: Any = None,
+):
+    """Async put(). Returns once the entry is committed."""
+    loop = asyncio.get_running_loop()
+    future = loop.create_future()
+    entry = (agent_id, memory, task_type, status, result)
+    with _pending_lock:
+        _pending_writes.append((entry, future, loop))
+        schedule_flush = len(_pending_writes) == 1
+    if schedule_flush:
+        _io_executor.submit(_flush_writes)
+    await future
+
+
+async def aget_all(agent_id: str, task_type: Optional[str] = None) -> List[str]:
+    """Async get_all()."""
+    return await _run_io(get_all, agent_id, task_type)
+
+
+async def aquery(
+    agent_id: str,
+    task_type: Optional[str] = None,
+    since: Optional[float] = None,
+    until: Optional[float] = None,
+    limit: Optional[int] = None,
+    max_tokens: Optional[int] = None,
+) -> List[MemoryRecord]:
+    """Async query()."""
+    return await _run_io(query, agent_id, task_type, since, until, limit, max_tokens)
+
+
+async def aget_result(record_id: int) -> Any:
+    """Async get_result()."""
+    return await _run_io(get_result, record_id)
+
+
+async def aget_records(record_ids: List[int]) -> List[MemoryRecord]:
+    """Async get_records()."""
+    return await _run_io(get_records, record_ids)
+
+
+async def aget_digest(agent_id: str) -> Optional[dict]:
+    """Async get_digest()."""
+    return await _run_io(get_digest, agent_id)
+
+
+async def aset_digest(agent_id: str, digest: str, through_seq: int):
+    """Async set_digest()."""
+    await _run_io(set_digest, agent_id, digest, through_seq)
+
+
+async def apending_compaction(agent_id: str, keep_raw: int) -> List[MemoryRecord]:
+    """Async pending_compaction()."""
+    return await _run_io(pending_compaction, agent_id, keep_raw)
+
+
+async def aagents_pending_compaction(keep_raw: int, min_records: int) -> List[str]:
+    """Async agents_pending_compaction()."""
+    return await _run_io(agents_pending_compaction, keep_raw, min_records)
+
+
+async def aget_latest(agent_id: str, task_type: Optional[str] = None) -> Optional[str]:
+    """Async get_latest()."""
+    return await _run_io(get_latest, agent_id, task_type)
+
+
+async def aset_retention(
+    agent_id: str,
+    max_entries: Optional[int] = None,
+    max_age_seconds: Optional[float] = None,
+):
+    """Async set_retention()."""
+    await _run_io(set_retention, agent_id, max_entries, max_age_seconds)
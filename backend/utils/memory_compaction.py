@@ -0,0 +1,166 @@
+# ai_agent_builder/utils/memory_compaction.py
+import asyncio
+import logging
+import os
+from typing import Optional
+
+from utils import gemini, memory, memory_index, prompts
+from utils.prompts import CHARS_PER_TOKEN, estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Token budget of an agent's digest. The digest is rewritten, never appended
+# to, so it stays within this budget however long the agent runs.
+DIGEST_TOKENS = int(os.getenv("MEMORY_DIGEST_TOKENS", 600))
+
+# Newest records kept verbatim in prompts next to the digest.
+RAW_RECORDS = int(os.getenv("MEMORY_RAW_RECORDS", 3))
+
+# Older records needed before an agent is compacted, so the model is called
+# for a batch of entries rather than for every task run.
+MIN_RECORDS_TO_COMPACT = int(os.getenv("MEMORY_COMPACT_MIN_RECORDS", 4))
+
+# Seconds between compaction passes. Keep it short relative to how fast
+# retention (MEMORY_MAX_ENTRIES) evicts records, or they are never folded in.
+COMPACTION_INTERVAL_SECONDS = int(os.getenv("MEMORY_COMPACT_INTERVAL", 300))
+
+_DIGEST_PROMPT = prompts.register(
+    "memory.digest",
+    """You maintain the long-term memory of an AI agent as a compact digest.
+
+Current digest (may be empty):
+{digest}
+
+New task records, oldest first:
+{records}
+
+Rewrite the digest so it also covers the new records. Keep facts that matter
+for future work: outcomes, recurring failures, open follow-ups, key numbers
+and dates. Drop repetition and routine detail. Use short bullet points, merge
+related items and keep the whole digest under {max_words} words.
+Return only the digest.
+""",
+)
+
+
+def _clip(text: str, max_tokens: int) -> str:
+    """Cuts text to roughly max_tokens, at a line break where possible."""
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars]
+    return cut[: cut.rfind("\n")] if "\n" in cut else cut
+
+
+async def compact_agent(agent_id: str) -> bool:
+    """
+    Folds an agent's older records into its digest.
+
+    Args:
+        agent_id: The agent to compact.
+
+    Returns:
+        True if the digest was updated.
+    """
+    pending = await memory.apending_compaction(agent_id, RAW_RECORDS)
+    if len(pending) < MIN_RECORDS_TO_COMPACT:
+        return False
+
+    current = await memory.aget_digest(agent_id)
+    prompt = _DIGEST_PROMPT.render(
+        digest=current["digest"] if current else "",
+        records=memory.format_records(list(reversed(pending))),
+        max_words=int(DIGEST_TOKENS * 0.75),
+    )
+    digest = await gemini.generate_text(
+        prompt, task_class="extraction", max_output_tokens=DIGEST_TOKENS
+    )
+    if not digest or digest.startswith("Error generating text"):
+        logger.warning(f"Memory compaction failed for agent {agent_id}: {digest}")
+        return False
+
+    digest = _clip(digest.strip(), DIGEST_TOKENS)
+    await memory.aset_digest(agent_id, digest, pending[-1].seq)
+    logger.info(
+        f"Compacted {len(pending)} memory records for agent {agent_id} "
+        f"into a ~{estimate_tokens(digest)} token digest"
+    )
+    return True
+
+
+async def compact_all() -> int:
+    """Compacts every agent with enough pending records. Returns the count."""
+    agent_ids = await memory.aagents_pending_compaction(
+        RAW_RECORDS, MIN_RECORDS_TO_COMPACT
+    )
+    compacted = 0
+    for agent_id in agent_ids:
+        try:
+            compacted += await compact_agent(agent_id)
+        except Exception as e:
+            logger.error(f"Error compacting memory for agent {agent_id}: {e}")
+    return compacted
+
+
+async def run_compactor():
+    """Periodically compacts agent memory in the background."""
+    logger.info("Memory compactor started.")
+    while True:
+        try:
+            await compact_all()
+        except Exception as e:
+            logger.error(f"Error in memory compaction loop: {e}")
+        finally:
+            await asyncio.sleep(COMPACTION_INTERVAL_SECONDS)
+
+
+async def build_context(
+    agent_id: str, max_tokens: int, query: Optional[str] = None
+) -> str:
+    """
+    Builds the memory section of a prompt: the digest plus the newest records
+    and, when a query is given, the older records most relevant to it.
+
+    Args:
+        agent_id: The agent whose memory is rendered.
+        max_tokens: Budget for the raw records; the digest has its own
+            fixed budget (DIGEST_TOKENS).
+        query: What the prompt is about, e.g. the user's message.
+
+    Returns:
+        The rendered memory, or an empty string if the agent has none.
+    """
+    digest = await memory.aget_digest(agent_id)
+    records = await memory.aquery(
+        agent_id,
+        limit=RAW_RECORDS if query else None,
+        max_tokens=max_tokens,
+    )
+    # Only records the digest does not cover yet are shown raw: the newest
+    # RAW_RECORDS plus any not compacted since the last pass.
+    if digest is not None:
+        records = [r for r in records if r.seq > digest["through_seq"]]
+
+    relevant = []
+    if query:
+        budget = max_tokens - sum(r.tokens for r in records)
+        try:
+            relevant = await memory_index.arecall(agent_id, query, max_tokens=budget)
+        except Exception as e:
+            logger.warning(f"Memory recall failed for agent {agent_id}: {e}")
+        shown = {r.id for r in records}
+        relevant = sorted(
+            (r for r in relevant if r.id not in shown),
+            key=lambda r: r.seq,
+            reverse=True,
+        )
+
+    sections = []
+    if digest is not None:
+        sections.append(f"Summary of earlier work:\n{digest['digest']}")
+    if relevant:
+        sections.append(f"Relevant earlier tasks:\n{memory.format_records(relevant)}")
+    if records:
+        recent = memory.format_records(records)
+        sections.append(f"Most recent tasks:\n{recent}" if sections else recent)
+    return "\n\n".join(sections)
@@ -0,0 +1,135 @@
+# ai_agent_builder/utils/memory_index.py
+import asyncio
+import logging
+import os
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from langchain_core.vectorstores import VectorStore
+
+from models import MemoryRecord
+from utils import memory, vector_store
+
+logger = logging.getLogger(__name__)
+
+PERSIST_DIR = os.path.join("_data", "chroma_memory")
+
+# Memory records recalled per prompt.
+RECALL_K = int(os.getenv("MEMORY_RECALL_K", 5))
+
+# Embedding is CPU bound, so indexing and recall run on this thread, off both
+# the event loop and the memory I/O thread.
+_index_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="memory-index")
+
+
+def _store(agent_id: str) -> VectorStore:
+    """Returns the agent's vector index, one collection per agent."""
+    return vector_store.get_agent_store(agent_id, "memory", PERSIST_DIR)
+
+
+def drop(agent_id: str):
+    """Deletes an agent's memory index."""
+    vector_store.drop_agent_store(agent_id, "memory", PERSIST_DIR)
+
+
+def index_records(records: List[MemoryRecord]):
+    """Embeds memory records into their agents' indexes (upsert by record id)."""
+    by_agent = defaultdict(list)
+    for record in records:
+        by_agent[record.agent_id].append(record)
+
+    for agent_id, agent_records in by_agent.items():
+        _store(agent_id).add_texts(
+            [f"{r.task_type or 'note'}: {r.summary}" for r in agent_records],
+            metadatas=[
+                {"record_id": r.id, "seq": r.seq, "task_type": r.task_type or ""}
+                for r in agent_records
+            ],
+            ids=[str(r.id) for r in agent_records],
+        )
+
+
+def _index_in_background(records: List[MemoryRecord]):
+    try:
+        index_records(records)
+    except Exception as e:
+        logger.error(f"Error indexing memory records: {e}")
+
+
+def _on_write(records: List[MemoryRecord]):
+    if records:
+        _index_executor.submit(_index_in_background, records)
+
+
+def _prune_in_background(deleted: Dict[str, List[int]]):
+    for agent_id, record_ids in deleted.items():
+        try:
+            _store(agent_id).delete(ids=[str(i) for i in record_ids])
+        except Exception as e:
+            logger.error(f"Error pruning memory index of agent {agent_id}: {e}")
+
+
+def _on_delete(deleted: Dict[str, List[int]]):
+    # Same thread as indexing, so a record is never re-added after its delete.
+    _index_executor.submit(_prune_in_background, deleted)
+
+
+memory.add_write_listener(_on_write)
+memory.add_delete_listener(_on_delete)
+
+
+def recall(
+    agent_id: str,
+    query: str,
+    k: int = RECALL_K,
+    max_tokens: Optional[int] = None,
+) -> List[MemoryRecord]:
+    """
+    Gets the agent's memory records most relevant to a query.
+
+    Args:
+        agent_id: The agent whose memory is searched.
+        query: Text to match, e.g. the user's prompt.
+        k: Maximum number of records.
+        max_tokens: Stop before the summaries would exceed this many tokens.
+
+    Returns:
+        MemoryRecords, most relevant first.
+    """
+    store = _store(agent_id)
+    if not store.get(limit=1)["ids"]:
+        # Records written before the index existed.
+        index_records(memory.query(agent_id))
+
+    # Retention deletes are pruned as they happen (_on_delete); over-fetch and
+    # prune here too for any missed, e.g. by a crash before the prune ran.
+    docs = store.similarity_search(query, k=k * 2)
+    ids = [int(doc.metadata["record_id"]) for doc in docs]
+    records = memory.get_records(ids)
+    live = {r.id for r in records}
+    stale = [str(i) for i in ids if i not in live]
+    if stale:
+        store.delete(ids=stale)
+
+    selected = []
+    used_tokens = 0
+    for record in records[:k]:
+        if max_tokens is not None and used_tokens + record.tokens > max_tokens:
+            break
+        used_tokens += record.tokens
+        selected.append(record)
+    return selected
+
+
+async def arecall(
+    agent_id: str,
+    query: str,
+    k: int = RECALL_K,
+    max_tokens: Optional[int] = None,
+) -> List[MemoryRecord]:
+    """Async recall()."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _index_executor, recall, agent_id, query, k, max_tokens
+    )
@@ -0,0 +1,206 @@
+# ai_agent_builder/utils/model_router.py
+import json
+import logging
+import os
+from typing import Dict, Tuple
+
+from utils.prompts import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Known models, ordered from fastest/cheapest (tier 0) to largest.
+# Latency figures are rough planning numbers, prices are USD per 1M tokens.
+MODELS: Dict[str, dict] = {
+    "gemini-2.0-flash-lite": {
+        "tier": 0,
+        "base_latency_ms": 300,
+        "ms_per_1k_input_tokens": 40,
+        "ms_per_output_token": 4,
+        "input_cost_per_mtok": 0.075,
+        "output_cost_per_mtok": 0.30,
+        "context_tokens": 1_048_576,
+    },
+    "gemini-2.0-flash": {
+        "tier": 1,
+        "base_latency_ms": 400,
+        "ms_per_1k_input_tokens": 60,
+        "ms_per_output_token": 6,
+        "input_cost_per_mtok": 0.10,
+        "output_cost_per_mtok": 0.40,
+        "context_tokens": 1_048_576,
+    },
+    "gemini-2.5-pro": {
+        "tier": 2,
+        "base_latency_ms": 1500,
+        "ms_per_1k_input_tokens": 150,
+        "ms_per_output_token": 12,
+        "input_cost_per_mtok": 1.25,
+        "output_cost_per_mtok": 10.0,
+        "context_tokens": 1_048_576,
+    },
+}
+
+# Per task class: latency/cost targets for one call, the minimum model tier,
+# the prompt size above which the tier is raised by one, and default
+# generation parameters.
+TASK_ROUTES: Dict[str, dict] = {
+    "classification": {
+        "max_latency_ms": 3000,
+        "max_cost_usd": 0.001,
+        "min_tier": 0,
+        "escalate_above_tokens": None,
+        "generation": {"temperature": 0.0, "max_output_tokens": 512},
+    },
+    "extraction": {
+        "max_latency_ms": 15000,
+        "max_cost_usd": 0.005,
+        "min_tier": 0,
+        "escalate_above_tokens": None,
+        "generation": {"temperature": 0.2, "max_output_tokens": 2048},
+    },
+    "chat": {
+        "max_latency_ms": 8000,
+        "max_cost_usd": 0.005,
+        "min_tier": 0,
+        "escalate_above_tokens": 32_000,
+        "generation": {"temperature": 0.7, "max_output_tokens": 1024},
+    },
+    "drafting": {
+        "max_latency_ms": 20000,
+        "max_cost_usd": 0.01,
+        "min_tier": 0,
+        "escalate_above_tokens": 16_000,
+        "generation": {"temperature": 0.9, "max_output_tokens": 2048},
+    },
+    "synthesis": {
+        "max_latency_ms": 120000,
+        "max_cost_usd": 0.25,
+        "min_tier": 1,
+        "escalate_above_tokens": 8_000,
+        "generation": {"temperature": 0.4, "max_output_tokens": 8192},
+    },
+    "default": {
+        "max_latency_ms": 60000,
+        "max_cost_usd": 0.01,
+        "min_tier": 0,
+        "escalate_above_tokens": None,
+        "generation": {"temperature": 1.0, "max_output_tokens": 8192},
+    },
+}
+
+GENERATION_KEYS = ("temperature", "top_p", "top_k", "max_output_tokens")
+
+# Optional JSON file ({"models": {...}, "routes": {...}}) merged over the
+# defaults above, so targets can be tuned per deployment without code changes.
+ROUTES_FILE = os.getenv("GEMINI_ROUTES_FILE")
+if ROUTES_FILE and os.path.exists(ROUTES_FILE):
+    with open(ROUTES_FILE, "r") as f:
+        _overrides = json.load(f)
+    for _name, _spec in _overrides.get("models", {}).items():
+        MODELS.setdefault(_name, {}).update(_spec)
+    for _name, _spec in _overrides.get("routes", {}).items():
+        TASK_ROUTES.setdefault(_name, dict(TASK_ROUTES["default"])).update(_spec)
+
+
+def estimate_latency_ms(model: str, prompt_tokens: int, output_tokens: int) -> float:
+    """Estimates worst-case latency of one call in milliseconds."""
+    spec = MODELS[model]
+    return (
+        spec["base_latency_ms"]
+        + spec["ms_per_1k_input_tokens"] * prompt_tokens / 1000
+        + spec["ms_per_output_token"] * output_tokens
+    )
+
+
+def estimate_cost_usd(model: str, prompt_tokens: int, output_tokens: int) -> float:
+    """Estimates worst-case cost of one call in USD."""
+    spec = MODELS[model]
+    return (
+        prompt_tokens * spec["input_cost_per_mtok"]
+        + output_tokens * spec["output_cost_per_mtok"]
+    ) / 1_000_000
+
+
+def route(
+    prompt: str, task_class: str = "default", **generation_overrides
+) -> Tuple[str, dict]:
+    """
+    Picks a model and generation parameters for a call.
+
+    The cheapest model at or above the task's minimum tier that fits the
+    prompt and meets the latency and cost targets is selected. Long prompts
+    for classes with ``escalate_above_tokens`` start one tier higher.
+
+    Args:
+        prompt: The full prompt text (including any system prompt).
+        task_class: One of TASK_ROUTES.
+        **generation_overrides: temperature, top_p, top_k or
+            max_output_tokens supplied by the caller. None values are ignored.
+
+    Returns:
+        A (model_name, generation_config) tuple.
+
+    Raises:
+        ValueError: If task_class is not a known route.
+        TypeError: If a generation parameter is unknown or not a number.
+    """
+    spec = TASK_ROUTES.get(task_class)
+    if spec is None:
+        raise ValueError(f"Unknown task class '{task_class}'; expected one of {sorted(TASK_ROUTES)}")
+
+    generation = dict(spec["generation"])
+    for key, value in generation_overrides.items():
+        if key not in GENERATION_KEYS:
+            raise TypeError(f"Unsupported generation parameter: {key}")
+        if value is None:
+            continue
+        if isinstance(value, bool) or not isinstance(value, (int, float)):
+            raise TypeError(f"Generation parameter {key} must be a number, got {value!r}")
+        generation[key] = value
+
+    prompt_tokens = estimate_tokens(prompt)
+    output_tokens = generation.get("max_output_tokens") or 0
+
+    min_tier = spec["min_tier"]
+    escalate = spec.get("escalate_above_tokens")
+    if escalate and prompt_tokens > escalate:
+        min_tier += 1
+
+    by_tier = sorted(MODELS, key=lambda name: MODELS[name]["tier"])
+    fitting = [
+        name for name in by_tier
+        if MODELS[name]["context_tokens"] >= prompt_tokens + output_tokens
+    ]
+    for name in fitting:
+        if MODELS[name]["tier"] < min_tier:
+            continue
+        if estimate_latency_ms(name, prompt_tokens, output_tokens) > spec["max_latency_ms"]:
+            continue
+        if estimate_cost_usd(name, prompt_tokens, output_tokens) > spec["max_cost_usd"]:
+            continue
+        return name, generation
+
+    # Nothing meets the targets: take the smallest model that satisfies the
+    # tier requirement, otherwise the largest model whose context fits.
+    eligible = [name for name in fitting if MODELS[name]["tier"] >= min_tier]
+    fallback = eligible[0] if eligible else (fitting[-1] if fitting else by_tier[-1])
+    logger.warning(
+        f"No model meets '{task_class}' targets for ~{prompt_tokens} prompt tokens; "
+        f"falling back to {fallback}"
+    )
+    return fallback, generation
+
+
+def describe(prompt: str, task_class: str = "default", **generation_overrides) -> dict:
+    """Returns the routing decision with its latency and cost estimates."""
+    model, generation = route(prompt, task_class, **generation_overrides)
+    prompt_tokens = estimate_tokens(prompt)
+    output_tokens = generation.get("max_output_tokens") or 0
+    return {
+        "task_class": task_class,
+        "model": model,
+        "generation": generation,
+        "prompt_tokens": prompt_tokens,
+        "est_latency_ms": round(estimate_latency_ms(model, prompt_tokens, output_tokens)),
+        "est_cost_usd": round(estimate_cost_usd(model, prompt_tokens, output_tokens), 6),
+    }
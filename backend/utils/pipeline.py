@@ -0,0 +1,100 @@
+# ai_agent_builder/utils/pipeline.py
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable, Optional
+
+# Marks the end of a stage's input.
+_DONE = object()
+
+
+class _Failed:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+async def iterate(items: Iterable) -> AsyncIterator:
+    """Turns a plain iterable into the async source of a pipeline."""
+    for item in items:
+        yield item
+
+
+async def stage(
+    items: AsyncIterator,
+    func: Callable[[Any], Awaitable[Optional[Any]]],
+    concurrency: int = 1,
+    queue_size: int = 8,
+) -> AsyncIterator:
+    """
+    One pipeline stage: applies func to every item of an async iterator with
+    up to `concurrency` calls in flight, yielding results as they complete.
+
+    Input and output are bounded queues of `queue_size` items, so a slow
+    downstream stage pauses this one (and transitively its sources) instead
+    of letting work pile up in memory. Stages compose by nesting:
+    ``stage(stage(source, extract, 4), embed, 1)``.
+
+    Args:
+        items: The upstream stage or source.
+        func: Async callable; returning None drops the item.
+        concurrency: Worker tasks running func.
+        queue_size: Capacity of the input and output queues.
+
+    Yields:
+        func's results, in completion order.
+
+    Raises:
+        Whatever func or the upstream iterator raised; the stage stops.
+    """
+    inbox: asyncio.Queue = asyncio.Queue(queue_size)
+    outbox: asyncio.Queue = asyncio.Queue(queue_size)
+
+    async def feed():
+        try:
+            async for item in items:
+                await inbox.put(item)
+        except Exception as e:
+            await outbox.put(_Failed(e))
+            return
+        for _ in range(concurrency):
+            await inbox.put(_DONE)
+
+    async def work():
+        while True:
+            item = await inbox.get()
+            if item is _DONE:
+                await outbox.put(_DONE)
+                return
+            try:
+                result = await func(item)
+            except Exception as e:
+                await outbox.put(_Failed(e))
+                continue
+            if result is not None:
+                await outbox.put(result)
+
+    tasks = [asyncio.create_task(feed())]
+    tasks += [asyncio.create_task(work()) for _ in range(concurrency)]
+    try:
+        finished = 0
+        while finished < concurrency:
+            result = await outbox.get()
+            if result is _DONE:
+                finished += 1
+            elif isinstance(result, _Failed):
+                raise result.error
+            else:
+                yield result
+    finally:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        # Let the upstream stages stop their own workers too.
+        if hasattr(items, "aclose"):
+            await items.aclose()
+
+
+async def drain(items: AsyncIterator) -> int:
+    """Runs a pipeline to completion. Returns the number of final results."""
+    count = 0
+    async for _ in items:
+        count += 1
+    return count
@@ -0,0 +1,187 @@
+# ai_agent_builder/utils/prompts.py
+import logging
+import math
+import string
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Rough chars-per-token ratio for Gemini models on English prose. Good enough
+# for budgeting and for spotting waste; not a substitute for count_tokens().
+CHARS_PER_TOKEN = 4
+
+# A placeholder rendered more than once is only reported at render time when
+# its value is at least this many tokens (short values are cheap to repeat).
+LARGE_INTERPOLATION_TOKENS = 200
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimates the number of tokens a string costs as model input."""
+    if not text:
+        return 0
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+class PromptTemplate:
+    """
+    A prompt template compiled once at import time.
+
+    Compilation parses the template with ``string.Formatter`` so that the set
+    of placeholders (and how often each one is interpolated) is known before
+    the first render.
+    """
+
+    def __init__(self, name: str, template: str):
+        self.name = name
+        self.template = template
+        self.placeholders: Dict[str, int] = {}
+
+        static_text = []
+        for literal, field, spec, conversion in string.Formatter().parse(template):
+            static_text.append(literal)
+            if field is None:
+                continue
+            if not field.isidentifier():
+                raise ValueError(
+                    f"Prompt '{name}' uses unsupported placeholder '{{{field}}}'. "
+                    "Only simple named placeholders are allowed."
+                )
+            self.placeholders[field] = self.placeholders.get(field, 0) + 1
+
+        self.static_tokens = estimate_tokens("".join(static_text))
+        self.renders = 0
+        self.rendered_tokens = 0
+
+    @property
+    def repeated(self) -> Dict[str, int]:
+        """Placeholders that are interpolated more than once."""
+        return {k: v for k, v in self.placeholders.items() if v > 1}
+
+    def render(self, **values) -> str:
+        """
+        Renders the template after validating the supplied values.
+
+        Args:
+            **values: One value per placeholder in the template.
+
+        Returns:
+            The rendered prompt.
+
+        Raises:
+            ValueError: If a placeholder is missing or an unknown value is given.
+        """
+        missing = sorted(set(self.placeholders) - set(values))
+        unknown = sorted(set(values) - set(self.placeholders))
+        if missing or unknown:
+            raise ValueError(
+                f"Prompt '{self.name}' render mismatch: "
+                f"missing={missing} unknown={unknown}"
+            )
+
+        rendered = self.template.format(**values)
+        cost = estimate_tokens(rendered)
+        self.renders += 1
+        self.rendered_tokens += cost
+
+        for field, count in self.repeated.items():
+            value_tokens = estimate_tokens(str(values[field]))
+            if value_tokens >= LARGE_INTERPOLATION_TOKENS:
+                logger.warning(
+                    f"Prompt '{self.name}' interpolates '{field}' {count} times: "
+                    f"~{value_tokens * (count - 1)} wasted input tokens"
+                )
+
+        logger.debug(
+            f"Rendered prompt '{self.name}': ~{cost} tokens "
+            f"(static ~{self.static_tokens}, interpolated ~{cost - self.static_tokens})"
+        )
+        return rendered
+
+
+_REGISTRY: Dict[str, PromptTemplate] = {}
+
+
+def register(name: str, template: str) -> PromptTemplate:
+    """
+    Compiles a prompt template and adds it to the registry.
+
+    Args:
+        name: Unique name, conventionally "<task_type>.<stage>".
+        template: A str.format style template.
+
+    Returns:
+        The compiled PromptTemplate.
+    """
+    if name in _REGISTRY:
+        raise ValueError(f"Prompt '{name}' is already registered.")
+    compiled = PromptTemplate(name, template)
+    for field, count in compiled.repeated.items():
+        logger.warning(f"Prompt '{name}' interpolates '{field}' {count} times.")
+    _REGISTRY[name] = compiled
+    return compiled
+
+
+def get(name: str) -> PromptTemplate:
+    """Returns a registered template, raising KeyError if it is unknown."""
+    return _REGISTRY[name]
+
+
+def render(name: str, **values) -> str:
+    """Renders a registered template. See PromptTemplate.render."""
+    return get(name).render(**values)
+
+
+def lint() -> List[str]:
+    """
+    Checks every registered template for repeated interpolations.
+
+    Returns:
+        A list of human readable problems, empty if all templates are clean.
+    """
+    problems = []
+    for name, compiled in sorted(_REGISTRY.items()):
+        for field, count in compiled.repeated.items():
+            problems.append(f"{name}: '{{{field}}}' is interpolated {count} times")
+    return problems
+
+
+def report(name: Optional[str] = None) -> List[dict]:
+    """
+    Reports static and rendered token costs for registered templates.
+
+    Args:
+        name: Restrict the report to a single template.
+
+    Returns:
+        One dict per template with its placeholders and token statistics.
+    """
+    templates = [get(name)] if name else [_REGISTRY[k] for k in sorted(_REGISTRY)]
+    return [
+        {
+            "name": t.name,
+            "placeholders": dict(t.placeholders),
+            "static_tokens": t.static_tokens,
+            "renders": t.renders,
+            "avg_rendered_tokens": (t.rendered_tokens // t.renders) if t.renders else 0,
+        }
+        for t in templates
+    ]
+
+
+if __name__ == "__main__":
+    # python -m utils.prompts  (from backend/) lints every task prompt.
+    import importlib
+    import os
+
+    tasks_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "tasks")
+    for filename in sorted(os.listdir(tasks_dir)):
+        if filename.endswith(".py"):
+            importlib.import_module(f"tasks.{filename[:-3]}")
+
+    for row in report():
+        print(f"{row['name']}: ~{row['static_tokens']} static tokens, "
+              f"placeholders={row['placeholders']}")
+    issues = lint()
+    for issue in issues:
+        print(f"LINT: {issue}")
+    raise SystemExit(1 if issues else 0)
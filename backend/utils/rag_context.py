@@ -0,0 +1,186 @@
+# ai_agent_builder/utils/rag_context.py
+import asyncio
+import logging
+import os
+import time
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+from models import AgentConfiguration
+from utils import extraction, ingest_jobs, keyword_index, rag_manifest, retrieval
+from utils.prompts import estimate_tokens
+from utils.sumarizer import split_text
+
+logger = logging.getLogger(__name__)
+
+# Prompt tokens spent on retrieved passages per task.
+CONTEXT_TOKENS = int(os.getenv("RAG_CONTEXT_TOKENS", 1500))
+
+# Chunks retrieved per query, before the token budget is applied.
+TOP_K = int(os.getenv("RAG_TOP_K", 6))
+
+# Retrieval mode (see utils/retrieval.py); hybrid also finds exact terms
+# such as clause names and product IDs.
+MODE = os.getenv("RAG_MODE", "hybrid")
+
+# Size of the passages a single document is cut into by select_passages.
+PASSAGE_TOKENS = 200
+
+# Seconds before the same out-of-date documents are submitted for indexing
+# again (after a failed ingestion), and between rechecks of URL documents,
+# whose changes are only seen by fetching them.
+REINDEX_SECONDS = float(os.getenv("RAG_REINDEX_SECONDS", 600))
+
+# Per agent: the out-of-date documents of its last submission and when it
+# was made, so a document that fails to ingest is not resubmitted on every
+# task run.
+_submitted: Dict[str, Tuple[FrozenSet[Tuple[str, tuple]], float]] = {}
+
+
+def document_sources(agent_config: AgentConfiguration) -> Tuple[List[str], List[str]]:
+    """
+    Splits an agent's configured documents into file paths and URLs.
+
+    Returns:
+        (paths, urls). Files without an extractor are left out.
+    """
+    paths, urls = [], []
+    for document in agent_config.documents:
+        if document.path.startswith(("http://", "https://")):
+            urls.append(document.path)
+        elif os.path.splitext(document.path)[1].lower() in extraction.FORMATS:
+            paths.append(os.path.normpath(document.path))
+        else:
+            logger.warning(f"Agent {agent_config.id}: no extractor for document {document.path}")
+    return paths, urls
+
+
+def _stale_sources(paths: List[str], urls: List[str], manifest: dict) -> FrozenSet[Tuple[str, tuple]]:
+    """
+    Files not indexed or changed since (size/mtime, as ingestion checks), and
+    URLs not indexed, each with the file version seen, so that a change
+    after a failed submission counts as new.
+    """
+    stale = [(url, ()) for url in urls if url not in manifest]
+    for path in paths:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            # Missing: the ingestion reports it, and is retried after REINDEX_SECONDS.
+            stale.append((path, ()))
+            continue
+        if not rag_manifest.stat_unchanged(manifest.get(path), stat):
+            stale.append((path, (stat.st_size, stat.st_mtime_ns)))
+    return frozenset(stale)
+
+
+def ensure_indexed(agent_config: AgentConfiguration) -> Optional[str]:
+    """
+    Starts a background ingestion when some of the agent's documents are not
+    in its index or changed since, and every REINDEX_SECONDS while it has
+    URL documents. Tasks running meanwhile get whatever is indexed so far.
+
+    Returns:
+        The ID of the started job, if one was started.
+    """
+    paths, urls = document_sources(agent_config)
+    if not paths and not urls:
+        return None
+    stale = _stale_sources(paths, urls, rag_manifest.load(agent_config.id))
+    last = _submitted.get(agent_config.id)
+    recent = last is not None and time.monotonic() - last[1] < REINDEX_SECONDS
+    if not stale and (not urls or recent):
+        return None
+    if (recent and last[0] == stale) or ingest_jobs.active_job(agent_config.id):
+        return None
+    # Every configured document is passed: ingestion drops the ones it is not given.
+    job = ingest_jobs.submit(agent_config.id, urls=urls, paths=paths)
+    _submitted[agent_config.id] = (stale, time.monotonic())
+    logger.info(f"Indexing documents of agent {agent_config.id} in job {job.id}")
+    return job.id
+
+
+def _pack(passages: List[str], max_tokens: int) -> str:
+    """Numbers passages, best first, until the token budget is used."""
+    packed, used = [], 0
+    for passage in passages:
+        passage = passage.strip()
+        tokens = estimate_tokens(passage)
+        if not passage or used + tokens > max_tokens:
+            continue
+        packed.append(f"[{len(packed) + 1}] {passage}")
+        used += tokens
+    return "\n\n".join(packed)
+
+
+async def build_context(
+    agent_config: AgentConfiguration,
+    query: str,
+    max_tokens: int = CONTEXT_TOKENS,
+    k: int = TOP_K,
+) -> str:
+    """
+    Retrieves the passages of the agent's indexed documents most relevant to
+    a task, for injection into the task's prompt instead of whole files.
+
+    Args:
+        agent_config: The agent; its documents are indexed on first use.
+        query: What the task needs to know about.
+        max_tokens: Budget for the returned passages.
+        k: Chunks retrieved before the budget is applied.
+
+    Returns:
+        Numbered passages, best first, or "" when nothing is indexed or
+        retrieval fails.
+    """
+    if not agent_config.id:
+        return ""
+    try:
+        ensure_indexed(agent_config)
+    except Exception as e:
+        logger.warning(f"Could not start indexing for agent {agent_config.id}: {e}")
+    if not rag_manifest.load(agent_config.id):
+        return ""
+    try:
+        passages = await asyncio.to_thread(retrieval.search, agent_config.id, query, MODE, k)
+    except Exception as e:
+        logger.warning(f"Document retrieval failed for agent {agent_config.id}: {e}")
+        return ""
+    return _pack(passages, max_tokens)
+
+
+def select_passages(text: str, query: str, max_tokens: int = CONTEXT_TOKENS) -> str:
+    """
+    Shrinks one document to its passages most relevant to a query (BM25),
+    kept in document order. Text within the budget is returned unchanged.
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    # Several passages per budget, so a small budget still gets the best ones.
+    pieces = split_text(text, max(1, min(PASSAGE_TOKENS, max_tokens // 4)))
+    ranked = keyword_index.rank_texts(query, pieces)
+    # Passages matching no query term fill any remaining budget in order.
+    matched = set(ranked)
+    ranked += [i for i in range(len(pieces)) if i not in matched]
+    chosen, used = [], 0
+    for i in ranked:
+        tokens = estimate_tokens(pieces[i])
+        if used + tokens <= max_tokens:
+            chosen.append(i)
+            used += tokens
+    return "\n\n".join(pieces[i] for i in sorted(chosen))
+
+
+async def source_passages(source: str, query: str, max_tokens: int = CONTEXT_TOKENS) -> str:
+    """
+    Fetches a URL or extracts a file, then keeps its passages most relevant
+    to a query. Returns "" if the source cannot be read.
+    """
+    try:
+        if source.startswith(("http://", "https://")):
+            text = await extraction.fetch_url(source)
+        else:
+            text = await extraction.aextract(source)
+    except Exception as e:
+        logger.warning(f"Could not read {source}: {e}")
+        return ""
+    return await asyncio.to_thread(select_passages, text, query, max_tokens)
@@ -0,0 +1,91 @@
+# ai_agent_builder/utils/rag_manifest.py
+import hashlib
+import json
+import logging
+import os
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_DIR = os.path.join("_data", "rag", "manifests")
+
+if not os.path.exists(MANIFEST_DIR):
+    os.makedirs(MANIFEST_DIR)
+
+# Bytes read per step while hashing a file.
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def _manifest_path(agent_id: str) -> str:
+    return os.path.join(MANIFEST_DIR, f"{agent_id}.json")
+
+
+def exists(agent_id: str) -> bool:
+    """Returns True if the agent has been ingested with a manifest before."""
+    return os.path.exists(_manifest_path(agent_id))
+
+
+def load(agent_id: str) -> dict:
+    """
+    Loads an agent's ingestion manifest.
+
+    Returns:
+        {source: {"size", "mtime_ns", "sha256", "chunk_ids"}}, where source is
+        a file path, a URL or "text:<sha256>" for raw text inputs.
+    """
+    path = _manifest_path(agent_id)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def save(agent_id: str, manifest: dict):
+    """Writes the manifest atomically, so a crash never leaves it half written."""
+    path = _manifest_path(agent_id)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def delete(agent_id: str):
+    """Removes an agent's manifest, so its next ingestion starts from scratch."""
+    path = _manifest_path(agent_id)
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def sha256_file(path: str) -> str:
+    """Hashes a file's content."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def sha256_text(text: str) -> str:
+    """Hashes a string's UTF-8 encoding."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def stat_unchanged(entry: Optional[dict], stat: os.stat_result) -> bool:
+    """True if a file's size and mtime match its manifest entry (no hashing needed)."""
+    return (
+        entry is not None
+        and entry.get("size") == stat.st_size
+        and entry.get("mtime_ns") == stat.st_mtime_ns
+    )
+
+
+def make_entry(
+    sha256: str, chunk_ids: List[str], stat: Optional[os.stat_result] = None
+) -> dict:
+    """Builds a manifest entry; stat is None for URLs and raw texts."""
+    return {
+        "size": stat.st_size if stat else None,
+        "mtime_ns": stat.st_mtime_ns if stat else None,
+        "sha256": sha256,
+        "chunk_ids": chunk_ids,
+    }
@@ -0,0 +1,123 @@
+# ai_agent_builder/utils/retrieval.py
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+
+from utils import keyword_index, vector_store
+
+logger = logging.getLogger(__name__)
+
+MODES = ("vector", "keyword", "hybrid")
+
+# Reciprocal-rank fusion constant: the usual 60 keeps one list's top hit from
+# outweighing agreement between both lists.
+RRF_K = 60
+
+# Candidates fetched from each retriever per requested hybrid result.
+HYBRID_CANDIDATES = 4
+
+# Search results kept, keyed by (agent, index generation, mode, k, query).
+RESULT_CACHE_SIZE = int(os.getenv("RETRIEVAL_CACHE_SIZE", 1024))
+
+_cache_lock = threading.Lock()
+_results: "OrderedDict[tuple, List[str]]" = OrderedDict()
+# Bumped whenever an agent's indexes change, which retires its cached results.
+_generations: Dict[str, int] = {}
+
+
+def invalidate(agent_id: str):
+    """Marks an agent's indexes as changed. Called by ingestion on every write."""
+    with _cache_lock:
+        _generations[agent_id] = _generations.get(agent_id, 0) + 1
+        for key in [key for key in _results if key[0] == agent_id]:
+            del _results[key]
+
+
+def cache_info() -> dict:
+    """Returns the result cache size and per-agent generations."""
+    with _cache_lock:
+        return {"entries": len(_results), "generations": dict(_generations)}
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = RRF_K) -> List[Tuple[str, float]]:
+    """
+    Fuses ranked lists of keys: score(key) = sum over lists of 1 / (k + rank).
+
+    Returns:
+        (key, fused score) pairs, best first.
+    """
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, key in enumerate(ranking, start=1):
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+
+def _vector_hits(agent_id: str, query: str, n: int) -> List[Tuple[str, str]]:
+    docs = vector_store.get_agent_store(agent_id).similarity_search(query, k=n)
+    return [
+        (getattr(doc, "id", None) or doc.metadata.get("chunk_id") or doc.page_content, doc.page_content)
+        for doc in docs
+    ]
+
+
+def _keyword_hits(agent_id: str, query: str, n: int) -> List[Tuple[str, str]]:
+    if keyword_index.count(agent_id) == 0:
+        # Chunks ingested before the keyword index existed.
+        data = vector_store.get_agent_store(agent_id).get(include=["documents"])
+        if data["ids"]:
+            keyword_index.add(agent_id, data["ids"], data["documents"])
+            logger.info(f"Built keyword index for agent {agent_id}: {len(data['ids'])} chunks")
+    return [(chunk_id, text) for chunk_id, text, _ in keyword_index.search(agent_id, query, n)]
+
+
+def search(agent_id: str, query: str, mode: str = "vector", k: int = 3) -> List[str]:
+    """
+    Retrieves an agent's chunks most relevant to a query.
+
+    Args:
+        agent_id: The agent whose documents are searched.
+        query: The query text.
+        mode: "vector" (embedding similarity), "keyword" (BM25) or "hybrid"
+            (both, fused with reciprocal-rank fusion).
+        k: Number of chunks to return.
+
+    Returns:
+        Chunk texts, best first.
+    """
+    if mode not in MODES:
+        raise ValueError(f"Unknown retrieval mode '{mode}', expected one of {MODES}")
+
+    with _cache_lock:
+        key = (agent_id, _generations.get(agent_id, 0), mode, k, query)
+        cached = _results.get(key)
+        if cached is not None:
+            _results.move_to_end(key)
+            return list(cached)
+
+    results = _search(agent_id, query, mode, k)
+    with _cache_lock:
+        # Skip the store if ingestion invalidated the agent meanwhile.
+        if key[1] == _generations.get(agent_id, 0):
+            _results[key] = results
+            while len(_results) > RESULT_CACHE_SIZE:
+                _results.popitem(last=False)
+    return list(results)
+
+
+def _search(agent_id: str, query: str, mode: str, k: int) -> List[str]:
+    if mode == "vector":
+        return [text for _, text in _vector_hits(agent_id, query, k)]
+    if mode == "keyword":
+        return [text for _, text in _keyword_hits(agent_id, query, k)]
+
+    candidates = k * HYBRID_CANDIDATES
+    vector_hits = _vector_hits(agent_id, query, candidates)
+    keyword_hits = _keyword_hits(agent_id, query, candidates)
+    texts = dict(vector_hits + keyword_hits)
+    fused = reciprocal_rank_fusion(
+        [[key for key, _ in vector_hits], [key for key, _ in keyword_hits]]
+    )
+    return [texts[key] for key, _ in fused[:k]]
@@ -1,42 +1,174 @@
 import os
+import re
 import asyncio
+import logging
+from typing import List
 import requests
-from bs4 import BeautifulSoup
-from PyPDF2 import PdfReader
-from PIL import Image
-import pytesseract
-from gemini import generate_text
+from utils import extraction, prompts
+from utils.gemini import generate_text
+from utils.prompts import CHARS_PER_TOKEN, estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+# Largest piece of text sent to the model in one summarization call. Longer
+# inputs are split into pieces of this size, summarized concurrently (map)
+# and the partial summaries merged level by level (reduce).
+SUMMARY_CHUNK_TOKENS = int(os.getenv("SUMMARY_CHUNK_TOKENS", 6000))
+
+# Summarization calls in flight at once, across all callers.
+SUMMARY_CONCURRENCY = int(os.getenv("SUMMARY_CONCURRENCY", 4))
+
+# Reduce rounds before giving up on shrinking further.
+MAX_REDUCE_LEVELS = 5
+
+_semaphore = asyncio.Semaphore(SUMMARY_CONCURRENCY)
+
+SUMMARY_PROMPT = prompts.register(
+    "summarizer.summary",
+    """Summarize the following text in a concise manner, preserving key details and context for vector embeddings:
+
+{text}""",
+)
+
+MAP_PROMPT = prompts.register(
+    "summarizer.map",
+    """The following is part {part} of {parts} of a larger document collection.
+Summarize it concisely, preserving names, numbers, dates, identifiers and key
+facts, so the summary can later be merged with the summaries of the other parts:
+
+{text}""",
+)
+
+REDUCE_PROMPT = prompts.register(
+    "summarizer.reduce",
+    """The following are summaries of consecutive parts of a document collection.
+Merge them into one concise summary, removing repetition while preserving names,
+numbers, dates, identifiers and key facts for vector embeddings:
+
+{text}""",
+)
+
+
+def split_text(text: str, max_tokens: int = SUMMARY_CHUNK_TOKENS) -> List[str]:
+    """
+    Splits text into pieces of at most max_tokens, on paragraph breaks where
+    possible, then on sentence ends, then anywhere.
+    """
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    pieces = []
+    current = []
+    current_chars = 0
+    for paragraph in re.split(r"\n\s*\n", text):
+        units = [paragraph]
+        if len(paragraph) > max_chars:
+            units = re.split(r"(?<=[.!?])\s+", paragraph)
+        for unit in units:
+            while len(unit) > max_chars:
+                pieces.append(unit[:max_chars])
+                unit = unit[max_chars:]
+            if current and current_chars + len(unit) + 2 > max_chars:
+                pieces.append("\n\n".join(current))
+                current, current_chars = [], 0
+            if unit.strip():
+                current.append(unit)
+                current_chars += len(unit) + 2
+    if current:
+        pieces.append("\n\n".join(current))
+    return pieces
+
+
+async def _summarize(prompt: str) -> str:
+    async with _semaphore:
+        summary = await generate_text(prompt, task_class="extraction")
+    # generate_text reports failures in its return value.
+    if not summary or not summary.strip() or summary.startswith("Error generating text"):
+        raise ValueError(f"Summarization failed: {summary!r}")
+    return summary.strip()
+
+
+async def _map(pieces: List[str]) -> List[str]:
+    async def summarize_piece(index: int, piece: str) -> str:
+        try:
+            return await _summarize(
+                MAP_PROMPT.render(part=index + 1, parts=len(pieces), text=piece)
+            )
+        except Exception as e:
+            # Keep an excerpt so the reduce step still sees this part.
+            logger.warning(f"Summary of part {index + 1}/{len(pieces)} failed: {e}")
+            return piece[: SUMMARY_CHUNK_TOKENS * CHARS_PER_TOKEN // 8]
+
+    return await asyncio.gather(
+        *(summarize_piece(i, piece) for i, piece in enumerate(pieces))
+    )
+
+
+def _group(summaries: List[str], max_tokens: int) -> List[List[str]]:
+    """Groups consecutive summaries so each group fits in one reduce call."""
+    groups, current, used = [], [], 0
+    for summary in summaries:
+        tokens = estimate_tokens(summary)
+        if current and used + tokens > max_tokens:
+            groups.append(current)
+            current, used = [], 0
+        current.append(summary)
+        used += tokens
+    if current:
+        groups.append(current)
+    return groups
+
+
+async def _reduce(summaries: List[str]) -> str:
+    async def merge_group(index: int, group: List[str], count: int) -> str:
+        joined = "\n\n".join(group)
+        try:
+            return await _summarize(REDUCE_PROMPT.render(text=joined))
+        except Exception as e:
+            # Keep an excerpt, as _map does, so the next level still shrinks.
+            logger.warning(f"Merge of group {index + 1}/{count} failed: {e}")
+            return joined[: SUMMARY_CHUNK_TOKENS * CHARS_PER_TOKEN // 8]
+
+    for level in range(MAX_REDUCE_LEVELS):
+        joined = "\n\n".join(summaries)
+        if len(summaries) == 1 and estimate_tokens(joined) <= SUMMARY_CHUNK_TOKENS:
+            return joined
+        groups = _group(summaries, SUMMARY_CHUNK_TOKENS)
+        logger.info(f"Reduce level {level + 1}: {len(summaries)} summaries in {len(groups)} groups")
+        summaries = await asyncio.gather(
+            *(merge_group(i, group, len(groups)) for i, group in enumerate(groups))
+        )
+    return "\n\n".join(summaries)[: SUMMARY_CHUNK_TOKENS * CHARS_PER_TOKEN]
+
 
 async def summarize_text(text: str) -> str:
     """
     Summarizes the provided text using the Gemini API.
     This summary is optimized for vector embeddings by reducing the size
-    while retaining the key context.
+    while retaining the key context. Text longer than SUMMARY_CHUNK_TOKENS is
+    summarized map-reduce style: pieces are summarized concurrently (at most
+    SUMMARY_CONCURRENCY calls at a time), then the partial summaries are
+    merged hierarchically until one summary remains.
     
     Args:
         text: The long text string to be summarized.
     
     Returns:
-        A concise summary string.
+        A concise summary string, at most about SUMMARY_CHUNK_TOKENS long
+        even when model calls fail.
     """
     try:
-        prompt = (
-            "Summarize the following text in a concise manner, "
-            "preserving key details and context for vector embeddings:\n\n"
-            f"{text}"
-        )
-        summary = await generate_text(prompt)
-        if not summary or summary.strip() == "":
-            raise ValueError("Empty summary returned from Gemini.")
-        return summary.strip()
+        if estimate_tokens(text) <= SUMMARY_CHUNK_TOKENS:
+            return await _summarize(SUMMARY_PROMPT.render(text=text))
+        pieces = split_text(text)
+        logger.info(f"Summarizing ~{estimate_tokens(text)} tokens in {len(pieces)} parts")
+        return await _reduce(await _map(pieces))
     except Exception as e:
-        print(f"Error during summarization: {e}")
-        # Fallback: if summarization fails, return the original text
-        return text
+        logger.error(f"Error during summarization: {e}")
+        # Fallback: the original text, cut to the size a summary may have.
+        return text[: SUMMARY_CHUNK_TOKENS * CHARS_PER_TOKEN]
 
 def extract_text_from_pdf(file_path: str) -> str:
     """
-    Extracts text from a PDF file using PyPDF2.
+    Extracts text from a PDF file (see utils/extraction.py).
     
     Args:
         file_path: Path to the PDF file.
@@ -45,20 +177,14 @@ def extract_text_from_pdf(file_path: str) -> str:
         Extracted text as a string.
     """
     try:
-        reader = PdfReader(file_path)
-        text = ""
-        for page in reader.pages:
-            page_text = page.extract_text()
-            if page_text:
-                text += page_text
-        return text
+        return extraction.extract(file_path)
     except Exception as e:
         print(f"Error extracting text from PDF {file_path}: {e}")
         return ""
 
 def extract_text_from_image(file_path: str) -> str:
     """
-    Extracts text from an image using pytesseract.
+    Extracts text from an image with OCR (see utils/extraction.py).
     
     Args:
         file_path: Path to the image file.
@@ -67,9 +193,7 @@ def extract_text_from_image(file_path: str) -> str:
         Extracted text as a string.
     """
     try:
-        image = Image.open(file_path)
-        text = pytesseract.image_to_string(image)
-        return text
+        return extraction.extract(file_path)
     except Exception as e:
         print(f"Error extracting text from image {file_path}: {e}")
         return ""
@@ -85,8 +209,7 @@ def extract_text_from_file(file_path: str) -> str:
         The file content as a string.
     """
     try:
-        with open(file_path, "r", encoding="utf-8") as f:
-            return f.read()
+        return extraction.extract(file_path)
     except Exception as e:
         print(f"Error reading file {file_path}: {e}")
         return ""
@@ -94,6 +217,7 @@ def extract_text_from_file(file_path: str) -> str:
 def extract_text_from_url(url: str) -> str:
     """
     Extracts text content from a URL using requests and BeautifulSoup.
+    Blocking; async callers should use extraction.fetch_url.
     
     Args:
         url: The web URL.
@@ -102,11 +226,9 @@ def extract_text_from_url(url: str) -> str:
         Extracted textual content from the webpage.
     """
     try:
-        response = requests.get(url)
-        soup = BeautifulSoup(response.text, "html.parser")
-        paragraphs = soup.find_all("p")
-        text = "\n".join([p.get_text() for p in paragraphs])
-        return text
+        response = requests.get(url, timeout=extraction.URL_TIMEOUT_SECONDS)
+        response.raise_for_status()
+        return extraction.html_to_text(response.text)
     except Exception as e:
         print(f"Error extracting text from URL {url}: {e}")
         return ""
@@ -116,7 +238,8 @@ async def summarize_multi_input_data(
 ) -> str:
     """
     Aggregates text extracted from various sources (PDFs, images, files, URLs, and raw texts)
-    and summarizes the aggregated content using the Gemini API.
+    and summarizes the aggregated content using the Gemini API. Sources are
+    extracted concurrently, so the wait is roughly that of the slowest one.
     
     Args:
         pdf_files: List of PDF file paths.
@@ -128,33 +251,28 @@ async def summarize_multi_input_data(
     Returns:
         A concise summary string of the aggregated content.
     """
-    aggregated_text = ""
-    
-    # Extract text from PDF files
-    for pdf in pdf_files:
-        extracted = extract_text_from_pdf(pdf)
-        aggregated_text += "\n" + extracted
-
-    # Extract text from image files
-    for image in image_files:
-        extracted = extract_text_from_image(image)
-        aggregated_text += "\n" + extracted
-
-    # Extract text from plain text or markdown files
-    for file in file_paths:
-        extracted = extract_text_from_file(file)
-        aggregated_text += "\n" + extracted
-
-    # Extract text from URLs
-    for url in urls:
-        extracted = extract_text_from_url(url)
-        aggregated_text += "\n" + extracted
+    files = [*pdf_files, *image_files, *file_paths]
+    async with extraction.new_client() as client:
+        # All sources at once: PDFs and images on worker processes, files on
+        # threads, URLs on the event loop. gather keeps the input order.
+        results = await asyncio.gather(
+            *[extraction.aextract(path) for path in files],
+            *[extraction.fetch_url(url, client) for url in urls],
+            return_exceptions=True,
+        )
+
+    sources = [*files, *urls]
+    parts = []
+    for source, result in zip(sources, results):
+        if isinstance(result, BaseException):
+            logger.error(f"Error extracting text from {source}: {result}")
+            continue
+        parts.append(result)
 
     # Append raw text inputs
-    for raw in texts:
-        aggregated_text += "\n" + raw
+    parts.extend(texts)
 
-    # Summarize the aggregated text using Gemini
+    # Summarize the aggregated text using Gemini (map-reduce for large inputs)
+    aggregated_text = "\n\n".join(part for part in parts if part)
     summary = await summarize_text(aggregated_text)
     return summary
-
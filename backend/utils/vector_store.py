@@ -0,0 +1,196 @@
+# ai_agent_builder/utils/vector_store.py
+import hashlib
+import logging
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple, Union
+
+from langchain.embeddings import HuggingFaceEmbeddings
+from langchain.vectorstores import Chroma
+
+from utils.embedder import CachedEmbeddings
+from utils.flat_index import FlatIndex
+
+logger = logging.getLogger(__name__)
+
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+
+# "chroma" or "numpy" (utils/flat_index.FlatIndex: memory-mapped files, no
+# server process, near-zero open cost; suits small per-agent corpora).
+BACKEND = os.getenv("VECTOR_BACKEND", "chroma")
+
+# Paths are relative to backend/, like every other _data directory.
+PERSIST_DIR = os.path.join("_data", "chroma_langchain")
+DEFAULT_COLLECTION = "agent_memory"
+
+# Each agent's documents live in their own collection. Before that, all of
+# them shared DEFAULT_COLLECTION and were told apart by an "agent" metadata
+# field; they are moved out on first use.
+AGENT_COLLECTION_PREFIX = "docs"
+
+# The embedding model and the store handles are created once per process and
+# shared by every request; the lock only guards their creation.
+_lock = threading.Lock()
+_embeddings: Optional[CachedEmbeddings] = None
+_stores: Dict[Tuple[str, str], Union[Chroma, FlatIndex]] = {}
+_status = {"ready": False, "model": EMBEDDING_MODEL, "load_seconds": None, "error": None}
+
+
+def get_embeddings() -> CachedEmbeddings:
+    """
+    Returns the process-wide embedding model, loading it on first use.
+    Document embeddings go through the batching, worker pool and disk cache
+    in utils/embedder.py.
+    """
+    global _embeddings
+    if _embeddings is None:
+        with _lock:
+            if _embeddings is None:
+                started = time.perf_counter()
+                try:
+                    _embeddings = CachedEmbeddings(
+                        HuggingFaceEmbeddings(model_name=EMBEDDING_MODEL), EMBEDDING_MODEL
+                    )
+                except Exception as e:
+                    _status["error"] = str(e)
+                    raise
+                _status["load_seconds"] = round(time.perf_counter() - started, 3)
+                logger.info(
+                    f"Loaded embedding model {EMBEDDING_MODEL} "
+                    f"in {_status['load_seconds']}s"
+                )
+    return _embeddings
+
+
+def get_store(
+    collection_name: str = DEFAULT_COLLECTION, persist_directory: str = PERSIST_DIR
+) -> Union[Chroma, FlatIndex]:
+    """
+    Returns the shared store handle for a collection, creating it once.
+
+    Args:
+        collection_name: The collection.
+        persist_directory: Where the collection is stored.
+
+    Returns:
+        A Chroma or FlatIndex vector store (see BACKEND) using the
+        process-wide embedding model.
+    """
+    key = (persist_directory, collection_name)
+    store = _stores.get(key)
+    if store is None:
+        embeddings = get_embeddings()
+        with _lock:
+            store = _stores.get(key)
+            if store is None:
+                os.makedirs(persist_directory, exist_ok=True)
+                if BACKEND == "numpy":
+                    store = FlatIndex(
+                        embeddings, os.path.join(persist_directory, "flat", collection_name)
+                    )
+                else:
+                    store = Chroma(
+                        embedding_function=embeddings,
+                        collection_name=collection_name,
+                        persist_directory=persist_directory,
+                    )
+                _stores[key] = store
+    return store
+
+
+def collection_name(agent_id: str, prefix: str = AGENT_COLLECTION_PREFIX) -> str:
+    """Returns the collection of an agent; names are restricted to [a-zA-Z0-9._-]."""
+    return f"{prefix}-{hashlib.sha1(agent_id.encode('utf-8')).hexdigest()[:20]}"
+
+
+def _migrate_shared(agent_id: str, store: Chroma):
+    if BACKEND != "chroma":
+        return
+    shared = get_store(DEFAULT_COLLECTION)
+    data = shared.get(where={"agent": agent_id}, include=["documents", "metadatas"])
+    if not data["ids"]:
+        return
+    store.add_texts(data["documents"], metadatas=data["metadatas"], ids=data["ids"])
+    shared.delete(ids=data["ids"])
+    logger.info(f"Moved {len(data['ids'])} chunks of agent {agent_id} to its own collection")
+
+
+def get_agent_store(
+    agent_id: str,
+    prefix: str = AGENT_COLLECTION_PREFIX,
+    persist_directory: str = PERSIST_DIR,
+) -> Union[Chroma, FlatIndex]:
+    """
+    Returns an agent's own collection, creating it on first use, so searches
+    only scan the agent's data and dropping it is a single operation.
+
+    Args:
+        agent_id: The owning agent.
+        prefix: Kind of data, e.g. "docs" for RAG chunks or "memory".
+        persist_directory: Where the collection is stored.
+    """
+    name = collection_name(agent_id, prefix)
+    opened = (persist_directory, name) in _stores
+    store = get_store(name, persist_directory)
+    if not opened and prefix == AGENT_COLLECTION_PREFIX and persist_directory == PERSIST_DIR:
+        _migrate_shared(agent_id, store)
+    return store
+
+
+def compact_agent_store(
+    agent_id: str,
+    prefix: str = AGENT_COLLECTION_PREFIX,
+    persist_directory: str = PERSIST_DIR,
+) -> int:
+    """
+    Rebuilds an agent's collection from its live entries, discarding space
+    and index nodes left behind by deletes. Vectors come from the embedding
+    cache, so no text is re-encoded. Searches issued while it runs may come
+    back empty. Writers must be excluded by the caller (see
+    embeding.compact_agent), or their changes in between are lost.
+
+    Returns:
+        The number of entries kept.
+    """
+    store = get_agent_store(agent_id, prefix, persist_directory)
+    data = store.get(include=["documents", "metadatas"])
+    name = collection_name(agent_id, prefix)
+    with _lock:
+        store.delete_collection()
+        _stores.pop((persist_directory, name), None)
+    fresh = get_store(name, persist_directory)
+    if data["ids"]:
+        fresh.add_texts(data["documents"], metadatas=data["metadatas"], ids=data["ids"])
+    return len(data["ids"])
+
+
+def drop_agent_store(
+    agent_id: str,
+    prefix: str = AGENT_COLLECTION_PREFIX,
+    persist_directory: str = PERSIST_DIR,
+):
+    """Deletes an agent's collection and everything in it."""
+    store = get_agent_store(agent_id, prefix, persist_directory)
+    with _lock:
+        store.delete_collection()
+        _stores.pop((persist_directory, collection_name(agent_id, prefix)), None)
+
+
+def warm_up():
+    """
+    Loads the model and runs one embedding, so the first query only pays for
+    the similarity search. Safe to call repeatedly.
+    """
+    try:
+        get_embeddings().embed_query("warm up")
+        _status["ready"] = True
+        _status["error"] = None
+    except Exception as e:
+        _status["error"] = str(e)
+        logger.error(f"Embedding warm-up failed: {e}")
+
+
+def status() -> dict:
+    """Returns {"ready", "model", "load_seconds", "error"}."""
+    return dict(_status)